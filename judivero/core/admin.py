@@ -1,6 +1,101 @@
+from datetime import datetime
+
 from django.contrib import admin
 from django import forms
+from django.utils import timezone
 from .models import Comando, Nota, Baneos, CanalTwitch
+from .busqueda import actualizar_usuarios_indexados
+from .contadores import cambiar_estado_baneos, invalidaciones_en_bloque
+from .paginacion import PaginadorEstimado
+
+
+# Baneos por transacción en las acciones masivas: con "seleccionar todos" sobre
+# millones de filas un solo UPDATE bloquearía la base mientras dura
+LOTE_ACCIONES = 2000
+
+
+def _cambiar_estado_por_lotes(queryset, activo):
+    """cambiar_estado_baneos por lotes de ids; devuelve la suma de filas actualizadas"""
+    pendientes = queryset.filter(activo=not activo).order_by('pk').values_list('pk', flat=True)
+    cambiados = 0
+    ultimo = None
+    while True:
+        ids = list((pendientes if ultimo is None else pendientes.filter(pk__gt=ultimo))[:LOTE_ACCIONES])
+        if not ids:
+            return cambiados
+        lote = Baneos.objects.filter(pk__in=ids)
+        with invalidaciones_en_bloque():
+            cambiados += cambiar_estado_baneos(lote, activo=activo)
+        # Por canal y en bloque: un número fijo de consultas por lote, no por usuario
+        actualizar_usuarios_indexados(lote)
+        ultimo = ids[-1]
+
+
+class FiltroPorMes(admin.SimpleListFilter):
+    """
+    Filtro por mes (los últimos MESES_RECIENTES) o por año (los anteriores)
+    que filtra con un rango fecha >= inicio AND fecha < fin, así el índice
+    (-fecha, -id) resuelve tanto las opciones como el listado. date_hierarchy
+    arma las opciones con un SELECT DISTINCT sobre toda la tabla.
+    """
+    campo = None
+    MESES_RECIENTES = 12
+
+    def _extremo(self, queryset, orden):
+        fecha = queryset.order_by(orden).values_list(self.campo, flat=True).first()
+        return timezone.localtime(fecha) if fecha else None
+
+    def lookups(self, request, model_admin):
+        queryset = model_admin.get_queryset(request)
+        # Dos búsquedas en el índice en lugar de recorrer las fechas
+        primera = self._extremo(queryset, self.campo)
+        ultima = self._extremo(queryset, f'-{self.campo}')
+        if primera is None:
+            return []
+
+        opciones = []
+        anio, mes = ultima.year, ultima.month
+        for _ in range(self.MESES_RECIENTES):
+            if (anio, mes) < (primera.year, primera.month):
+                return opciones
+            opciones.append((f'{anio}-{mes:02d}', f'{anio}-{mes:02d}'))
+            anio, mes = (anio, mes - 1) if mes > 1 else (anio - 1, 12)
+        # Lo anterior, por año completo
+        return opciones + [(str(a), str(a)) for a in range(anio, primera.year - 1, -1)]
+
+    def _rango(self):
+        partes = self.value().split('-')
+        try:
+            anio = int(partes[0])
+            if len(partes) == 1:
+                return datetime(anio, 1, 1), datetime(anio + 1, 1, 1)
+            mes = int(partes[1])
+            fin = datetime(anio, mes + 1, 1) if mes < 12 else datetime(anio + 1, 1, 1)
+            return datetime(anio, mes, 1), fin
+        except (ValueError, IndexError, OverflowError):
+            return None
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        rango = self._rango()
+        if rango is None:
+            return queryset.none()
+        inicio, fin = (timezone.make_aware(fecha) for fecha in rango)
+        return queryset.filter(**{f'{self.campo}__gte': inicio, f'{self.campo}__lt': fin})
+
+
+class FiltroFechaBaneo(FiltroPorMes):
+    title = 'fecha de baneo'
+    parameter_name = 'mes_baneo'
+    campo = 'fecha_baneo'
+
+
+class FiltroFechaCreacion(FiltroPorMes):
+    title = 'fecha de creación'
+    parameter_name = 'mes_creacion'
+    campo = 'fecha_creacion'
+
 
 # Form personalizado para Baneos en el admin
 class BaneosAdminForm(forms.ModelForm):
@@ -21,11 +116,11 @@ class BaneosAdminForm(forms.ModelForm):
 
 @admin.register(CanalTwitch)
 class CanalTwitchAdmin(admin.ModelAdmin):
-    list_display = ['nombre', 'streamer', 'activo', 'fecha_inicio_moderacion', 'total_comandos', 'total_baneos_activos']
+    list_display = ['nombre', 'streamer', 'activo', 'fecha_inicio_moderacion', 'total_comandos', 'total_baneos', 'total_baneos_activos']
     list_filter = ['activo', 'fecha_inicio_moderacion']
     search_fields = ['nombre', 'streamer', 'descripcion']
     ordering = ['nombre']
-    readonly_fields = ['total_comandos', 'total_baneos_activos', 'fecha_inicio_moderacion']
+    readonly_fields = ['total_comandos', 'total_baneos', 'total_baneos_activos', 'fecha_inicio_moderacion']
     
     fieldsets = (
         ('Información del Canal', {
@@ -35,7 +130,7 @@ class CanalTwitchAdmin(admin.ModelAdmin):
             'fields': ('color_distintivo', 'activo')
         }),
         ('Estadísticas', {
-            'fields': ('total_comandos', 'total_baneos_activos', 'fecha_inicio_moderacion'),
+            'fields': ('total_comandos', 'total_baneos', 'total_baneos_activos', 'fecha_inicio_moderacion'),
             'classes': ('collapse',)
         }),
     )
@@ -46,6 +141,9 @@ class ComandoAdmin(admin.ModelAdmin):
     list_filter = ['canal', 'nivel_minimo', 'activo', 'fecha_creacion']
     search_fields = ['nombre', 'juego_o_significado']
     ordering = ['canal', 'nombre']
+    list_select_related = ['canal']
+    autocomplete_fields = ['canal']
+    show_full_result_count = False
     
     fieldsets = (
         ('Información Básica', {
@@ -64,9 +162,15 @@ class ComandoAdmin(admin.ModelAdmin):
 @admin.register(Nota)
 class NotaAdmin(admin.ModelAdmin):
     list_display = ['titulo', 'canal', 'tipo', 'importante', 'etiqueta', 'fecha_creacion']
-    list_filter = ['canal', 'tipo', 'importante', 'fecha_creacion']
+    list_filter = ['canal', 'tipo', 'importante', FiltroFechaCreacion]
     search_fields = ['titulo', 'nota', 'etiqueta']
     ordering = ['-fecha_creacion']
+    # Tablas grandes: sin JOIN por fila, sin COUNT completo y sin <select> con todos los usuarios
+    list_select_related = ['canal']
+    autocomplete_fields = ['canal']
+    raw_id_fields = ['user']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Canal y Tipo', {
@@ -86,9 +190,15 @@ class NotaAdmin(admin.ModelAdmin):
 class BaneosAdmin(admin.ModelAdmin):
     form = BaneosAdminForm
     list_display = ['nombre_usuario', 'canal', 'activo', 'fecha_baneo', 'desbaneo', 'tiene_imagen']
-    list_filter = ['canal', 'activo', 'fecha_baneo']
+    list_filter = ['canal', 'activo', FiltroFechaBaneo]
     search_fields = ['nombre_usuario', 'motivo']
     ordering = ['-fecha_baneo']
+    # Tablas grandes: sin JOIN por fila, sin COUNT completo y sin <select> con todos los usuarios
+    list_select_related = ['canal']
+    autocomplete_fields = ['canal']
+    raw_id_fields = ['user']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Usuario y Canal', {
@@ -105,17 +215,22 @@ class BaneosAdmin(admin.ModelAdmin):
     readonly_fields = ['fecha_baneo']
     
     actions = ['desactivar_baneos', 'activar_baneos']
+
+    def delete_queryset(self, request, queryset):
+        # Las señales de cada baneo borrado piden invalidar canales y fragmentos: una vez al final
+        with invalidaciones_en_bloque():
+            super().delete_queryset(request, queryset)
     
     def tiene_imagen(self, obj):
         return "✓" if obj.imagen else "✗"
     tiene_imagen.short_description = "Imagen"
     
     def desactivar_baneos(self, request, queryset):
-        queryset.update(activo=False)
-        self.message_user(request, f'{queryset.count()} baneo(s) desactivado(s).')
+        cambiados = _cambiar_estado_por_lotes(queryset, activo=False)
+        self.message_user(request, f'{cambiados} baneo(s) desactivado(s).')
     desactivar_baneos.short_description = "Desactivar baneos seleccionados"
     
     def activar_baneos(self, request, queryset):
-        queryset.update(activo=True)
-        self.message_user(request, f'{queryset.count()} baneo(s) activado(s).')
+        cambiados = _cambiar_estado_por_lotes(queryset, activo=True)
+        self.message_user(request, f'{cambiados} baneo(s) activado(s).')
     activar_baneos.short_description = "Activar baneos seleccionados"
\ No newline at end of file
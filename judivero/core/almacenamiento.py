@@ -0,0 +1,51 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class AlmacenamientoPorContenido(FileSystemStorage):
+    """
+    Guarda cada archivo subido bajo `prefijo` con su hash SHA-256 como nombre
+    (ej. baneos/imagenes/ab/abcd….png). Si el mismo contenido ya existe no se
+    vuelve a escribir y el baneo apunta al archivo existente. Los archivos fuera
+    del prefijo (variantes, archivos antiguos) se guardan como siempre.
+    """
+
+    def __init__(self, prefijo='baneos/imagenes', **kwargs):
+        self.prefijo = prefijo.strip('/')
+        super().__init__(**kwargs)
+
+    def es_por_contenido(self, name):
+        """True si el nombre corresponde a un archivo direccionado por contenido"""
+        partes = name.split('/')
+        if len(partes) < 2 or '/'.join(partes[:-2]) != self.prefijo:
+            return False
+        hash_archivo = posixpath.splitext(partes[-1])[0]
+        return len(hash_archivo) == 64 and partes[-2] == hash_archivo[:2]
+
+    def hash_de(self, name):
+        return posixpath.splitext(posixpath.basename(name))[0]
+
+    def nombre_por_contenido(self, hash_archivo, extension):
+        return posixpath.join(self.prefijo, hash_archivo[:2], f'{hash_archivo}{extension.lower()}')
+
+    def _save(self, name, content):
+        if not name.startswith(self.prefijo + '/'):
+            return super()._save(name, content)
+
+        sha = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for bloque in content.chunks():
+            sha.update(bloque)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        destino = self.nombre_por_contenido(sha.hexdigest(), os.path.splitext(name)[1])
+        if self.exists(destino):
+            return destino
+        return super()._save(destino, content)
@@ -0,0 +1,171 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+
+from .canales import acanal_por_id, acanales_activos
+from .models import Baneos, CanalTwitch, Comando
+from .paginacion import CursorInvalido, codificar_cursor, filtrar_desde_cursor
+
+
+# Baneos por respuesta de la API, por defecto y como máximo
+BANEOS_POR_RESPUESTA = 100
+MAXIMO_BANEOS_POR_RESPUESTA = 500
+
+# Orden de los niveles de Comando.NIVEL: cada nivel puede usar los comandos de los anteriores
+NIVELES = [nivel for nivel, _ in Comando.NIVEL]
+
+CAMPOS_CANAL = ['id', 'nombre', 'streamer', 'url_twitch', 'color_distintivo', 'total_comandos', 'total_baneos_activos']
+CAMPOS_COMANDO = ['id', 'nombre', 'juego_o_significado', 'nivel_minimo', 'ultima_modificacion']
+CAMPOS_BANEO = ['id', 'nombre_usuario', 'motivo', 'fecha_baneo', 'desbaneo']
+
+
+def token_valido(request):
+    # Solo la cabecera: en la URL el token quedaría en los logs, el historial y el Referer
+    autorizacion = request.headers.get('Authorization', '')
+    token = autorizacion[len('Bearer '):].strip() if autorizacion.startswith('Bearer ') else ''
+    return bool(token) and any(constant_time_compare(token, valido) for valido in settings.API_TOKENS)
+
+
+def api_protegida(vista):
+    """Acepta la sesión de un moderador o un token de API (cabecera Authorization: Bearer)"""
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        usuario = await request.auser()
+        if not usuario.is_authenticated and not token_valido(request):
+            return JsonResponse({'error': 'No autorizado'}, status=401)
+        return await vista(request, *args, **kwargs)
+    return require_GET(envoltura)
+
+
+def _etag(*partes):
+    return quote_etag(hashlib.sha256('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:32])
+
+
+async def respuesta_condicional(request, etag, adatos):
+    """
+    JsonResponse con ETag; si el cliente ya tiene esa versión (If-None-Match)
+    devuelve 304 sin esperar a `adatos()`. Sin Last-Modified: la última
+    modificación no cambia al borrar una fila que no es la más reciente, y un
+    cliente que solo mande If-Modified-Since recibiría 304 con la lista cambiada.
+    """
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = JsonResponse(await adatos())
+    respuesta['ETag'] = etag
+    # El cliente puede guardar la respuesta, pero debe revalidarla en cada consulta
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+async def _canal_o_404(canal_id):
+    canal = await acanal_por_id(canal_id)
+    if canal is None:
+        return None, JsonResponse({'error': 'Canal no encontrado'}, status=404)
+    return canal, None
+
+
+def version_baneos(canal_id):
+    """
+    Contadores del canal y última modificación de sus baneos en una sola consulta
+    por clave primaria: editar, desactivar o reactivar un baneo cambia su
+    ultima_modificacion y borrarlo cambia total_baneos.
+    """
+    ultima = Baneos.objects.filter(canal=OuterRef('pk')).order_by('-ultima_modificacion')
+    return CanalTwitch.objects.filter(pk=canal_id).values('total_baneos', 'total_baneos_activos').annotate(
+        ultima=Subquery(ultima.values('ultima_modificacion')[:1]),
+    )
+
+
+@api_protegida
+async def canales(request):
+    """Canales activos, desde la caché del proceso (sin consultas)"""
+    filas = [{campo: getattr(canal, campo) for campo in CAMPOS_CANAL} for canal in await acanales_activos()]
+    etag = _etag(*(tuple(fila.values()) for fila in filas))
+
+    async def adatos():
+        return {'canales': filas}
+
+    return await respuesta_condicional(request, etag, adatos)
+
+
+@api_protegida
+async def comandos(request, canal_id):
+    """Comandos activos del canal; con ?nivel=MODS solo los que puede usar ese nivel"""
+    canal, error = await _canal_o_404(canal_id)
+    if error:
+        return error
+
+    nivel = request.GET.get('nivel', '').upper()
+    if nivel and nivel not in NIVELES:
+        return JsonResponse({'error': f'Nivel inválido, usa uno de: {", ".join(NIVELES)}'}, status=400)
+
+    # Todos los comandos del canal (también inactivos): desactivar uno cambia su ultima_modificacion
+    # y el total detecta los borrados
+    version = await Comando.objects.filter(canal=canal).aaggregate(
+        ultima=Max('ultima_modificacion'),
+        total=Count('id'),
+    )
+    etag = _etag('comandos', canal.id, nivel, version['ultima'], version['total'])
+
+    async def adatos():
+        activos = Comando.objects.filter(canal=canal, activo=True)
+        if nivel:
+            activos = activos.filter(nivel_minimo__in=NIVELES[:NIVELES.index(nivel) + 1])
+        return {
+            'canal': canal.id,
+            'comandos': [fila async for fila in activos.order_by('nombre').values(*CAMPOS_COMANDO)],
+        }
+
+    return await respuesta_condicional(request, etag, adatos)
+
+
+@api_protegida
+async def baneos(request, canal_id):
+    """
+    Baneos activos del canal, del más reciente al más antiguo, por páginas
+    (?limite=, ?cursor= con el siguiente_cursor de la respuesta anterior).
+    """
+    canal, error = await _canal_o_404(canal_id)
+    if error:
+        return error
+
+    try:
+        limite = min(max(int(request.GET.get('limite', BANEOS_POR_RESPUESTA)), 1), MAXIMO_BANEOS_POR_RESPUESTA)
+    except ValueError:
+        return JsonResponse({'error': 'Límite inválido'}, status=400)
+    cursor = request.GET.get('cursor') or None
+
+    activos = Baneos.objects.filter(canal=canal, activo=True)
+    # Contadores mantenidos por las señales en lugar de COUNT/MAX sobre los baneos en cada consulta
+    version = await version_baneos(canal.id).aget()
+    etag = _etag(
+        'baneos', canal.id, version['ultima'], version['total_baneos'], version['total_baneos_activos'],
+        limite, cursor,
+    )
+
+    try:
+        pagina = filtrar_desde_cursor(activos, cursor)
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+
+    async def adatos():
+        filas = [fila async for fila in pagina.values(*CAMPOS_BANEO)[:limite + 1]]
+        siguiente_cursor = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            siguiente_cursor = codificar_cursor(Baneos(id=filas[-1]['id'], fecha_baneo=filas[-1]['fecha_baneo']))
+        return {
+            'canal': canal.id,
+            'total': version['total_baneos_activos'],
+            'baneos': filas,
+            'siguiente_cursor': siguiente_cursor,
+        }
+
+    return await respuesta_condicional(request, etag, adatos)
@@ -0,0 +1,262 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+
+from .models import Baneos, Infractor, TrigramaUsuario, UsuarioBaneado
+
+
+# Resultados máximos para la página de búsqueda y el autocompletado
+LIMITE_RESULTADOS = 100
+LIMITE_AUTOCOMPLETAR = 10
+LIMITE_INFRACTORES = 20
+
+
+def normalizar_usuario(nombre):
+    """Forma canónica del nombre de usuario para indexar y buscar"""
+    return nombre.strip().lower()
+
+
+def trigramas(texto):
+    """Conjunto de subcadenas de 3 caracteres de un texto ya normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def actualizar_usuario_indexado(canal_id, nombre_usuario):
+    """
+    Recalcula la fila de UsuarioBaneado para un usuario de un canal.
+    Se llama desde las señales de Baneos; si el usuario ya no tiene baneos se borra.
+    """
+    if canal_id is None:
+        return
+
+    baneos = Baneos.objects.filter(canal_id=canal_id, nombre_usuario=nombre_usuario)
+    resumen = baneos.aggregate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+    )
+
+    if not resumen['total']:
+        UsuarioBaneado.objects.filter(canal_id=canal_id, nombre_usuario=nombre_usuario).delete()
+        actualizar_infractor(normalizar_usuario(nombre_usuario))
+        return
+
+    ultimo = baneos.order_by('-fecha_baneo', '-id').values('id', 'fecha_baneo').first()
+
+    with transaction.atomic():
+        usuario, creado = UsuarioBaneado.objects.update_or_create(
+            canal_id=canal_id,
+            nombre_usuario=nombre_usuario,
+            defaults={
+                'nombre_normalizado': normalizar_usuario(nombre_usuario),
+                'total_baneos': resumen['total'],
+                'baneos_activos': resumen['activos'],
+                'ultimo_baneo_id': ultimo['id'],
+                'fecha_ultimo_baneo': ultimo['fecha_baneo'],
+            }
+        )
+        # El nombre no cambia para una misma fila, así que los trigramas solo se crean una vez
+        if creado:
+            TrigramaUsuario.objects.bulk_create([
+                TrigramaUsuario(canal_id=canal_id, usuario=usuario, trigrama=trigrama)
+                for trigrama in trigramas(usuario.nombre_normalizado)
+            ])
+        actualizar_infractor(usuario.nombre_normalizado)
+
+
+def actualizar_infractor(nombre_normalizado):
+    """Recalcula el resumen global de un usuario a partir de sus filas de UsuarioBaneado"""
+    por_canal = UsuarioBaneado.objects.filter(nombre_normalizado=nombre_normalizado)
+    resumen = por_canal.aggregate(
+        total_canales=Count('canal', distinct=True),
+        canales_con_activos=Count('canal', filter=Q(baneos_activos__gt=0), distinct=True),
+        total_baneos=Sum('total_baneos'),
+        baneos_activos=Sum('baneos_activos'),
+        fecha_ultimo_baneo=Max('fecha_ultimo_baneo'),
+    )
+
+    if not resumen['total_canales']:
+        Infractor.objects.filter(nombre_normalizado=nombre_normalizado).delete()
+        return
+
+    resumen['nombre_usuario'] = por_canal.order_by('-fecha_ultimo_baneo').values_list(
+        'nombre_usuario', flat=True
+    ).first()
+    Infractor.objects.update_or_create(nombre_normalizado=nombre_normalizado, defaults=resumen)
+
+
+def actualizar_usuarios_indexados(queryset):
+    """
+    Recalcula los usuarios afectados por un queryset de Baneos que siguen
+    teniendo esos baneos (ej. acciones masivas de activar o desactivar), en
+    bloque por canal: un número fijo de consultas por canal en lugar de varias por usuario.
+    """
+    por_canal = defaultdict(set)
+    for canal_id, nombre_usuario in queryset.order_by().values_list('canal_id', 'nombre_usuario').distinct():
+        por_canal[canal_id].add(nombre_usuario)
+    for canal_id, nombres in por_canal.items():
+        indexar_usuarios_en_bloque(canal_id, nombres)
+
+
+def indexar_usuarios_en_bloque(canal_id, nombres):
+    """
+    Versión por lotes de actualizar_usuario_indexado para usuarios que acaban de
+    recibir baneos (ej. un bulk_create), con un número fijo de consultas por lote
+    en lugar de varias por usuario.
+    """
+    nombres = list(set(nombres))
+    if canal_id is None or not nombres:
+        return
+
+    baneos = Baneos.objects.filter(canal_id=canal_id, nombre_usuario__in=nombres)
+    resumenes = baneos.order_by().values('nombre_usuario').annotate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+        fecha_ultimo=Max('fecha_baneo'),
+    )
+    # El último baneo de cada usuario en una sola pasada por baneo_canal_usuario_idx: como
+    # subconsulta correlacionada SQLite la resolvía recorriendo todos los baneos del canal por usuario
+    ultimos = {}
+    for nombre_usuario, baneo_id in baneos.order_by('nombre_usuario', '-fecha_baneo', '-id').values_list(
+        'nombre_usuario', 'id'
+    ):
+        ultimos.setdefault(nombre_usuario, baneo_id)
+
+    with transaction.atomic():
+        existentes = {
+            usuario.nombre_usuario: usuario
+            for usuario in UsuarioBaneado.objects.filter(canal_id=canal_id, nombre_usuario__in=nombres)
+        }
+        nuevos = []
+        for resumen in resumenes:
+            usuario = existentes.get(resumen['nombre_usuario']) or UsuarioBaneado(
+                canal_id=canal_id,
+                nombre_usuario=resumen['nombre_usuario'],
+                nombre_normalizado=normalizar_usuario(resumen['nombre_usuario']),
+            )
+            usuario.total_baneos = resumen['total']
+            usuario.baneos_activos = resumen['activos']
+            usuario.ultimo_baneo_id = ultimos[resumen['nombre_usuario']]
+            usuario.fecha_ultimo_baneo = resumen['fecha_ultimo']
+            if usuario.pk is None:
+                nuevos.append(usuario)
+
+        UsuarioBaneado.objects.bulk_update(
+            existentes.values(), ['total_baneos', 'baneos_activos', 'ultimo_baneo', 'fecha_ultimo_baneo']
+        )
+        UsuarioBaneado.objects.bulk_create(nuevos)
+        TrigramaUsuario.objects.bulk_create([
+            TrigramaUsuario(canal_id=canal_id, usuario=usuario, trigrama=trigrama)
+            for usuario in nuevos
+            for trigrama in trigramas(usuario.nombre_normalizado)
+        ])
+        _actualizar_infractores_en_bloque({normalizar_usuario(nombre) for nombre in nombres})
+
+
+def _actualizar_infractores_en_bloque(normalizados):
+    """actualizar_infractor para muchos nombres, que tienen al menos una fila en UsuarioBaneado"""
+    por_canal = UsuarioBaneado.objects.filter(nombre_normalizado=OuterRef('nombre_normalizado'))
+    resumenes = UsuarioBaneado.objects.filter(nombre_normalizado__in=normalizados).order_by().values(
+        'nombre_normalizado'
+    ).annotate(
+        total_canales=Count('canal', distinct=True),
+        canales_con_activos=Count('canal', filter=Q(baneos_activos__gt=0), distinct=True),
+        total_baneos_suma=Sum('total_baneos'),
+        baneos_activos_suma=Sum('baneos_activos'),
+        fecha=Max('fecha_ultimo_baneo'),
+        nombre=Subquery(por_canal.order_by('-fecha_ultimo_baneo').values('nombre_usuario')[:1]),
+    )
+    existentes = Infractor.objects.in_bulk(list(normalizados), field_name='nombre_normalizado')
+
+    nuevos = []
+    for resumen in resumenes:
+        infractor = existentes.get(resumen['nombre_normalizado']) or Infractor(
+            nombre_normalizado=resumen['nombre_normalizado']
+        )
+        infractor.nombre_usuario = resumen['nombre']
+        infractor.total_canales = resumen['total_canales']
+        infractor.canales_con_activos = resumen['canales_con_activos']
+        infractor.total_baneos = resumen['total_baneos_suma']
+        infractor.baneos_activos = resumen['baneos_activos_suma']
+        infractor.fecha_ultimo_baneo = resumen['fecha']
+        if infractor.pk is None:
+            nuevos.append(infractor)
+
+    Infractor.objects.bulk_update(existentes.values(), [
+        'nombre_usuario', 'total_canales', 'canales_con_activos',
+        'total_baneos', 'baneos_activos', 'fecha_ultimo_baneo',
+    ])
+    Infractor.objects.bulk_create(nuevos)
+
+
+def reconstruir_indice_usuarios():
+    """Regenera por completo UsuarioBaneado, TrigramaUsuario e Infractor a partir de Baneos"""
+    with transaction.atomic():
+        UsuarioBaneado.objects.all().delete()
+        Infractor.objects.all().delete()
+        pares = Baneos.objects.exclude(canal=None).order_by().values_list(
+            'canal_id', 'nombre_usuario'
+        ).distinct()
+        for canal_id, nombre_usuario in pares.iterator():
+            actualizar_usuario_indexado(canal_id, nombre_usuario)
+    return UsuarioBaneado.objects.count()
+
+
+def buscar_usuarios(canal, texto, limite=None):
+    """
+    Busca usuarios baneados en el canal y devuelve un queryset ordenado por relevancia:
+    coincidencia exacta, luego prefijo, luego subcadena; a igualdad, más baneos primero.
+    Los prefijos usan un rango sobre el índice (canal, nombre_normalizado) y las
+    subcadenas de 3 o más caracteres se resuelven con el índice de trigramas.
+    """
+    consulta = normalizar_usuario(texto)
+    usuarios = UsuarioBaneado.objects.filter(canal=canal)
+
+    if len(consulta) >= 3:
+        buscados = trigramas(consulta)
+        candidatos = TrigramaUsuario.objects.filter(
+            canal=canal,
+            trigrama__in=buscados
+        ).values('usuario_id').annotate(
+            coincidencias=Count('id')
+        ).filter(coincidencias=len(buscados)).values('usuario_id')
+        # Los trigramas no garantizan el orden, se confirma la subcadena sobre los candidatos
+        usuarios = usuarios.filter(id__in=candidatos, nombre_normalizado__contains=consulta)
+    else:
+        usuarios = usuarios.filter(
+            nombre_normalizado__gte=consulta,
+            nombre_normalizado__lt=consulta + '\uffff'
+        )
+
+    usuarios = usuarios.annotate(
+        rango=Case(
+            When(nombre_normalizado=consulta, then=Value(0)),
+            When(nombre_normalizado__startswith=consulta, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        )
+    ).order_by('rango', '-total_baneos', 'nombre_normalizado')
+
+    if limite:
+        usuarios = usuarios[:limite]
+    return usuarios
+
+
+def baneos_en_otros_canales(nombre_usuario, canal=None):
+    """
+    Dónde más está baneado un usuario: sus filas de UsuarioBaneado en los demás
+    canales, la más reciente primero (una sola búsqueda en usuario_normalizado_idx).
+    """
+    usuarios = UsuarioBaneado.objects.filter(
+        nombre_normalizado=normalizar_usuario(nombre_usuario)
+    ).select_related('canal').order_by('-fecha_ultimo_baneo')
+    if canal is not None:
+        usuarios = usuarios.exclude(canal=canal)
+    return usuarios
+
+
+def infractores_en_varios_canales(limite=LIMITE_INFRACTORES):
+    """Usuarios baneados en más de un canal, los más repartidos y recientes primero"""
+    return Infractor.objects.filter(total_canales__gt=1).order_by(
+        '-total_canales', '-fecha_ultimo_baneo'
+    )[:limite]
@@ -0,0 +1,180 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Nota
+
+
+NOTAS_POR_PAGINA = 20
+
+TABLA_FTS = 'core_nota_fts'
+
+# Marcas de resaltado que devuelve la base; se cambian por <mark> después de escapar el texto
+INICIO_MARCA = '\x02'
+FIN_MARCA = '\x03'
+
+PATRON_PALABRA = re.compile(r'\w+', re.UNICODE)
+# Operadores de FTS5 (solo en mayúsculas): quien los escribe espera que unan o
+# excluyan términos, no que la nota tenga que contener la palabra "and" u "or"
+OPERADORES = {'AND', 'OR', 'NOT', 'NEAR'}
+
+_fts_sqlite = None
+
+
+def motor():
+    """'sqlite' (FTS5), 'postgresql' (tsvector) o None si solo queda icontains"""
+    global _fts_sqlite
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor != 'sqlite':
+        return None
+    if _fts_sqlite is None:
+        # La tabla virtual no existe si SQLite se compiló sin FTS5
+        _fts_sqlite = TABLA_FTS in connection.introspection.table_names()
+    return 'sqlite' if _fts_sqlite else None
+
+
+def indexar_nota(nota):
+    """Reemplaza la fila de la nota en el índice FTS5 (PostgreSQL usa una columna generada)"""
+    if motor() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [nota.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLA_FTS} (rowid, titulo, nota, etiqueta) VALUES (%s, %s, %s, %s)',
+            [nota.pk, nota.titulo, nota.nota, nota.etiqueta]
+        )
+
+
+def desindexar_nota(nota_id):
+    if motor() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [nota_id])
+
+
+def reconstruir_indice_notas():
+    """Regenera el índice FTS5 completo; devuelve cuántas notas quedaron indexadas"""
+    if motor() != 'sqlite':
+        return Nota.objects.count()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS}')
+        cursor.execute(
+            f'INSERT INTO {TABLA_FTS} (rowid, titulo, nota, etiqueta) '
+            'SELECT id, titulo, nota, etiqueta FROM core_nota'
+        )
+        return cursor.rowcount
+
+
+def resaltar(texto):
+    """Escapa el texto y convierte las marcas de la base en <mark>"""
+    return mark_safe(
+        escape(texto).replace(INICIO_MARCA, '<mark>').replace(FIN_MARCA, '</mark>')
+    )
+
+
+def _palabras(texto):
+    return [palabra.lower() for palabra in PATRON_PALABRA.findall(texto) if palabra not in OPERADORES]
+
+
+def _consulta_sqlite(palabras):
+    # Cada palabra entre comillas (sin operadores de FTS5) y como prefijo
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _consulta_postgresql(palabras):
+    return ' & '.join(f'{palabra}:*' for palabra in palabras)
+
+
+def _ids_rankeados(canal, palabras, filtros, parametros, limite, desde):
+    """Ids de las notas que coinciden, mejor rango primero, con título y fragmento resaltados"""
+    if motor() == 'sqlite':
+        sql = f'''
+            SELECT n.id,
+                   highlight({TABLA_FTS}, 0, %s, %s),
+                   snippet({TABLA_FTS}, 1, %s, %s, '…', 32)
+            FROM {TABLA_FTS}
+            JOIN core_nota n ON n.id = {TABLA_FTS}.rowid
+            WHERE {TABLA_FTS} MATCH %s AND n.canal_id = %s {filtros}
+            ORDER BY bm25({TABLA_FTS}, 10.0, 1.0, 5.0), n.fecha_creacion DESC
+            LIMIT %s OFFSET %s
+        '''
+        marcas = [INICIO_MARCA, FIN_MARCA]
+        valores = marcas + marcas + [_consulta_sqlite(palabras), canal.id] + parametros + [limite, desde]
+    else:
+        opciones = f'StartSel={INICIO_MARCA}, StopSel={FIN_MARCA}'
+        sql = f'''
+            SELECT n.id,
+                   ts_headline('spanish', n.titulo, q, %s),
+                   ts_headline('spanish', n.nota, q, %s)
+            FROM core_nota n, to_tsquery('spanish', %s) q
+            WHERE n.busqueda @@ q AND n.canal_id = %s {filtros}
+            ORDER BY ts_rank(n.busqueda, q) DESC, n.fecha_creacion DESC
+            LIMIT %s OFFSET %s
+        '''
+        valores = [
+            opciones + ', HighlightAll=true',
+            opciones + ', MaxWords=40, MinWords=15',
+            _consulta_postgresql(palabras),
+            canal.id,
+        ] + parametros + [limite, desde]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, valores)
+        return cursor.fetchall()
+
+
+def buscar_notas(canal, texto='', tipo=None, importante=None, pagina=1, por_pagina=NOTAS_POR_PAGINA):
+    """
+    Notas del canal que coinciden con el texto (título, contenido o etiqueta),
+    ordenadas por relevancia, con filtros opcionales por tipo e importancia.
+    Devuelve (notas, hay_siguiente). Cada nota trae `titulo_resaltado` y `fragmento`.
+    """
+    pagina = max(pagina, 1)
+    desde = (pagina - 1) * por_pagina
+    palabras = _palabras(texto)
+
+    queryset = Nota.objects.filter(canal=canal)
+    if tipo:
+        queryset = queryset.filter(tipo=tipo)
+    if importante is not None:
+        queryset = queryset.filter(importante=importante)
+
+    if not palabras or motor() is None:
+        for palabra in palabras:
+            queryset = queryset.filter(
+                Q(titulo__icontains=palabra) | Q(nota__icontains=palabra) | Q(etiqueta__icontains=palabra)
+            )
+        notas = list(queryset.order_by('-fecha_creacion', '-id')[desde:desde + por_pagina + 1])
+        for nota in notas:
+            nota.titulo_resaltado = nota.titulo
+            nota.fragmento = nota.nota
+        return notas[:por_pagina], len(notas) > por_pagina
+
+    filtros = ''
+    parametros = []
+    if tipo:
+        filtros += ' AND n.tipo = %s'
+        parametros.append(tipo)
+    if importante is not None:
+        filtros += ' AND n.importante = %s'
+        parametros.append(importante)
+
+    filas = _ids_rankeados(canal, palabras, filtros, parametros, por_pagina + 1, desde)
+    por_id = Nota.objects.in_bulk([fila[0] for fila in filas])
+    notas = []
+    for nota_id, titulo, fragmento in filas[:por_pagina]:
+        nota = por_id[nota_id]
+        nota.titulo_resaltado = resaltar(titulo or '')
+        nota.fragmento = resaltar(fragmento or '')
+        notas.append(nota)
+    return notas, len(filas) > por_pagina
+
+
+# La búsqueda rankeada es SQL crudo y el ORM async no tiene cursores; las vistas
+# async la corren en el hilo de la base de datos
+abuscar_notas = sync_to_async(buscar_notas)
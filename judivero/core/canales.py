@@ -0,0 +1,79 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+
+from .models import CanalTwitch
+
+
+_canales = None
+_cargado_en = 0.0
+_lock = threading.Lock()
+
+
+def canales_activos():
+    """Canales activos ordenados por nombre, desde la caché del proceso"""
+    global _canales, _cargado_en
+    canales = _canales
+    if canales is None or time.monotonic() - _cargado_en > settings.CANALES_CACHE_TTL:
+        with _lock:
+            canales = tuple(CanalTwitch.objects.filter(activo=True))
+            _canales, _cargado_en = canales, time.monotonic()
+    return canales
+
+
+async def acanales_activos():
+    """Versión async de canales_activos; solo consulta la base cuando la caché venció"""
+    global _canales, _cargado_en
+    canales = _canales
+    if canales is None or time.monotonic() - _cargado_en > settings.CANALES_CACHE_TTL:
+        canales = tuple([canal async for canal in CanalTwitch.objects.filter(activo=True)])
+        _canales, _cargado_en = canales, time.monotonic()
+    return canales
+
+
+def invalidar_canales():
+    global _canales
+    _canales = None
+
+
+def canal_por_id(canal_id):
+    """
+    Canal activo con ese id o None. Devuelve una copia para que una vista que
+    modifique la instancia no altere la que comparten las demás peticiones.
+    """
+    for canal in canales_activos():
+        if canal.id == canal_id:
+            return copy.copy(canal)
+    return None
+
+
+async def acanal_por_id(canal_id):
+    for canal in await acanales_activos():
+        if canal.id == canal_id:
+            return copy.copy(canal)
+    return None
+
+
+def canal_de_sesion(request):
+    """Canal guardado en la sesión, o el primero disponible (que pasa a ser el de la sesión)"""
+    canal_id = request.session.get('canal_actual_id')
+    canal = canal_por_id(canal_id) if canal_id else None
+    if canal is None:
+        canales = canales_activos()
+        if canales:
+            canal = copy.copy(canales[0])
+            request.session['canal_actual_id'] = canal.id
+    return canal
+
+
+async def acanal_de_sesion(request):
+    canal_id = await request.session.aget('canal_actual_id')
+    canal = await acanal_por_id(canal_id) if canal_id else None
+    if canal is None:
+        canales = await acanales_activos()
+        if canales:
+            canal = copy.copy(canales[0])
+            await request.session.aset('canal_actual_id', canal.id)
+    return canal
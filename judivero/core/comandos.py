@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Comando
+
+
+# Rango de cada nivel según el orden de Comando.NIVEL (EVERYONE=0 … STREAMER=4)
+RANGOS = {nivel: rango for rango, (nivel, _) in enumerate(Comando.NIVEL)}
+
+ComandoResuelto = namedtuple('ComandoResuelto', ['id', 'nombre', 'respuesta', 'nivel_minimo'])
+
+# canal_id -> (cargado_en, {nombre normalizado: (rango mínimo, ComandoResuelto)})
+_tablas = {}
+_lock = threading.Lock()
+
+
+def normalizar_comando(nombre):
+    return nombre.strip().lower()
+
+
+def _cargar_tabla(canal_id):
+    tabla = {}
+    filas = Comando.objects.filter(canal_id=canal_id, activo=True).values_list(
+        'id', 'nombre', 'juego_o_significado', 'nivel_minimo'
+    )
+    for fila in filas:
+        rango = RANGOS.get(fila[3], len(RANGOS))
+        clave = normalizar_comando(fila[1])
+        # Dos comandos que solo difieren en mayúsculas: gana el de nivel más bajo
+        if clave not in tabla or rango < tabla[clave][0]:
+            tabla[clave] = (rango, ComandoResuelto(*fila))
+    return tabla
+
+
+def tabla_comandos(canal_id):
+    """Comandos activos del canal indexados por nombre normalizado, desde la caché del proceso"""
+    cargada = _tablas.get(canal_id)
+    if cargada is None or time.monotonic() - cargada[0] > settings.COMANDOS_CACHE_TTL:
+        with _lock:
+            cargada = (time.monotonic(), _cargar_tabla(canal_id))
+            _tablas[canal_id] = cargada
+    return cargada[1]
+
+
+def invalidar_comandos(canal_id):
+    """
+    Descarta la tabla del canal en este proceso al confirmar la transacción;
+    antes, otro hilo podría recargarla con los datos viejos y guardarla hasta
+    que venza COMANDOS_CACHE_TTL. Los demás procesos la recargan al vencer.
+    """
+    transaction.on_commit(partial(_tablas.pop, canal_id, None))
+
+
+def resolver_comando(canal, mensaje, nivel_usuario):
+    """
+    Comando que dispara un mensaje del chat (su primera palabra) si el usuario
+    tiene nivel suficiente; si no, None. Sin consultas mientras la tabla del canal
+    esté en caché.
+    """
+    partes = mensaje.split(None, 1)
+    if not partes:
+        return None
+    entrada = tabla_comandos(getattr(canal, 'pk', canal)).get(partes[0].lower())
+    if entrada is None or entrada[0] > RANGOS.get(nivel_usuario, -1):
+        return None
+    return entrada[1]
+
+
+# Nombre con el que lo llama el bot
+resolve = resolver_comando
@@ -0,0 +1,104 @@
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .canales import invalidar_canales
+from .eventos import publicar
+from .fragmentos import invalidar_fragmentos
+from .models import Baneos, CanalTwitch
+
+
+# Invalidaciones pendientes dentro de invalidaciones_en_bloque, por hilo
+_bloque = threading.local()
+
+
+@contextmanager
+def invalidaciones_en_bloque():
+    """
+    Junta las invalidaciones de la caché de canales y de fragmentos que piden
+    las señales y ajustar_contadores, y las hace una sola vez al salir (por
+    canal para los fragmentos) en lugar de una vez por baneo guardado.
+    """
+    if getattr(_bloque, 'fragmentos', None) is not None:
+        # Anidado: invalida el bloque de afuera
+        yield
+        return
+    _bloque.fragmentos, _bloque.canales = set(), False
+    try:
+        yield
+    finally:
+        fragmentos, canales = _bloque.fragmentos, _bloque.canales
+        _bloque.fragmentos = None
+        if canales:
+            invalidar_canales()
+        for canal_id in fragmentos:
+            invalidar_fragmentos(canal_id)
+
+
+def invalidar_canal(canal_id, contadores=True):
+    """
+    Invalida los fragmentos del canal y, si cambiaron sus contadores, los
+    canales en caché; dentro de invalidaciones_en_bloque lo deja para el final.
+    """
+    if getattr(_bloque, 'fragmentos', None) is not None:
+        _bloque.fragmentos.add(canal_id)
+        _bloque.canales = _bloque.canales or contadores
+        return
+    if contadores:
+        invalidar_canales()
+    invalidar_fragmentos(canal_id)
+
+
+def ajustar_contadores(canal_id, comandos=0, baneos=0, baneos_activos=0):
+    """Suma (o resta) a los contadores del canal con un UPDATE atómico"""
+    if canal_id is None:
+        return
+    cambios = {}
+    if comandos:
+        cambios['total_comandos'] = F('total_comandos') + comandos
+    if baneos:
+        cambios['total_baneos'] = F('total_baneos') + baneos
+    if baneos_activos:
+        cambios['total_baneos_activos'] = F('total_baneos_activos') + baneos_activos
+    if cambios:
+        CanalTwitch.objects.filter(pk=canal_id).update(**cambios)
+        # Los contadores viajan con los canales en caché; los fragmentos cubren también
+        # los cambios masivos (importación, expiración) que no pasan por señales
+        invalidar_canal(canal_id)
+
+
+def cambiar_estado_baneos(queryset, activo):
+    """
+    Activa o desactiva los baneos del queryset y ajusta los contadores de cada canal.
+    Solo toca las filas que realmente cambian; devuelve cuántas fueron.
+    """
+    a_cambiar = queryset.filter(activo=not activo)
+    with transaction.atomic():
+        por_canal = list(a_cambiar.order_by().values('canal_id').annotate(total=Count('id')))
+        # auto_now no se aplica en update(): sin esto la caché de reportes no vería el cambio
+        actualizados = a_cambiar.update(activo=activo, ultima_modificacion=timezone.now())
+        signo = 1 if activo else -1
+        for fila in por_canal:
+            ajustar_contadores(fila['canal_id'], baneos_activos=signo * fila['total'])
+            # El UPDATE masivo no dispara señales: los paneles abiertos recargan la tabla
+            transaction.on_commit(partial(publicar, fila['canal_id'], 'recargar_baneos'))
+    return actualizados
+
+
+def contadores_reales():
+    """Contadores recalculados desde cero para cada canal: {canal_id: (comandos, baneos, activos)}"""
+    comandos = dict(
+        CanalTwitch.objects.annotate(total=Count('comandos')).values_list('id', 'total')
+    )
+    baneos = Baneos.objects.exclude(canal=None).order_by().values('canal_id').annotate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+    )
+    reales = {canal_id: (total, 0, 0) for canal_id, total in comandos.items()}
+    for fila in baneos:
+        reales[fila['canal_id']] = (reales[fila['canal_id']][0], fila['total'], fila['activos'])
+    return reales
@@ -0,0 +1,14 @@
+from .estaticos import estaticos_compilados
+
+
+def canales(request):
+    """Selector de canales de base.html"""
+    return {
+        'canales': getattr(request, 'canales', ()),
+        'canal_actual': getattr(request, 'canal', None),
+    }
+
+
+def estaticos(request):
+    """Si ya existen el CSS de Tailwind y los íconos compilados (manage.py construir_estaticos)"""
+    return {'estaticos_compilados': estaticos_compilados()}
@@ -0,0 +1,124 @@
+import gzip
+import logging
+import os
+import re
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.views.static import serve
+
+
+logger = logging.getLogger(__name__)
+
+# Archivos generados por `manage.py construir_estaticos`
+TAILWIND_CSS = 'core/build/tailwind.css'
+ICONOS_CSS = 'core/build/iconos.css'
+
+# Extensiones que vale la pena comprimir (woff2, png, jpg y webp ya vienen comprimidos)
+COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.ttf', '.eot'}
+# Por debajo de esto la cabecera del .gz ocupa más de lo que ahorra
+MINIMO_PARA_COMPRIMIR = 512
+
+# Nombres con hash del manifiesto (ej. judivero.3f1c2a9b7e10.js): su contenido no cambia nunca
+_CON_HASH = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+UN_ANIO = 365 * 24 * 60 * 60
+
+
+# Cada cuánto se vuelve a mirar si ya se compilaron (no hace falta reiniciar tras construir_estaticos)
+REVISAR_COMPILADOS_CADA = 30
+_compilados = (None, 0.0)
+
+
+def estaticos_compilados():
+    global _compilados
+    valor, revisado_en = _compilados
+    if valor is None or time.monotonic() - revisado_en > REVISAR_COMPILADOS_CADA:
+        valor = bool(finders.find(TAILWIND_CSS) and finders.find(ICONOS_CSS))
+        _compilados = (valor, time.monotonic())
+    return valor
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """
+    Manifest con nombres con hash y, además, una copia .gz (y .br si está
+    instalado el paquete brotli) de cada archivo de texto, para que nginx
+    (gzip_static/brotli_static) o servir_estatico los entreguen sin comprimir
+    en cada petición.
+
+    Un archivo que no está en el manifiesto (collectstatic todavía no corrió)
+    se enlaza con su nombre sin hash en lugar de dar un 500 con DEBUG=False.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Tampoco está en STATIC_ROOT, así que no se puede calcular el hash
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        brotli = _brotli()
+        if brotli is None:
+            logger.warning('Sin el paquete brotli solo se generan las copias .gz')
+        for nombre in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(nombre)[1] in COMPRIMIBLES:
+                self._comprimir(nombre, brotli)
+
+    def _comprimir(self, nombre, brotli):
+        ruta = self.path(nombre)
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        if len(contenido) < MINIMO_PARA_COMPRIMIR:
+            return
+        versiones = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            versiones['.br'] = brotli.compress(contenido, quality=11)
+        for extension, comprimido in versiones.items():
+            # Si no ahorra nada se sirve el original
+            if len(comprimido) < len(contenido):
+                with open(ruta + extension, 'wb') as archivo:
+                    archivo.write(comprimido)
+
+
+def servir_estatico(request, ruta):
+    """
+    Sirve STATIC_ROOT desde Django para instalaciones sin nginx (laptops de
+    moderación sin conexión): elige la copia .br o .gz según Accept-Encoding y
+    marca los nombres con hash como inmutables por un año.
+    """
+    aceptadas = request.headers.get('Accept-Encoding', '')
+    respuesta = None
+    for codificacion, extension in (('br', '.br'), ('gzip', '.gz')):
+        if codificacion in aceptadas:
+            try:
+                # serve() deduce el Content-Type del nombre original y pone Content-Encoding
+                respuesta = serve(request, ruta + extension, document_root=settings.STATIC_ROOT)
+                break
+            except Http404:
+                continue
+    if respuesta is None:
+        respuesta = serve(request, ruta, document_root=settings.STATIC_ROOT)
+
+    if _CON_HASH.search(ruta):
+        respuesta['Cache-Control'] = f'public, max-age={UN_ANIO}, immutable'
+    else:
+        respuesta['Cache-Control'] = 'public, no-cache'
+    patch_vary_headers(respuesta, ['Accept-Encoding'])
+    return respuesta
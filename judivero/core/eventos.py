@@ -0,0 +1,112 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+
+
+logger = logging.getLogger(__name__)
+
+# Eventos pendientes por conexión; si un cliente lento llena su cola se le
+# manda una recarga en lugar de seguir acumulando
+MAXIMO_EN_COLA = 100
+# Segundos sin eventos tras los que se manda un comentario para mantener viva la conexión
+INTERVALO_PING = 15
+
+# canal_id -> conjunto de (loop, cola) de las conexiones abiertas en este proceso
+_suscriptores = {}
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def hay_suscriptores(canal_id):
+    return bool(_suscriptores.get(canal_id))
+
+
+def publicar(canal_id, tipo, **datos):
+    """
+    Envía un evento a todas las conexiones abiertas del canal en este proceso.
+    Se puede llamar desde cualquier hilo (señales, comandos, vistas sync).
+    """
+    with _lock:
+        suscriptores = list(_suscriptores.get(canal_id, ()))
+    if not suscriptores:
+        return
+    evento = dict(datos, tipo=tipo, evento_id=next(_ids))
+    for loop, cola in suscriptores:
+        try:
+            loop.call_soon_threadsafe(_encolar, cola, evento)
+        except RuntimeError:
+            # El loop de esa conexión ya cerró; escuchar() la quita al terminar
+            pass
+
+
+def _encolar(cola, evento):
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Se descartan los eventos que no entran y el cliente recarga las tablas al leer este
+        cola.get_nowait()
+        cola.put_nowait({'tipo': 'recargar', 'evento_id': evento['evento_id']})
+        logger.warning('Cola de eventos llena, se pide recarga al cliente')
+
+
+def _formato_sse(evento):
+    datos = json.dumps(evento, cls=DjangoJSONEncoder)
+    return f"id: {evento['evento_id']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+async def escuchar(canal_id):
+    """Generador async con el texto SSE de los eventos del canal, hasta que el cliente se desconecta"""
+    suscriptor = (asyncio.get_running_loop(), asyncio.Queue(MAXIMO_EN_COLA))
+    with _lock:
+        _suscriptores.setdefault(canal_id, set()).add(suscriptor)
+    try:
+        # Reintentar a los 3 s si se corta la conexión
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscriptor[1].get(), INTERVALO_PING)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield _formato_sse(evento)
+    finally:
+        with _lock:
+            conexiones = _suscriptores.get(canal_id, set())
+            conexiones.discard(suscriptor)
+            if not conexiones:
+                _suscriptores.pop(canal_id, None)
+
+
+def publicar_baneo(baneo, accion):
+    if not hay_suscriptores(baneo.canal_id):
+        return
+    html = '' if accion == 'borrado' else render_to_string(
+        'core/partials/filas_baneos.html', {'baneos': [baneo]}
+    ).strip()
+    publicar(baneo.canal_id, 'baneo', accion=accion, id=baneo.id, html=html)
+
+
+def publicar_comando(comando, accion):
+    if not hay_suscriptores(comando.canal_id):
+        return
+    html = '' if accion == 'borrado' else render_to_string(
+        'core/partials/filas_comandos.html', {'comandos': [comando]}
+    ).strip()
+    publicar(comando.canal_id, 'comando', accion=accion, id=comando.id, html=html)
+
+
+def publicar_nota(nota, accion):
+    if not hay_suscriptores(nota.canal_id):
+        return
+    html = ''
+    if accion != 'borrado':
+        # Sin búsqueda no hay resaltado: la tarjeta muestra el texto tal cual
+        nota.titulo_resaltado = nota.titulo
+        nota.fragmento = nota.nota
+        html = render_to_string('core/partials/tarjetas_notas.html', {'notas': [nota]}).strip()
+    publicar(nota.canal_id, 'nota', accion=accion, id=nota.id, importante=nota.importante, html=html)
@@ -0,0 +1,148 @@
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .imagenes import FORMATOS, TAMANOS, ruta_variante
+from .models import ArchivoEvidencia, Baneos
+
+
+def almacenamiento():
+    return Baneos._meta.get_field('imagen').storage
+
+
+def sumar_referencia(nombre):
+    """Registra que un baneo más apunta al archivo"""
+    storage = almacenamiento()
+    if not nombre or not storage.es_por_contenido(nombre):
+        return
+    archivo, _ = ArchivoEvidencia.objects.get_or_create(
+        nombre=nombre,
+        defaults={'tamano': storage.size(nombre) if storage.exists(nombre) else None}
+    )
+    ArchivoEvidencia.objects.filter(pk=archivo.pk).update(referencias=F('referencias') + 1)
+
+
+def restar_referencia(nombre):
+    if not nombre or not almacenamiento().es_por_contenido(nombre):
+        return
+    ArchivoEvidencia.objects.filter(nombre=nombre).update(referencias=F('referencias') - 1)
+
+
+def recontar_referencias():
+    """Recalcula los contadores a partir de Baneos; devuelve cuántos archivos cambiaron"""
+    storage = almacenamiento()
+    reales = {
+        fila['imagen']: fila['total']
+        for fila in Baneos.objects.exclude(imagen='').exclude(imagen=None).order_by().values('imagen').annotate(
+            total=Count('id')
+        )
+        if storage.es_por_contenido(fila['imagen'])
+    }
+
+    cambios = 0
+    for archivo in ArchivoEvidencia.objects.all():
+        total = reales.pop(archivo.nombre, 0)
+        if archivo.referencias != total:
+            ArchivoEvidencia.objects.filter(pk=archivo.pk).update(referencias=total)
+            cambios += 1
+
+    for nombre, total in reales.items():
+        ArchivoEvidencia.objects.create(
+            nombre=nombre,
+            referencias=total,
+            tamano=storage.size(nombre) if storage.exists(nombre) else None,
+        )
+        cambios += 1
+    return cambios
+
+
+def _borrar_variantes(storage, hash_archivo):
+    # Las variantes se comparten por hash; solo se borran si ya ningún baneo las usa
+    if Baneos.objects.filter(imagen_hash=hash_archivo).exists():
+        return
+    for tamano in TAMANOS:
+        for formato in FORMATOS:
+            ruta = ruta_variante(hash_archivo, tamano, formato)
+            if storage.exists(ruta):
+                storage.delete(ruta)
+
+
+def _archivos_en_disco(storage):
+    """Nombres de todos los archivos direccionados por contenido que hay en el almacenamiento"""
+    if not storage.exists(storage.prefijo):
+        return
+    carpetas, _ = storage.listdir(storage.prefijo)
+    for carpeta in carpetas:
+        _, archivos = storage.listdir(posixpath.join(storage.prefijo, carpeta))
+        for archivo in archivos:
+            nombre = posixpath.join(storage.prefijo, carpeta, archivo)
+            if storage.es_por_contenido(nombre):
+                yield nombre
+
+
+def _es_reciente(storage, nombre, limite):
+    try:
+        return storage.get_modified_time(nombre) > limite
+    except FileNotFoundError:
+        return False
+
+
+def recolectar_huerfanos(simular=False, gracia=None):
+    """
+    Borra los archivos sin referencias (y sus variantes) y los archivos en disco
+    que no figuran en ArchivoEvidencia. Antes de borrar confirma contra Baneos que
+    de verdad nadie los usa. Los archivos y registros más nuevos que `gracia`
+    segundos (settings.EVIDENCIAS_GRACIA por defecto) se dejan: pueden ser una
+    subida cuyo baneo todavía no se guardó. Devuelve (archivos_borrados, bytes_liberados).
+    """
+    storage = almacenamiento()
+    borrados = 0
+    liberados = 0
+    if gracia is None:
+        gracia = settings.EVIDENCIAS_GRACIA
+    limite = timezone.now() - timedelta(seconds=gracia)
+
+    registrados = set(ArchivoEvidencia.objects.values_list('nombre', flat=True))
+    candidatos = list(
+        ArchivoEvidencia.objects.filter(referencias__lte=0, fecha_creacion__lte=limite).values_list('nombre', flat=True)
+    )
+    candidatos += [
+        nombre for nombre in _archivos_en_disco(storage)
+        if nombre not in registrados and not _es_reciente(storage, nombre, limite)
+    ]
+
+    for nombre in candidatos:
+        en_uso = Baneos.objects.filter(imagen=nombre).count()
+        if en_uso:
+            ArchivoEvidencia.objects.update_or_create(nombre=nombre, defaults={'referencias': en_uso})
+            continue
+
+        if storage.exists(nombre):
+            liberados += storage.size(nombre)
+            if not simular:
+                storage.delete(nombre)
+        if not simular:
+            _borrar_variantes(storage, storage.hash_de(nombre))
+            ArchivoEvidencia.objects.filter(nombre=nombre).delete()
+        borrados += 1
+
+    return borrados, liberados
+
+
+def migrar_a_contenido(baneo, conservar_original=False):
+    """Mueve la evidencia de un baneo con ruta antigua al almacenamiento por contenido"""
+    storage = almacenamiento()
+    anterior = baneo.imagen.name
+    if not anterior or storage.es_por_contenido(anterior) or not storage.exists(anterior):
+        return False
+
+    with storage.open(anterior, 'rb') as archivo:
+        nuevo = storage.save(posixpath.join(storage.prefijo, posixpath.basename(anterior)), archivo)
+
+    Baneos.objects.filter(pk=baneo.pk).update(imagen=nuevo)
+    if not conservar_original and not Baneos.objects.filter(imagen=anterior).exists():
+        storage.delete(anterior)
+    return True
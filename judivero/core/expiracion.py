@@ -0,0 +1,50 @@
+import logging
+from collections import defaultdict
+
+from django.utils import timezone
+
+from .busqueda import indexar_usuarios_en_bloque
+from .contadores import cambiar_estado_baneos
+from .models import Baneos
+
+
+logger = logging.getLogger(__name__)
+
+# Baneos por UPDATE y usuarios por reindexado, para no pasar el límite de parámetros de SQLite
+LOTE_EXPIRACION = 1000
+
+
+def baneos_vencidos(ahora=None):
+    """Baneos aún activos cuyo desbaneo ya pasó (usa baneo_expiracion_idx)"""
+    # Sin el orden por defecto (-fecha_baneo): con él SQLite prefiere recorrer baneo_fecha_idx entero
+    return Baneos.objects.filter(activo=True, desbaneo__lte=ahora or timezone.now()).order_by()
+
+
+def expirar_baneos(ahora=None):
+    """
+    Desactiva por lotes de ids todos los baneos vencidos, ajusta los contadores
+    de cada canal y reindexa a los usuarios afectados por lotes. Devuelve cuántos cambió.
+    """
+    ahora = ahora or timezone.now()
+    # Los vencidos salen del índice parcial; leer antes los pares (canal, usuario) con
+    # DISTINCT recorría baneo_canal_usuario_idx entero
+    vencidos = list(baneos_vencidos(ahora).values_list('id', 'canal_id', 'nombre_usuario'))
+    if not vencidos:
+        return 0
+
+    expirados = 0
+    for desde in range(0, len(vencidos), LOTE_EXPIRACION):
+        ids = [baneo_id for baneo_id, _, _ in vencidos[desde:desde + LOTE_EXPIRACION]]
+        # Solo cambia los que siguen activos: otro proceso pudo expirarlos mientras tanto
+        expirados += cambiar_estado_baneos(Baneos.objects.filter(pk__in=ids), activo=False)
+
+    usuarios = defaultdict(set)
+    for _, canal_id, nombre_usuario in vencidos:
+        usuarios[canal_id].add(nombre_usuario)
+    for canal_id, nombres in usuarios.items():
+        nombres = sorted(nombres)
+        for desde in range(0, len(nombres), LOTE_EXPIRACION):
+            indexar_usuarios_en_bloque(canal_id, nombres[desde:desde + LOTE_EXPIRACION])
+
+    logger.info('%s baneo(s) expirado(s)', expirados)
+    return expirados
@@ -0,0 +1,244 @@
+import csv
+import json
+import logging
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.text import get_valid_filename
+
+from . import procesos
+from .busqueda import buscar_usuarios
+from .models import Baneos, UsuarioBaneado
+
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque al copiar cada PDF dentro del ZIP (y de cada envío de la lista de baneos)
+TAMANO_BLOQUE = 64 * 1024
+
+# Filas que se leen de la base por vez al exportar la lista de baneos
+FILAS_POR_LECTURA = 2000
+
+COLUMNAS_BANEOS = ['nombre_usuario', 'motivo', 'fecha_baneo', 'desbaneo', 'activo', 'moderador', 'imagen']
+
+# Formatos de la lista de baneos y su tipo de contenido
+FORMATOS_BANEOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _SalidaZip:
+    """
+    Destino no buscable para ZipFile: acumula lo escrito hasta que el generador
+    lo entrega al cliente. zipfile usa descriptores de datos en este modo, así
+    que nunca necesita volver atrás en el archivo.
+    """
+
+    def __init__(self):
+        self._bloques = []
+
+    def write(self, datos):
+        self._bloques.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._bloques)
+        self._bloques = []
+        return datos
+
+
+def usuarios_a_exportar(canal, texto='', usuarios=None, solo_activos=False, solo_reincidentes=False):
+    """Nombres de los usuarios baneados del canal que cumplen los filtros, leídos de a poco"""
+    if texto:
+        seleccion = buscar_usuarios(canal, texto)
+    else:
+        seleccion = UsuarioBaneado.objects.filter(canal=canal).order_by('nombre_usuario')
+    if usuarios:
+        seleccion = seleccion.filter(nombre_usuario__in=usuarios)
+    if solo_activos:
+        seleccion = seleccion.filter(baneos_activos__gt=0)
+    if solo_reincidentes:
+        seleccion = seleccion.filter(total_baneos__gt=1)
+    return seleccion.values_list('nombre_usuario', flat=True).iterator()
+
+
+def _reportes_en_paralelo(canal_id, nombres, workers):
+    """
+    Genera (nombre_usuario, ruta, error) para cada usuario, renderizando los PDF
+    en un pool de procesos. Como mucho hay 2 × workers trabajos en vuelo, así que
+    la memoria no crece con la cantidad de usuarios exportados.
+    """
+    if workers <= 0:
+        for nombre in nombres:
+            try:
+                yield nombre, procesos.preparar_reporte(canal_id, nombre), None
+            except Exception as error:
+                logger.exception('Error al exportar el reporte de %s', nombre)
+                yield nombre, None, error
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=procesos.iniciar,
+    )
+    en_vuelo = deque()
+    try:
+        for nombre in nombres:
+            en_vuelo.append((nombre, executor.submit(procesos.preparar_reporte, canal_id, nombre)))
+            if len(en_vuelo) >= workers * 2:
+                yield _resultado(*en_vuelo.popleft())
+        while en_vuelo:
+            yield _resultado(*en_vuelo.popleft())
+    finally:
+        # Si el cliente corta la descarga no seguimos generando reportes
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _resultado(nombre, futuro):
+    try:
+        return nombre, futuro.result(), None
+    except Exception as error:
+        logger.exception('Error al exportar el reporte de %s', nombre)
+        return nombre, None, error
+
+
+def _nombre_en_zip(nombre, usados):
+    """
+    Nombre del PDF dentro del ZIP, sin repetir: `ok user` y `ok_user` quedan los
+    dos como ok_user, así que el segundo pasa a ok_user_2. Se compara sin
+    distinguir mayúsculas porque así descomprimen Windows y macOS.
+    """
+    base = get_valid_filename(nombre)
+    candidato = base
+    sufijo = 1
+    while candidato.lower() in usados:
+        sufijo += 1
+        candidato = f'{base}_{sufijo}'
+    usados.add(candidato.lower())
+    return f'{candidato}.pdf'
+
+
+def generar_zip_reportes(canal, nombres, workers=None):
+    """
+    Generador de bytes de un ZIP con el reporte PDF de cada usuario, pensado para
+    StreamingHttpResponse: cada PDF se copia por bloques desde la caché de
+    reportes en cuanto está listo, sin armar el ZIP completo en memoria.
+    """
+    if workers is None:
+        workers = settings.EXPORTACION_WORKERS
+
+    salida = _SalidaZip()
+    errores = []
+    usados = set()
+    # Los PDF ya vienen comprimidos; volver a comprimirlos solo gasta CPU
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for nombre, ruta, error in _reportes_en_paralelo(canal.id, nombres, workers):
+            if error is not None:
+                errores.append(f'{nombre}: {error}')
+                continue
+            if ruta is None:
+                continue
+
+            try:
+                nombre_zip = _nombre_en_zip(nombre, usados)
+                # borrar_versiones_anteriores puede haberlo quitado de la caché mientras tanto
+                origen = open(ruta, 'rb')
+            except (SuspiciousFileOperation, OSError) as error:
+                errores.append(f'{nombre}: {error}')
+                continue
+
+            with origen, archivo_zip.open(nombre_zip, 'w') as destino:
+                while True:
+                    bloque = origen.read(TAMANO_BLOQUE)
+                    if not bloque:
+                        break
+                    destino.write(bloque)
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+
+        if errores:
+            archivo_zip.writestr('errores.txt', '\n'.join(errores))
+
+    yield salida.vaciar()
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def _valores_baneo(fila):
+    return [
+        valor.isoformat() if hasattr(valor, 'isoformat') else ('' if valor is None else valor)
+        for valor in fila
+    ]
+
+
+def _linea_jsonl(valores):
+    return json.dumps(dict(zip(COLUMNAS_BANEOS, valores)), ensure_ascii=False) + '\n'
+
+
+def exportar_baneos(canal, formato='csv', solo_activos=False):
+    """
+    Generador de texto con la lista de baneos del canal en CSV o JSONL, del más
+    reciente al más antiguo. Las filas se leen con un iterador por bloques y se
+    envían en trozos de ~64 KB, así que nunca se carga la tabla entera.
+    """
+    baneos = Baneos.objects.filter(canal=canal)
+    if solo_activos:
+        baneos = baneos.filter(activo=True)
+    filas = baneos.order_by('-fecha_baneo', '-id').values_list(
+        'nombre_usuario', 'motivo', 'fecha_baneo', 'desbaneo', 'activo', 'user__username', 'imagen'
+    ).iterator(chunk_size=FILAS_POR_LECTURA)
+
+    if formato == 'csv':
+        linea = csv.writer(_Eco()).writerow
+        pendiente = [linea(COLUMNAS_BANEOS)]
+    else:
+        linea = _linea_jsonl
+        pendiente = []
+
+    tamano = 0
+    for fila in filas:
+        texto = linea(_valores_baneo(fila))
+        pendiente.append(texto)
+        tamano += len(texto)
+        if tamano >= TAMANO_BLOQUE:
+            yield ''.join(pendiente)
+            pendiente = []
+            tamano = 0
+    if pendiente:
+        yield ''.join(pendiente)
+
+
+async def aiterar(generador):
+    """
+    Recorre desde ASGI uno de los generadores síncronos de este módulo, pidiendo
+    cada bloque en el hilo de sync_to_async. Con un iterador síncrono Django
+    junta toda la respuesta en memoria antes de enviarla. Si el cliente corta
+    la descarga se cierra el generador, que libera el pool de procesos.
+    """
+    # thread_sensitive: el cursor de la base abierto por el generador no cambia de hilo
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    fin = object()
+    try:
+        while True:
+            bloque = await siguiente(generador, fin)
+            if bloque is fin:
+                return
+            yield bloque
+    finally:
+        await sync_to_async(generador.close, thread_sensitive=True)()
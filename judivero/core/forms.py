@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.validators import FileExtensionValidator
 from .models import Nota, Comando, Baneos
 
 
@@ -114,4 +115,57 @@ class BaneoForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Hacer que la imagen sea opcional
         self.fields['imagen'].required = False
-        self.fields['desbaneo'].required = False
\ No newline at end of file
+        self.fields['desbaneo'].required = False
+
+class ImportarBaneosForm(forms.Form):
+    """Baneo masivo: una lista de usuarios (pegada o en archivo CSV/JSON) con un motivo común"""
+    usuarios = forms.CharField(
+        required=False,
+        label='Usuarios',
+        widget=forms.Textarea(attrs={
+            'rows': 8,
+            'placeholder': 'Un usuario por línea, o un JSON como ["usuario1", "usuario2"]'
+        })
+    )
+    archivo = forms.FileField(
+        required=False,
+        label='Archivo CSV o JSON',
+        validators=[FileExtensionValidator(['csv', 'json', 'txt'])]
+    )
+    motivo = forms.CharField(
+        label='Motivo del baneo',
+        widget=forms.Textarea(attrs={
+            'rows': 3,
+            'placeholder': 'Ej: Hate raid del 18/10'
+        })
+    )
+    desbaneo = forms.DateTimeField(
+        required=False,
+        label='Fecha de desbaneo (Opcional)',
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+        help_text='Deja en blanco si los baneos son permanentes.'
+    )
+
+    # Tope del archivo subido; un raid de miles de cuentas ocupa bastante menos
+    TAMANO_MAXIMO = 2 * 1024 * 1024
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data.get('archivo')
+        if archivo and archivo.size > self.TAMANO_MAXIMO:
+            raise forms.ValidationError('El archivo no puede superar los 2 MB.')
+        return archivo
+
+    def clean(self):
+        datos = super().clean()
+        if not datos.get('usuarios', '').strip() and not datos.get('archivo'):
+            raise forms.ValidationError('Pega la lista de usuarios o sube un archivo.')
+        return datos
+
+    def texto_usuarios(self):
+        """(texto, formato) a importar: el archivo si se subió, si no lo pegado (formato autodetectado)"""
+        archivo = self.cleaned_data.get('archivo')
+        if archivo:
+            extension = archivo.name.rsplit('.', 1)[-1].lower()
+            formato = extension if extension in ('csv', 'json') else None
+            return archivo.read().decode('utf-8-sig', errors='replace'), formato
+        return self.cleaned_data['usuarios'], None
@@ -0,0 +1,68 @@
+import logging
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+from . import metricas
+
+
+logger = logging.getLogger(__name__)
+
+def _clave_version(canal_id):
+    return f'judivero:fragmentos:version:{canal_id}'
+
+
+def invalidar_fragmentos(canal_id):
+    """
+    Sube la versión del canal: los fragmentos anteriores dejan de leerse y caducan solos.
+    Se hace al confirmar la transacción; antes, otra petición podría volver a
+    guardar la tabla vieja bajo la versión nueva.
+    """
+    if canal_id is None:
+        return
+    transaction.on_commit(partial(_subir_version, canal_id))
+
+
+def _subir_version(canal_id):
+    clave = _clave_version(canal_id)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, time.time_ns() // 1_000_000, timeout=None)
+
+
+async def aversion_fragmentos(canal_id):
+    """
+    Versión actual de los fragmentos del canal. Si la clave no existe (o el
+    backend la descartó) se parte de la hora actual en ms, así una versión nueva
+    nunca coincide con fragmentos viejos que sigan en la caché.
+    """
+    clave = _clave_version(canal_id)
+    version = await cache.aget(clave)
+    if version is None:
+        await cache.aadd(clave, time.time_ns() // 1_000_000, timeout=None)
+        version = await cache.aget(clave)
+    return version
+
+
+async def afragmento_canal(canal_id, nombre, agenerar):
+    """
+    Devuelve el fragmento `nombre` del canal desde la caché o lo genera con
+    `await agenerar()` (un dict de valores, los HTML ya renderizados) y lo
+    guarda bajo la versión actual del canal.
+    """
+    clave = f'judivero:fragmentos:{nombre}:{canal_id}:{await aversion_fragmentos(canal_id)}'
+    valor = await cache.aget(clave)
+    # Aciertos y fallos en /metricas/ (judivero_cache_total{cache="fragmentos"})
+    metricas.registrar_cache('fragmentos', valor is not None)
+    if valor is None:
+        valor = await agenerar()
+        await cache.aset(clave, valor, timeout=settings.FRAGMENTOS_CACHE_TTL)
+        logger.debug('Fragmento %s regenerado', clave)
+    # Al pasar por pickle (archivos, memcached) el HTML puede volver como str
+    return {campo: mark_safe(html) if campo.startswith('html') else html for campo, html in valor.items()}
+
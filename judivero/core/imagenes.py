@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor de cada variante, en píxeles (nunca se agranda la imagen)
+TAMANOS = {
+    'miniatura': 320,
+    'mediana': 800,
+    'grande': 1600,
+}
+
+# Formatos generados para cada tamaño y sus opciones de Pillow
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+CARPETA_VARIANTES = 'baneos/variantes'
+
+
+def hash_contenido(archivo):
+    """SHA-256 del contenido de un archivo, leído por bloques"""
+    sha = hashlib.sha256()
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(64 * 1024), b''):
+        sha.update(bloque)
+    archivo.seek(0)
+    return sha.hexdigest()
+
+
+def ruta_variante(hash_imagen, tamano, formato):
+    """Las variantes se guardan por hash, así dos subidas iguales comparten archivos"""
+    return posixpath.join(CARPETA_VARIANTES, hash_imagen[:2], hash_imagen, f'{tamano}.{formato}')
+
+
+def _preparar(imagen, formato):
+    """Convierte el modo de color a uno que el formato soporte"""
+    if formato == 'jpg' and imagen.mode != 'RGB':
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            imagen = imagen.convert('RGBA')
+            fondo.paste(imagen, mask=imagen.split()[-1])
+        else:
+            fondo.paste(imagen.convert('RGB'))
+        return fondo
+    if formato == 'webp' and imagen.mode not in ('RGB', 'RGBA'):
+        return imagen.convert('RGBA' if 'A' in imagen.getbands() or imagen.mode == 'P' else 'RGB')
+    return imagen
+
+
+def generar_variantes(archivo, hash_imagen, storage=None):
+    """
+    Crea las variantes redimensionadas de una imagen en WebP y JPEG.
+    Al recodificar se descartan EXIF y demás metadatos. Si las variantes de ese
+    hash ya existen no se vuelve a procesar nada. Devuelve False si el archivo no
+    es una imagen que Pillow pueda abrir (ej. SVG).
+    """
+    storage = storage or default_storage
+    if all(
+        storage.exists(ruta_variante(hash_imagen, tamano, formato))
+        for tamano in TAMANOS for formato in FORMATOS
+    ):
+        return True
+
+    try:
+        archivo.seek(0)
+        original = Image.open(archivo)
+        original.load()
+    except (UnidentifiedImageError, OSError):
+        return False
+    finally:
+        archivo.seek(0)
+
+    # Respetar la orientación de la cámara antes de perder el EXIF
+    original = ImageOps.exif_transpose(original)
+
+    for tamano, lado in TAMANOS.items():
+        variante = original.copy()
+        variante.thumbnail((lado, lado), Image.LANCZOS)
+        for formato, opciones in FORMATOS.items():
+            ruta = ruta_variante(hash_imagen, tamano, formato)
+            if storage.exists(ruta):
+                continue
+            salida = BytesIO()
+            _preparar(variante, formato).save(salida, **opciones)
+            storage.save(ruta, ContentFile(salida.getvalue()))
+
+    return True
+
+
+def procesar_imagen_baneo(baneo):
+    """
+    Calcula el hash de la evidencia de un baneo y genera sus variantes.
+    Devuelve (hash, hay_variantes).
+    """
+    if not baneo.imagen:
+        return '', False
+    with baneo.imagen.open('rb') as archivo:
+        hash_imagen = hash_contenido(archivo)
+        try:
+            procesada = generar_variantes(archivo, hash_imagen, storage=baneo.imagen.storage)
+        except Exception:
+            logger.exception('No se pudieron generar las variantes de %s', baneo.imagen.name)
+            procesada = False
+    return hash_imagen, procesada
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import re
+from functools import partial
+
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .busqueda import indexar_usuarios_en_bloque
+from .contadores import ajustar_contadores
+from .eventos import publicar
+from .models import Baneos
+
+
+# Baneos insertados por cada bulk_create
+TAMANO_LOTE = 500
+
+# Nombres de usuario de Twitch: letras, números y guion bajo, hasta 25 caracteres
+PATRON_USUARIO = re.compile(r'^[A-Za-z0-9_]{1,25}$')
+
+
+class ErrorImportacion(ValueError):
+    pass
+
+
+def _nombres_desde_csv(texto):
+    """Primera columna de cada fila; se salta una cabecera 'nombre_usuario' o 'usuario'"""
+    for numero, fila in enumerate(csv.reader(io.StringIO(texto))):
+        if not fila:
+            continue
+        valor = fila[0].strip()
+        if numero == 0 and valor.lower() in ('nombre_usuario', 'usuario', 'username'):
+            continue
+        yield valor
+
+
+def _nombres_desde_json(texto):
+    """Acepta ["a", "b"], [{"nombre_usuario": "a"}, …] o {"usuarios": [...]}"""
+    try:
+        datos = json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise ErrorImportacion(f'JSON inválido: {e}')
+    if isinstance(datos, dict):
+        datos = datos.get('usuarios', [])
+    if not isinstance(datos, list):
+        raise ErrorImportacion('Se esperaba una lista de usuarios')
+    for posicion, elemento in enumerate(datos, start=1):
+        if isinstance(elemento, dict):
+            elemento = elemento.get('nombre_usuario', '')
+        # str() convertiría null en "None" y un número o un objeto en un nombre
+        if not isinstance(elemento, str):
+            raise ErrorImportacion(f'Usuario {posicion}: se esperaba un nombre de usuario, no {json.dumps(elemento)}')
+        yield elemento.strip()
+
+
+def leer_usuarios(texto, formato=None):
+    """
+    Nombres de usuario de un texto CSV, JSON o uno por línea. Sin formato se
+    detecta por el primer carácter (`[` o `{` es JSON).
+    """
+    texto = texto.lstrip('\ufeff')
+    if formato is None:
+        formato = 'json' if texto.lstrip()[:1] in ('[', '{') else 'csv'
+    if formato == 'json':
+        return list(_nombres_desde_json(texto))
+    if formato == 'csv':
+        return list(_nombres_desde_csv(texto))
+    raise ErrorImportacion(f'Formato no soportado: {formato}')
+
+
+def importar_baneos(canal, nombres, motivo, user=None, desbaneo=None, tamano_lote=TAMANO_LOTE):
+    """
+    Crea un baneo por usuario con el mismo motivo, con bulk_create por lotes y
+    todo dentro de una transacción. Se omiten los nombres inválidos, los repetidos
+    en la lista y los que ya tienen un baneo activo en el canal (sin distinguir
+    mayúsculas). Como bulk_create no dispara señales, los contadores del canal se
+    ajustan una vez por lote y el índice de usuarios se actualiza en bloque.
+    """
+    resumen = {'creados': 0, 'ya_activos': [], 'repetidos': 0, 'invalidos': []}
+
+    unicos = {}
+    for nombre in nombres:
+        nombre = nombre.lstrip('@')
+        if not PATRON_USUARIO.match(nombre):
+            if nombre:
+                resumen['invalidos'].append(nombre)
+            continue
+        if nombre.lower() in unicos:
+            resumen['repetidos'] += 1
+            continue
+        unicos[nombre.lower()] = nombre
+
+    pendientes = list(unicos.items())
+    with transaction.atomic():
+        for inicio in range(0, len(pendientes), tamano_lote):
+            lote = dict(pendientes[inicio:inicio + tamano_lote])
+
+            # Usa baneo_usuario_lower_idx (canal, LOWER(nombre_usuario))
+            activos = set(
+                Baneos.objects.filter(canal=canal, activo=True).annotate(
+                    nombre_lower=Lower('nombre_usuario')
+                ).filter(nombre_lower__in=list(lote)).values_list('nombre_lower', flat=True)
+            )
+            resumen['ya_activos'].extend(lote[clave] for clave in lote if clave in activos)
+
+            nuevos = Baneos.objects.bulk_create([
+                Baneos(canal=canal, user=user, nombre_usuario=nombre, motivo=motivo, desbaneo=desbaneo)
+                for clave, nombre in lote.items() if clave not in activos
+            ])
+            if not nuevos:
+                continue
+
+            ajustar_contadores(canal.id, baneos=len(nuevos), baneos_activos=len(nuevos))
+            indexar_usuarios_en_bloque(canal.id, [baneo.nombre_usuario for baneo in nuevos])
+            resumen['creados'] += len(nuevos)
+
+        if resumen['creados']:
+            # bulk_create no dispara señales: los paneles abiertos recargan la tabla
+            transaction.on_commit(partial(publicar, canal.id, 'recargar_baneos'))
+
+    return resumen
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+
+
+RUTAS = ['/', '/notas/', '/buscar/', '/buscar/autocompletar/?q=a', '/api/canales/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara peticiones por segundo del handler WSGI (hilos) y del ASGI (tareas) '
+        'sobre las páginas de lectura, dentro del mismo proceso y sin servidor HTTP'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Moderador con el que se inicia sesión')
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por ruta')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Hilos (WSGI) o tareas (ASGI) a la vez')
+        parser.add_argument('--ruta', action='append', dest='rutas', help='Ruta a medir (repetible)')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No existe el usuario "{options["usuario"]}"')
+
+        for ruta in options['rutas'] or RUTAS:
+            wsgi = self._medir_wsgi(usuario, ruta, options['peticiones'], options['concurrencia'])
+            asgi = asyncio.run(self._medir_asgi(usuario, ruta, options['peticiones'], options['concurrencia']))
+            self.stdout.write(f'{ruta:<32} WSGI {wsgi:8.1f} req/s   ASGI {asgi:8.1f} req/s   ({asgi / wsgi:.2f}x)')
+
+    def _medir_wsgi(self, usuario, ruta, peticiones, concurrencia):
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookies = cliente.cookies
+
+        def pedir(_):
+            # Un cliente por petición: Client no es seguro entre hilos
+            local = Client()
+            local.cookies = cookies
+            try:
+                respuesta = local.get(ruta)
+            finally:
+                close_old_connections()
+            return respuesta.status_code
+
+        pedir(None)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(concurrencia) as pool:
+            estados = list(pool.map(pedir, range(peticiones)))
+        duracion = time.perf_counter() - inicio
+        self._revisar(ruta, estados)
+        return peticiones / duracion
+
+    async def _medir_asgi(self, usuario, ruta, peticiones, concurrencia):
+        cliente = AsyncClient()
+        await cliente.aforce_login(usuario)
+        limite = asyncio.Semaphore(concurrencia)
+
+        async def pedir():
+            async with limite:
+                return (await cliente.get(ruta)).status_code
+
+        await pedir()
+        inicio = time.perf_counter()
+        estados = await asyncio.gather(*(pedir() for _ in range(peticiones)))
+        duracion = time.perf_counter() - inicio
+        self._revisar(ruta, estados)
+        return peticiones / duracion
+
+    def _revisar(self, ruta, estados):
+        errores = [estado for estado in estados if estado >= 400]
+        if errores:
+            raise CommandError(f'{ruta}: {len(errores)} respuesta(s) con error ({errores[0]})')
@@ -0,0 +1,149 @@
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.estaticos import ICONOS_CSS, TAILWIND_CSS
+
+
+BASE = Path(settings.BASE_DIR)
+CORE = BASE / 'core'
+STATIC = CORE / 'static'
+FONT_AWESOME = BASE / 'node_modules' / '@fortawesome' / 'fontawesome-free'
+
+# Dónde se buscan clases de íconos (fa-*)
+FUENTES_ICONOS = ['templates/**/*.html', '*.py', 'static/core/js/**/*.js']
+
+# estilo -> (clases que lo eligen, familia, peso, archivo de la fuente)
+ESTILOS = {
+    'solid': ({'fas', 'fa-solid'}, 'Font Awesome 6 Free', 900, 'fa-solid-900.woff2'),
+    'regular': ({'far', 'fa-regular'}, 'Font Awesome 6 Free', 400, 'fa-regular-400.woff2'),
+    'brands': ({'fab', 'fa-brands'}, 'Font Awesome 6 Brands', 400, 'fa-brands-400.woff2'),
+}
+
+BASE_ICONOS = (
+    '.fa,.fas,.far,.fab,.fa-solid,.fa-regular,.fa-brands{-moz-osx-font-smoothing:grayscale;'
+    '-webkit-font-smoothing:antialiased;display:var(--fa-display,inline-block);font-style:normal;'
+    'font-variant:normal;line-height:1;text-rendering:auto}'
+)
+
+# Clases auxiliares de Font Awesome que usan las plantillas (tamaños y animaciones)
+AUXILIARES = {
+    'fw': '.fa-fw{text-align:center;width:1.25em}',
+    'spin': '.fa-spin{animation:fa-spin 2s linear infinite}',
+    'pulse': '.fa-pulse{animation:fa-spin 1s steps(8) infinite}',
+    'xs': '.fa-xs{font-size:.75em;line-height:.0833333337em;vertical-align:.125em}',
+    'sm': '.fa-sm{font-size:.875em;line-height:.0714285718em;vertical-align:.0535714295em}',
+    'lg': '.fa-lg{font-size:1.25em;line-height:.05em;vertical-align:-.075em}',
+    'xl': '.fa-xl{font-size:1.5em;line-height:.0416666682em;vertical-align:-.125em}',
+    '2xl': '.fa-2xl{font-size:2em;line-height:.03125em;vertical-align:-.1875em}',
+}
+ANIMACION_GIRO = '@keyframes fa-spin{0%{transform:rotate(0deg)}to{transform:rotate(1turn)}}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compila el CSS de Tailwind solo con las clases usadas, arma el subconjunto de íconos de '
+        'Font Awesome que aparecen en las plantillas y corre collectstatic (nombres con hash y copias .gz/.br). '
+        'Requiere `npm install` en la carpeta del proyecto (o `npm ci` una vez que exista '
+        'package-lock.json; el primer `npm install` lo genera y conviene commitearlo).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tailwind', default=str(BASE / 'node_modules' / '.bin' / 'tailwindcss'),
+            help='Ejecutable de Tailwind (también sirve el binario standalone)'
+        )
+        parser.add_argument('--sin-collectstatic', action='store_true', help='Solo generar core/static/core/build')
+
+    def handle(self, *args, **options):
+        if not FONT_AWESOME.is_dir():
+            raise CommandError(f'Falta {FONT_AWESOME}; corre `npm install` en {BASE}')
+
+        self._tailwind(options['tailwind'], STATIC / TAILWIND_CSS)
+        self._iconos(STATIC / ICONOS_CSS)
+
+        for ruta in sorted((STATIC / 'core' / 'build').rglob('*')):
+            if ruta.is_file():
+                self.stdout.write(f'{ruta.relative_to(STATIC)}: {ruta.stat().st_size / 1024:.1f} KB')
+
+        if not options['sin_collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+    def _tailwind(self, ejecutable, salida):
+        comando = [
+            ejecutable, '--config', str(BASE / 'tailwind.config.js'),
+            '--input', str(CORE / 'static_src' / 'tailwind.css'), '--output', str(salida), '--minify',
+        ]
+        try:
+            subprocess.run(comando, cwd=BASE, check=True)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            raise CommandError(f'No se pudo compilar Tailwind: {exc}')
+
+    def _clases_usadas(self):
+        clases = set()
+        for patron in FUENTES_ICONOS:
+            for ruta in CORE.glob(patron):
+                clases.update(re.findall(r'\bfa[srb]?(?:-[a-z0-9]+)*\b', ruta.read_text(encoding='utf-8')))
+        return clases
+
+    def _iconos(self, salida):
+        with open(FONT_AWESOME / 'metadata' / 'icons.json', encoding='utf-8') as archivo:
+            metadatos = json.load(archivo)
+        # Nombre o alias de FA 5 (fa-search, fa-times...) -> código del glifo
+        codigos = {}
+        for nombre, icono in metadatos.items():
+            for alias in [nombre, *icono.get('aliases', {}).get('names', [])]:
+                codigos[alias] = icono['unicode']
+
+        clases = self._clases_usadas()
+        estilos = [estilo for estilo, (selectores, *_) in ESTILOS.items() if selectores & clases]
+        nombres = sorted(clase[3:] for clase in clases if clase.startswith('fa-'))
+        auxiliares = [nombre for nombre in nombres if nombre in AUXILIARES or re.fullmatch(r'\d+x', nombre)]
+        iconos = {nombre: codigos[nombre] for nombre in nombres if nombre in codigos}
+        desconocidos = set(nombres) - set(iconos) - set(auxiliares) - {'solid', 'regular', 'brands'}
+        if desconocidos:
+            self.stderr.write(self.style.WARNING(f'Clases fa-* sin ícono: {", ".join(sorted(desconocidos))}'))
+
+        fuentes = salida.parent / 'webfonts'
+        fuentes.mkdir(parents=True, exist_ok=True)
+        reglas = [BASE_ICONOS]
+        for estilo in estilos:
+            selectores, familia, peso, archivo = ESTILOS[estilo]
+            self._fuente(FONT_AWESOME / 'webfonts' / archivo, fuentes / archivo, iconos.values())
+            reglas.append(
+                f"@font-face{{font-family:'{familia}';font-style:normal;font-weight:{peso};font-display:block;"
+                f"src:url(webfonts/{archivo}) format('woff2')}}"
+            )
+            reglas.append(f"{','.join('.' + s for s in sorted(selectores))}{{font-family:'{familia}';font-weight:{peso}}}")
+        for nombre in auxiliares:
+            reglas.append(AUXILIARES.get(nombre) or f'.fa-{nombre}{{font-size:{nombre[:-1]}em}}')
+        if {'spin', 'pulse'} & set(auxiliares):
+            reglas.append(ANIMACION_GIRO)
+        reglas += [f'.fa-{nombre}::before{{content:"\\{codigo}"}}' for nombre, codigo in iconos.items()]
+
+        salida.write_text('\n'.join(reglas) + '\n', encoding='utf-8')
+        self.stdout.write(f'{len(iconos)} íconos en {len(estilos)} estilo(s)')
+
+    def _fuente(self, origen, destino, codigos):
+        """Deja en la fuente solo los glifos usados; sin fontTools se copia entera"""
+        try:
+            import brotli  # noqa: F401 (fontTools lo necesita para escribir woff2)
+            from fontTools import subset
+        except ImportError:
+            self.stderr.write(self.style.WARNING(f'Sin fontTools y brotli se copia {origen.name} completa'))
+            shutil.copyfile(origen, destino)
+            return
+        opciones = subset.Options()
+        opciones.flavor = 'woff2'
+        opciones.layout_features = ['*']
+        fuente = subset.load_font(str(origen), opciones)
+        subconjunto = subset.Subsetter(opciones)
+        subconjunto.populate(unicodes=[int(codigo, 16) for codigo in codigos])
+        subconjunto.subset(fuente)
+        subset.save_font(fuente, str(destino), opciones)
@@ -0,0 +1,182 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.utils import load_backend
+
+
+ESQUEMA = [
+    'CREATE TABLE canal (id INTEGER PRIMARY KEY, total_baneos INTEGER NOT NULL DEFAULT 0)',
+    """CREATE TABLE baneo (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        canal_id INTEGER NOT NULL,
+        nombre_usuario TEXT NOT NULL,
+        motivo TEXT NOT NULL,
+        fecha_baneo REAL NOT NULL
+    )""",
+    'CREATE INDEX baneo_canal_fecha ON baneo (canal_id, fecha_baneo DESC)',
+    'INSERT INTO canal (id) VALUES (1)',
+]
+
+ALIAS = 'judivero_estres'
+
+
+def perfiles():
+    """(nombre, OPTIONS de la conexión) a comparar"""
+    base = settings.DATABASES['default']
+    if base['ENGINE'] != 'django.db.backends.sqlite3':
+        raise CommandError('La base configurada no es SQLite; no hay nada que comparar')
+    return [
+        # Lo que hacía Django con la configuración original: journal DELETE,
+        # 5 s de espera y transacciones DEFERRED
+        ('por defecto', {}),
+        ('settings', dict(base.get('OPTIONS', {}))),
+    ]
+
+
+def base_temporal(carpeta, opciones):
+    """Entrada de DATABASES para una base SQLite vacía dentro de carpeta"""
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(carpeta, 'estres.sqlite3'),
+        'OPTIONS': opciones,
+    }
+
+
+def probar(base, escritores=8, lectores=8, segundos=5.0):
+    """
+    Escrituras y lecturas concurrentes sobre la base SQLite `base` (una entrada
+    de DATABASES, que debe estar vacía) abierta con el backend de Django y sus
+    OPTIONS (timeout, transaction_mode, init_command), cada hilo con su
+    conexión. Devuelve cuántas escrituras y lecturas terminaron y cuántas
+    fallaron con "database is locked".
+    """
+    # configure_settings completa las claves que Django espera (AUTOCOMMIT, TIME_ZONE...)
+    configuracion = connections.configure_settings({DEFAULT_DB_ALIAS: dict(base)})[DEFAULT_DB_ALIAS]
+    backend = load_backend(configuracion['ENGINE'])
+
+    def conectar():
+        # Conexiones propias y no de django.db.connections: la base de la prueba
+        # no queda registrada en el proceso
+        return backend.DatabaseWrapper(configuracion, ALIAS)
+
+    conexion = conectar()
+    try:
+        with conexion.cursor() as cursor:
+            for sentencia in ESQUEMA:
+                cursor.execute(sentencia)
+    finally:
+        conexion.close()
+    return _concurrencia(conectar, escritores, lectores, segundos)
+
+
+@contextmanager
+def _transaccion(conexion):
+    """
+    transaction.atomic para una conexión fuera de django.db.connections:
+    abre la transacción como atomic (BEGIN con el transaction_mode de las
+    OPTIONS) y la confirma o la deshace al salir.
+    """
+    # transaction_mode se lee de las OPTIONS al conectar
+    conexion.ensure_connection()
+    conexion._start_transaction_under_autocommit()
+    try:
+        yield
+        conexion.cursor().execute('COMMIT')
+    except BaseException:
+        if conexion.connection.in_transaction:
+            conexion.cursor().execute('ROLLBACK')
+        raise
+
+
+def _concurrencia(conectar, escritores, lectores, segundos):
+    resultado = {'escrituras': 0, 'lecturas': 0, 'bloqueos': 0}
+    lock = threading.Lock()
+    fin = time.monotonic() + segundos
+
+    def sumar(campo):
+        with lock:
+            resultado[campo] += 1
+
+    def escritor(numero):
+        conexion = conectar()
+        contador = 0
+        try:
+            while time.monotonic() < fin:
+                contador += 1
+                usuario = f'raider_{numero}_{contador}'
+                try:
+                    # Como agregar_baneo: lee, inserta y ajusta el contador en una transacción
+                    with _transaccion(conexion), conexion.cursor() as cursor:
+                        cursor.execute(
+                            'SELECT COUNT(*) FROM baneo WHERE canal_id = 1 AND nombre_usuario = %s', [usuario]
+                        )
+                        cursor.fetchone()
+                        cursor.execute(
+                            'INSERT INTO baneo (canal_id, nombre_usuario, motivo, fecha_baneo) VALUES (1, %s, %s, %s)',
+                            [usuario, 'raid', time.time()],
+                        )
+                        cursor.execute('UPDATE canal SET total_baneos = total_baneos + 1 WHERE id = 1')
+                    sumar('escrituras')
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    sumar('bloqueos')
+        finally:
+            conexion.close()
+
+    def lector():
+        conexion = conectar()
+        try:
+            while time.monotonic() < fin:
+                try:
+                    with conexion.cursor() as cursor:
+                        cursor.execute('SELECT total_baneos FROM canal WHERE id = 1')
+                        cursor.fetchone()
+                        cursor.execute('SELECT * FROM baneo WHERE canal_id = 1 ORDER BY fecha_baneo DESC LIMIT 50')
+                        cursor.fetchall()
+                    sumar('lecturas')
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    sumar('bloqueos')
+        finally:
+            conexion.close()
+
+    hilos = [threading.Thread(target=escritor, args=(i,)) for i in range(escritores)]
+    hilos += [threading.Thread(target=lector) for _ in range(lectores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultado
+
+
+class Command(BaseCommand):
+    help = (
+        'Escrituras y lecturas concurrentes sobre una base SQLite temporal, con la '
+        'configuración por defecto de Django y con la de settings, contando los "database is locked"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=8, help='Hilos que registran baneos')
+        parser.add_argument('--lectores', type=int, default=8, help='Hilos que cargan la primera página')
+        parser.add_argument('--segundos', type=float, default=5.0, help='Duración de cada prueba')
+
+    def handle(self, *args, **options):
+        for nombre, opciones in perfiles():
+            with tempfile.TemporaryDirectory() as carpeta:
+                resultado = probar(
+                    base_temporal(carpeta, opciones), options['escritores'], options['lectores'], options['segundos']
+                )
+            estilo = self.style.SUCCESS if not resultado['bloqueos'] else self.style.WARNING
+            self.stdout.write(estilo(
+                f'{nombre:>12}: {resultado["escrituras"] / options["segundos"]:8.0f} escrituras/s, '
+                f'{resultado["lecturas"] / options["segundos"]:8.0f} lecturas/s, '
+                f'{resultado["bloqueos"]} "database is locked"'
+            ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.expiracion import expirar_baneos
+
+
+class Command(BaseCommand):
+    help = 'Desactiva los baneos cuyo desbaneo ya pasó y ajusta los contadores de los canales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Seguir revisando periódicamente en lugar de terminar tras una pasada'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=60.0,
+            help='Segundos entre pasadas en modo continuo'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expirados = expirar_baneos()
+            if expirados or not options['continuo']:
+                self.stdout.write(f'{expirados} baneo(s) expirado(s).')
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
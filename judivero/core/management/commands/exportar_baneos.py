@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportacion import FORMATOS_BANEOS, exportar_baneos
+from core.models import CanalTwitch
+
+
+class Command(BaseCommand):
+    help = 'Escribe la lista de baneos de un canal en CSV o JSONL, sin cargarla entera en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('canal', help='Nombre del canal')
+        parser.add_argument('--formato', choices=list(FORMATOS_BANEOS), default='csv')
+        parser.add_argument('--activos', action='store_true', help='Solo los baneos activos')
+        parser.add_argument('--salida', help='Archivo de destino; por defecto la salida estándar')
+
+    def handle(self, *args, **options):
+        try:
+            canal = CanalTwitch.objects.get(nombre=options['canal'])
+        except CanalTwitch.DoesNotExist:
+            raise CommandError(f'No existe el canal "{options["canal"]}"')
+
+        bloques = exportar_baneos(canal, options['formato'], solo_activos=options['activos'])
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as destino:
+                for bloque in bloques:
+                    destino.write(bloque)
+        else:
+            for bloque in bloques:
+                self.stdout.write(bloque, ending='')
@@ -0,0 +1,212 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core.busqueda import indexar_usuarios_en_bloque
+from core.busqueda_notas import reconstruir_indice_notas
+from core.canales import invalidar_canales
+from core.contadores import contadores_reales
+from core.evidencias import almacenamiento, recontar_referencias
+from core.fragmentos import invalidar_fragmentos
+from core.imagenes import procesar_imagen_baneo
+from core.models import Baneos, CanalTwitch, Comando, Nota
+
+
+TAMANO_LOTE = 5000
+# Usuarios por llamada a indexar_usuarios_en_bloque
+USUARIOS_POR_INDEXADO = 1000
+
+PREFIJOS_USUARIO = ['xX', 'el', 'la', 'dark', 'pro', 'mr', 'lil', 'real', 'not', 'the']
+PALABRAS_USUARIO = ['gamer', 'troll', 'ninja', 'pepe', 'kappa', 'spammer', 'bot', 'lobo', 'gato', 'raider']
+MOTIVOS = [
+    'Spam de links', 'Insultos en el chat', 'Hate raid', 'Bot de follows', 'Spoilers',
+    'Acoso a otro viewer', 'Evasión de ban', 'Publicidad de otro canal', 'Flood de emotes',
+]
+PALABRAS_NOTA = (
+    'regla spam raid viewer vip emote timeout ban streamer moderador comando evento sorteo '
+    'discord clip horario torneo colaboración advertencia reincidente troll bot'
+).split()
+
+
+def _insertar_con_fechas(objetos):
+    """
+    INSERT por lotes que conserva la fecha de cada objeto: bulk_create la pisaría con
+    auto_now_add, y apagarlo en Baneos._meta cambiaría el campo para todo el proceso
+    """
+    modelo = type(objetos[0])
+    campos = [campo for campo in modelo._meta.concrete_fields if not campo.primary_key]
+    columnas = ', '.join(connection.ops.quote_name(campo.column) for campo in campos)
+    marcadores = ', '.join(['%s'] * len(campos))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(modelo._meta.db_table)} ({columnas}) VALUES ({marcadores})',
+            [[campo.get_db_prep_save(getattr(objeto, campo.attname), connection) for campo in campos] for objeto in objetos],
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos para medir rendimiento: canales, baneos con usuarios '
+        'repartidos según Zipf, notas, comandos e imágenes de evidencia'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--canales', type=int, default=3)
+        parser.add_argument('--baneos', type=int, default=100000, help='Baneos en total, repartidos entre los canales')
+        parser.add_argument('--usuarios', type=int, default=50000, help='Nombres de usuario distintos')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Exponente de la distribución de usuarios')
+        parser.add_argument('--notas', type=int, default=300, help='Notas por canal')
+        parser.add_argument('--comandos', type=int, default=60, help='Comandos por canal')
+        parser.add_argument('--imagenes', type=int, default=20, help='Imágenes distintas de evidencia')
+        parser.add_argument('--con-imagen', type=float, default=0.02, help='Fracción de baneos con evidencia')
+        parser.add_argument('--activos', type=float, default=0.3, help='Fracción de baneos activos')
+        parser.add_argument('--dias', type=int, default=730, help='Antigüedad máxima de los baneos')
+        parser.add_argument('--prefijo', default='bench', help='Prefijo de los nombres de canal')
+        parser.add_argument('--moderador', default='bench', help='Usuario moderador (se crea si no existe)')
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        nombres = [f"{options['prefijo']}{numero}" for numero in range(1, options['canales'] + 1)]
+        existentes = CanalTwitch.objects.filter(nombre__in=nombres).values_list('nombre', flat=True)
+        if existentes:
+            raise CommandError(f'Ya existen los canales {", ".join(existentes)}; usa otro --prefijo')
+
+        azar = random.Random(options['semilla'])
+        moderador, creado = get_user_model().objects.get_or_create(username=options['moderador'])
+        if creado:
+            moderador.set_password(options['moderador'])
+            moderador.is_staff = True
+            moderador.save()
+
+        inicio = time.perf_counter()
+        usuarios = self._usuarios(options['usuarios'], azar)
+        pesos = list(itertools.accumulate(1 / rango ** options['zipf'] for rango in range(1, len(usuarios) + 1)))
+        imagenes = self._imagenes(options['imagenes'], azar)
+
+        canales = [
+            CanalTwitch.objects.create(nombre=nombre, streamer=nombre, descripcion='Datos sintéticos')
+            for nombre in nombres
+        ]
+        por_canal = options['baneos'] // len(canales)
+        for canal in canales:
+            self._comandos(canal, options['comandos'], azar)
+            self._notas(canal, moderador, options['notas'], azar)
+            baneados = self._baneos(canal, moderador, por_canal, usuarios, pesos, imagenes, azar, options)
+            self._indexar(canal, baneados)
+            self.stdout.write(f'{canal.nombre}: {por_canal} baneos de {len(baneados)} usuarios')
+
+        # bulk_create no dispara señales: contadores, índices y cachés se ponen al día al final
+        reales = contadores_reales()
+        for canal in canales:
+            comandos, baneos, activos = reales.get(canal.pk, (0, 0, 0))
+            CanalTwitch.objects.filter(pk=canal.pk).update(
+                total_comandos=comandos, total_baneos=baneos, total_baneos_activos=activos
+            )
+            invalidar_fragmentos(canal.pk)
+        invalidar_canales()
+        reconstruir_indice_notas()
+        recontar_referencias()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo en {time.perf_counter() - inicio:.1f} s. Moderador: {moderador.username}'
+        ))
+
+    def _usuarios(self, cantidad, azar):
+        usuarios = set()
+        while len(usuarios) < cantidad:
+            usuarios.add(
+                f'{azar.choice(PREFIJOS_USUARIO)}{azar.choice(PALABRAS_USUARIO)}{azar.randrange(10000)}'
+            )
+        usuarios = sorted(usuarios)
+        azar.shuffle(usuarios)
+        return usuarios
+
+    def _imagenes(self, cantidad, azar):
+        """Capturas falsas guardadas como evidencia; devuelve (nombre, hash, hay_variantes) por imagen"""
+        imagenes = []
+        for numero in range(cantidad):
+            imagen = Image.new('RGB', (800, 450), tuple(azar.randrange(256) for _ in range(3)))
+            dibujo = ImageDraw.Draw(imagen)
+            for linea in range(12):
+                dibujo.text((20, 20 + linea * 35), f'{azar.choice(PALABRAS_USUARIO)}: {azar.choice(MOTIVOS)}', fill='white')
+            salida = BytesIO()
+            imagen.save(salida, 'PNG')
+            nombre = almacenamiento().save(f'baneos/imagenes/bench_{numero}.png', ContentFile(salida.getvalue()))
+            hash_imagen, variantes = procesar_imagen_baneo(Baneos(imagen=nombre))
+            imagenes.append((nombre, hash_imagen, variantes))
+        return imagenes
+
+    def _comandos(self, canal, cantidad, azar):
+        niveles = [nivel for nivel, _ in Comando.NIVEL]
+        Comando.objects.bulk_create([
+            Comando(
+                canal=canal,
+                nombre=f'!{azar.choice(PALABRAS_NOTA)}{numero}',
+                juego_o_significado=' '.join(azar.choices(PALABRAS_NOTA, k=6)),
+                nivel_minimo=azar.choice(niveles),
+                activo=azar.random() < 0.9,
+            )
+            for numero in range(cantidad)
+        ])
+
+    def _notas(self, canal, moderador, cantidad, azar):
+        tipos = [tipo for tipo, _ in Nota.TIPO_NOTA]
+        Nota.objects.bulk_create([
+            Nota(
+                canal=canal,
+                user=moderador,
+                tipo=azar.choice(tipos),
+                titulo=' '.join(azar.choices(PALABRAS_NOTA, k=3)).capitalize(),
+                nota=' '.join(azar.choices(PALABRAS_NOTA, k=azar.randint(10, 80))),
+                etiqueta=azar.choice(['', 'troll', 'spam', 'viewer-vip']),
+                importante=azar.random() < 0.1,
+            )
+            for _ in range(cantidad)
+        ])
+
+    def _baneos(self, canal, moderador, cantidad, usuarios, pesos, imagenes, azar, options):
+        ahora = timezone.now()
+        segundos = options['dias'] * 86400
+        baneados = set()
+        with transaction.atomic():
+            for desde in range(0, cantidad, TAMANO_LOTE):
+                lote = []
+                nombres = azar.choices(usuarios, cum_weights=pesos, k=min(TAMANO_LOTE, cantidad - desde))
+                for nombre in nombres:
+                    fecha = ahora - timedelta(seconds=azar.randrange(segundos))
+                    activo = azar.random() < options['activos']
+                    baneo = Baneos(
+                        canal=canal,
+                        user=moderador,
+                        nombre_usuario=nombre,
+                        motivo=azar.choice(MOTIVOS),
+                        fecha_baneo=fecha,
+                        ultima_modificacion=fecha,
+                        activo=activo,
+                        # Los activos con fecha son temporales aún vigentes; los inactivos ya vencieron
+                        desbaneo=(
+                            fecha + timedelta(days=azar.randint(1, 30)) if not activo
+                            else ahora + timedelta(days=azar.randint(1, 30)) if azar.random() < 0.3
+                            else None
+                        ),
+                    )
+                    if imagenes and azar.random() < options['con_imagen']:
+                        baneo.imagen, baneo.imagen_hash, baneo.imagen_variantes = azar.choice(imagenes)
+                    lote.append(baneo)
+                _insertar_con_fechas(lote)
+                baneados.update(nombres)
+        return baneados
+
+    def _indexar(self, canal, baneados):
+        baneados = sorted(baneados)
+        for desde in range(0, len(baneados), USUARIOS_POR_INDEXADO):
+            indexar_usuarios_en_bloque(canal.pk, baneados[desde:desde + USUARIOS_POR_INDEXADO])
@@ -0,0 +1,54 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import ErrorImportacion, importar_baneos, leer_usuarios
+from core.models import CanalTwitch
+
+
+class Command(BaseCommand):
+    help = 'Banea en bloque una lista de usuarios (CSV o JSON) en un canal con un motivo común'
+
+    def add_arguments(self, parser):
+        parser.add_argument('canal', help='Nombre del canal')
+        parser.add_argument('archivo', help='Archivo CSV/JSON con los usuarios, o - para leer de la entrada estándar')
+        parser.add_argument('--motivo', required=True, help='Motivo que se guarda en todos los baneos')
+        parser.add_argument('--formato', choices=['csv', 'json'], help='Por defecto se detecta por el contenido')
+        parser.add_argument('--moderador', help='Usuario del sistema que figura como autor de los baneos')
+
+    def handle(self, *args, **options):
+        try:
+            canal = CanalTwitch.objects.get(nombre=options['canal'])
+        except CanalTwitch.DoesNotExist:
+            raise CommandError(f'No existe el canal "{options["canal"]}"')
+
+        moderador = None
+        if options['moderador']:
+            try:
+                moderador = get_user_model().objects.get(username=options['moderador'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No existe el usuario "{options["moderador"]}"')
+
+        if options['archivo'] == '-':
+            texto = sys.stdin.read()
+        else:
+            with open(options['archivo'], encoding='utf-8-sig') as archivo:
+                texto = archivo.read()
+
+        try:
+            nombres = leer_usuarios(texto, options['formato'])
+        except ErrorImportacion as error:
+            raise CommandError(str(error))
+
+        resumen = importar_baneos(canal, nombres, options['motivo'], user=moderador)
+
+        self.stdout.write(self.style.SUCCESS(f'{resumen["creados"]} baneo(s) creado(s) en {canal.nombre}.'))
+        if resumen['ya_activos']:
+            self.stdout.write(f'{len(resumen["ya_activos"])} ya tenían un baneo activo.')
+        if resumen['repetidos']:
+            self.stdout.write(f'{resumen["repetidos"]} repetido(s) en la lista.')
+        if resumen['invalidos']:
+            self.stdout.write(self.style.WARNING(
+                f'{len(resumen["invalidos"])} nombre(s) inválido(s): {", ".join(resumen["invalidos"][:20])}'
+            ))
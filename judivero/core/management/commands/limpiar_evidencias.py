@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.evidencias import recolectar_huerfanos, recontar_referencias
+
+
+class Command(BaseCommand):
+    help = 'Borra los archivos de evidencia que ya no usa ningún baneo (y sus variantes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo mostrar cuánto se liberaría, sin borrar nada'
+        )
+        parser.add_argument(
+            '--gracia',
+            type=int,
+            default=None,
+            help='Segundos que se respetan los archivos recién subidos (por defecto EVIDENCIAS_GRACIA)'
+        )
+        parser.add_argument(
+            '--recontar',
+            action='store_true',
+            help='Recalcular los contadores de referencias desde la tabla de baneos antes de limpiar'
+        )
+
+    def handle(self, *args, **options):
+        if options['recontar']:
+            cambios = recontar_referencias()
+            self.stdout.write(f'{cambios} contador(es) corregido(s).')
+
+        borrados, liberados = recolectar_huerfanos(simular=options['simular'], gracia=options['gracia'])
+        accion = 'se borrarían' if options['simular'] else 'borrado(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f'{borrados} archivo(s) {accion}, {liberados / (1024 * 1024):.2f} MB.'
+        ))
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.comandos import RANGOS, resolver_comando, tabla_comandos
+from core.models import CanalTwitch, Comando
+
+
+class Command(BaseCommand):
+    help = 'Mide cuánto tarda resolver_comando frente a consultar Comando con el ORM en cada mensaje'
+
+    def add_arguments(self, parser):
+        parser.add_argument('canal', help='Nombre del canal')
+        parser.add_argument(
+            '--mensajes',
+            type=int,
+            default=100000,
+            help='Mensajes simulados para la caché en memoria'
+        )
+        parser.add_argument(
+            '--mensajes-orm',
+            type=int,
+            default=2000,
+            help='Mensajes simulados para la consulta directa (es mucho más lenta)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            canal = CanalTwitch.objects.get(nombre=options['canal'])
+        except CanalTwitch.DoesNotExist:
+            raise CommandError(f'No existe el canal "{options["canal"]}"')
+
+        nombres = list(tabla_comandos(canal.pk)) or ['!hola']
+        niveles = list(RANGOS)
+        azar = random.Random(0)
+        # Mitad comandos, mitad chat normal, con niveles al azar
+        mensajes = [
+            (
+                f'{azar.choice(nombres)} @alguien' if azar.random() < 0.5 else 'jajaja buen stream',
+                azar.choice(niveles),
+            )
+            for _ in range(max(options['mensajes'], options['mensajes_orm']))
+        ]
+
+        inicio = time.perf_counter()
+        for mensaje, nivel in mensajes[:options['mensajes_orm']]:
+            self._resolver_con_orm(canal, mensaje, nivel)
+        orm = (time.perf_counter() - inicio) / options['mensajes_orm']
+
+        inicio = time.perf_counter()
+        encontrados = 0
+        for mensaje, nivel in mensajes[:options['mensajes']]:
+            if resolver_comando(canal, mensaje, nivel) is not None:
+                encontrados += 1
+        cache = (time.perf_counter() - inicio) / options['mensajes']
+
+        self.stdout.write(f'{len(nombres)} comando(s) activo(s) en {canal.nombre}')
+        self.stdout.write(f'ORM:    {orm * 1e6:10.2f} µs/mensaje')
+        self.stdout.write(f'Caché:  {cache * 1e6:10.2f} µs/mensaje ({encontrados} de {options["mensajes"]} resueltos)')
+        self.stdout.write(self.style.SUCCESS(f'{orm / cache:.0f}x más rápido'))
+
+    def _resolver_con_orm(self, canal, mensaje, nivel):
+        """Lo que haría el bot sin caché: una consulta por mensaje"""
+        comando = Comando.objects.filter(
+            canal=canal, activo=True, nombre__iexact=mensaje.split(None, 1)[0]
+        ).values_list('nivel_minimo', flat=True).first()
+        if comando is None or RANGOS[comando] > RANGOS[nivel]:
+            return None
+        return comando
@@ -0,0 +1,200 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import CanalTwitch, UsuarioBaneado
+from core.reportes import asegurar_reporte_en_cache, renderizar_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las vistas principales con el cliente de pruebas (latencia p50/p90/p99, '
+        'consultas y memoria pico) y guarda los resultados en JSON para comparar corridas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Moderador con el que se inicia sesión')
+        parser.add_argument('--canal', help='Canal a medir (por defecto el de más baneos)')
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument(
+            '--repeticiones-pdf', type=int, default=3,
+            help='Repeticiones de renderizar_pdf, que tarda segundos con usuarios de muchos baneos'
+        )
+        parser.add_argument('--salida', default='benchmark.json', help='Archivo JSON de resultados')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar la diferencia')
+        parser.add_argument('--solo', action='append', help='Medir solo estos escenarios (repetible)')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No existe el usuario "{options["usuario"]}"')
+
+        canales = CanalTwitch.objects.filter(activo=True)
+        canal = canales.filter(nombre=options['canal']).first() if options['canal'] else canales.order_by(
+            '-total_baneos'
+        ).first()
+        if canal is None:
+            raise CommandError('No hay canal para medir; genera datos con manage.py generar_datos')
+
+        # El usuario con más baneos del canal es el peor caso de perfil y reporte
+        reincidente = UsuarioBaneado.objects.filter(canal=canal).order_by('-total_baneos').first()
+        if reincidente is None:
+            raise CommandError(f'El canal {canal.nombre} no tiene baneos')
+        nombre = reincidente.nombre_usuario
+
+        cliente = Client()
+        cliente.force_login(usuario)
+        session = cliente.session
+        session['canal_actual_id'] = canal.id
+        session.save()
+
+        escenarios = {
+            'inicio': self._vista(cliente, reverse('inicio')),
+            'inicio_sin_cache': self._vista(cliente, reverse('inicio'), antes=cache.clear),
+            'baneos_pagina': self._vista(cliente, reverse('baneos_pagina')),
+            'notas_busqueda': self._vista(cliente, reverse('notas') + '?q=raid+spam'),
+            'perfil_usuario': self._vista(cliente, reverse('perfil_usuario', args=[nombre])),
+            'buscar_usuario': self._vista(cliente, reverse('buscar_usuario') + '?q=' + quote(nombre[:4])),
+            'autocompletar_usuario': self._vista(
+                cliente, reverse('autocompletar_usuario') + '?q=' + quote(nombre[:3])
+            ),
+            # Con el PDF ya en caché la vista lo descarga; la generación se mide aparte
+            'generar_reporte_pdf': self._vista(
+                cliente, reverse('generar_reporte_pdf', args=[nombre]),
+                preparar=lambda: asegurar_reporte_en_cache(canal, nombre),
+            ),
+            'renderizar_pdf': self._funcion(
+                lambda: renderizar_pdf(canal, nombre), repeticiones=options['repeticiones_pdf']
+            ),
+        }
+        if options['solo']:
+            escenarios = {clave: valor for clave, valor in escenarios.items() if clave in options['solo']}
+
+        resultados = {
+            'fecha': timezone.now().isoformat(),
+            'commit': self._commit(),
+            'python': platform.python_version(),
+            'base_de_datos': connection.vendor,
+            'canal': {'nombre': canal.nombre, 'baneos': canal.total_baneos, 'comandos': canal.total_comandos},
+            'usuario_medido': {'nombre': nombre, 'baneos': reincidente.total_baneos},
+            'repeticiones': options['repeticiones'],
+            'repeticiones_pdf': options['repeticiones_pdf'],
+            'escenarios': {},
+        }
+        for clave, medir in escenarios.items():
+            resultados['escenarios'][clave] = medir(options['repeticiones'])
+            self._mostrar(clave, resultados['escenarios'][clave])
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'Resultados en {options["salida"]}'))
+
+        if options['comparar']:
+            self._comparar(options['comparar'], resultados)
+
+    def _vista(self, cliente, url, antes=None, preparar=None):
+        def llamar():
+            if antes:
+                antes()
+            respuesta = cliente.get(url)
+            if respuesta.status_code >= 400:
+                raise CommandError(f'{url} respondió {respuesta.status_code}')
+            # Consumir las respuestas en streaming (FileResponse) para medir la descarga completa
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+
+        def medir(repeticiones):
+            if preparar:
+                preparar()
+            return self._medir(llamar, repeticiones)
+
+        return medir
+
+    def _funcion(self, funcion, repeticiones=None):
+        return lambda por_defecto: self._medir(funcion, repeticiones or por_defecto)
+
+    def _medir(self, llamar, repeticiones):
+        # Calentamiento: plantillas compiladas, cachés y conexiones listas
+        llamar()
+
+        tiempos = []
+        consultas = []
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                llamar()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+
+        # La memoria se mide en una pasada aparte: tracemalloc hace más lento todo lo demás
+        tracemalloc.start()
+        try:
+            llamar()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        tiempos.sort()
+        return {
+            'ms': {
+                'p50': round(self._percentil(tiempos, 50), 3),
+                'p90': round(self._percentil(tiempos, 90), 3),
+                'p99': round(self._percentil(tiempos, 99), 3),
+                'max': round(tiempos[-1], 3),
+                'media': round(statistics.fmean(tiempos), 3),
+            },
+            'consultas': {'mediana': statistics.median(consultas), 'max': max(consultas)},
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    def _percentil(self, ordenados, percentil):
+        posicion = (len(ordenados) - 1) * percentil / 100
+        abajo = int(posicion)
+        arriba = min(abajo + 1, len(ordenados) - 1)
+        return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+    def _mostrar(self, clave, resultado):
+        self.stdout.write(
+            f"{clave:<24} p50 {resultado['ms']['p50']:9.2f} ms  p90 {resultado['ms']['p90']:9.2f} ms  "
+            f"p99 {resultado['ms']['p99']:9.2f} ms  {resultado['consultas']['mediana']:5g} consultas  "
+            f"{resultado['memoria_pico_kb']:9.1f} KB"
+        )
+
+    def _comparar(self, ruta, actuales):
+        with open(ruta, encoding='utf-8') as archivo:
+            anteriores = json.load(archivo)
+        self.stdout.write(f"\nContra {ruta} ({anteriores.get('commit') or 'sin commit'}):")
+        for clave, actual in actuales['escenarios'].items():
+            anterior = anteriores['escenarios'].get(clave)
+            if anterior is None:
+                continue
+            cambio = (actual['ms']['p50'] - anterior['ms']['p50']) / anterior['ms']['p50'] * 100
+            estilo = self.style.SUCCESS if cambio <= 0 else self.style.WARNING
+            self.stdout.write(estilo(
+                f"{clave:<24} p50 {anterior['ms']['p50']:9.2f} → {actual['ms']['p50']:9.2f} ms ({cambio:+.1f}%)  "
+                f"consultas {anterior['consultas']['mediana']:g} → {actual['consultas']['mediana']:g}"
+            ))
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.evidencias import migrar_a_contenido, recontar_referencias
+from core.models import Baneos
+
+
+class Command(BaseCommand):
+    help = 'Mueve las imágenes de evidencia antiguas al almacenamiento direccionado por contenido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No borrar los archivos originales después de copiarlos'
+        )
+
+    def handle(self, *args, **options):
+        baneos = Baneos.objects.exclude(imagen='').exclude(imagen=None).only('id', 'imagen')
+        migrados = sum(
+            migrar_a_contenido(baneo, conservar_original=options['conservar'])
+            for baneo in baneos.iterator()
+        )
+        recontar_referencias()
+        self.stdout.write(self.style.SUCCESS(f'{migrados} imagen(es) migrada(s).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.imagenes import procesar_imagen_baneo
+from core.models import Baneos
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes (miniaturas WebP/JPEG) de las imágenes de evidencia que aún no las tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Reprocesar también las imágenes que ya tienen variantes'
+        )
+
+    def handle(self, *args, **options):
+        baneos = Baneos.objects.exclude(imagen='').exclude(imagen=None)
+        if not options['todas']:
+            baneos = baneos.filter(imagen_variantes=False)
+
+        procesados = 0
+        for baneo in baneos.only('id', 'imagen').iterator():
+            imagen_hash, variantes = procesar_imagen_baneo(baneo)
+            Baneos.objects.filter(pk=baneo.pk).update(imagen_hash=imagen_hash, imagen_variantes=variantes)
+            procesados += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{procesados} imagen(es) procesada(s).'))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import TrabajoReporte
+from core.reportes import liberar_colgados, procesar_trabajo, purgar_trabajos
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de reporte PDF pendientes (cola en la base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Seguir esperando trabajos nuevos en lugar de terminar al vaciar la cola'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos entre consultas a la cola en modo continuo'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            colgados = liberar_colgados()
+            if colgados:
+                self.stdout.write(f'{colgados} trabajo(s) colgado(s) vuelven a la cola')
+            purgados = purgar_trabajos()
+            if purgados:
+                self.stdout.write(f'{purgados} trabajo(s) terminado(s) borrado(s)')
+            pendientes = list(
+                TrabajoReporte.objects.filter(estado='PENDIENTE').order_by('fecha_creacion').values_list('pk', flat=True)
+            )
+            for trabajo_id in pendientes:
+                procesar_trabajo(trabajo_id)
+                estado = TrabajoReporte.objects.filter(pk=trabajo_id).values_list('estado', flat=True).first()
+                self.stdout.write(f'{trabajo_id}: {estado}')
+
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
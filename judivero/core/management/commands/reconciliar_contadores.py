@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from core.canales import invalidar_canales
+from core.contadores import contadores_reales
+from core.fragmentos import invalidar_fragmentos
+from core.models import CanalTwitch
+
+
+class Command(BaseCommand):
+    help = 'Compara los contadores guardados de cada canal con los valores reales y muestra los desvíos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Sobrescribir los contadores que no coincidan'
+        )
+
+    def handle(self, *args, **options):
+        reales = contadores_reales()
+        desvios = 0
+
+        for canal in CanalTwitch.objects.all():
+            guardados = (canal.total_comandos, canal.total_baneos, canal.total_baneos_activos)
+            esperados = reales.get(canal.pk, (0, 0, 0))
+            if guardados == esperados:
+                continue
+
+            desvios += 1
+            self.stdout.write(self.style.WARNING(
+                f'{canal.nombre}: comandos {guardados[0]} → {esperados[0]}, '
+                f'baneos {guardados[1]} → {esperados[1]}, '
+                f'activos {guardados[2]} → {esperados[2]}'
+            ))
+            if options['corregir']:
+                CanalTwitch.objects.filter(pk=canal.pk).update(
+                    total_comandos=esperados[0],
+                    total_baneos=esperados[1],
+                    total_baneos_activos=esperados[2],
+                )
+                invalidar_fragmentos(canal.pk)
+
+        if desvios and options['corregir']:
+            # Los contadores viajan con los canales en caché, como en ajustar_contadores
+            invalidar_canales()
+
+        if not desvios:
+            self.stdout.write(self.style.SUCCESS('Todos los contadores coinciden.'))
+        elif options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f'{desvios} canal(es) corregido(s).'))
+        else:
+            self.stdout.write(f'{desvios} canal(es) con desvíos; usa --corregir para arreglarlos.')
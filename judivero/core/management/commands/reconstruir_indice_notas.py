@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.busqueda_notas import reconstruir_indice_notas
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de texto completo de las notas (FTS5 en SQLite)'
+
+    def handle(self, *args, **options):
+        total = reconstruir_indice_notas()
+        self.stdout.write(self.style.SUCCESS(f'{total} nota(s) indexada(s).'))
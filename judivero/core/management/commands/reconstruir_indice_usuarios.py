@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.busqueda import reconstruir_indice_usuarios
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de búsqueda de usuarios baneados a partir de la tabla de baneos'
+
+    def handle(self, *args, **options):
+        total = reconstruir_indice_usuarios()
+        self.stdout.write(self.style.SUCCESS(f'{total} usuario(s) indexado(s).'))
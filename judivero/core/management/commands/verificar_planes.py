@@ -0,0 +1,73 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from core.api import version_baneos
+from core.busqueda import baneos_en_otros_canales, buscar_usuarios, infractores_en_varios_canales
+from core.expiracion import baneos_vencidos
+from core.models import Baneos, Comando, Nota
+from core.paginacion import codificar_cursor, filtrar_desde_cursor
+
+
+# SQLite: "SCAN core_baneos" (con o sin USING INDEX) recorre toda la tabla
+# PostgreSQL: "Seq Scan on core_baneos"
+PATRON_SCAN = re.compile(r'\bSCAN (core_\w+)|Seq Scan on (core_\w+)')
+
+
+def consultas_criticas(canal_id=0, nombre_usuario='usuario'):
+    """Consultas que ejecutan las vistas principales, con el nombre de quien las usa"""
+    cursor = codificar_cursor(Baneos(id=1, fecha_baneo=timezone.now()))
+    baneos_canal = Baneos.objects.filter(canal_id=canal_id)
+    baneos_usuario = Baneos.objects.filter(
+        canal_id=canal_id,
+        nombre_usuario=nombre_usuario
+    ).order_by('-fecha_baneo')
+
+    return [
+        ('inicio: comandos', Comando.objects.filter(canal_id=canal_id)),
+        ('inicio: primera página de baneos', filtrar_desde_cursor(baneos_canal)),
+        ('inicio: página siguiente de baneos', filtrar_desde_cursor(baneos_canal, cursor)),
+        ('notas_view: notas', Nota.objects.filter(canal_id=canal_id)),
+        ('notas_view: notas importantes', Nota.objects.filter(canal_id=canal_id, importante=True)),
+        ('perfil_usuario / generar_reporte_pdf: baneos', baneos_usuario),
+        ('perfil_usuario / generar_reporte_pdf: resumen por mes', baneos_usuario.order_by().annotate(
+            mes=TruncMonth('fecha_baneo')
+        ).values('mes').annotate(total=Count('id'), activos=Count('id', filter=Q(activo=True)))),
+        ('buscar_usuario: prefijo', buscar_usuarios(canal_id, nombre_usuario[:2])),
+        ('buscar_usuario: subcadena', buscar_usuarios(canal_id, nombre_usuario)),
+        ('buscar_usuario / perfil_usuario: otros canales', baneos_en_otros_canales(nombre_usuario, canal_id)),
+        ('buscar_usuario: reincidentes en varios canales', infractores_en_varios_canales()),
+        ('actualizar_estadisticas: comandos', Comando.objects.filter(canal_id=canal_id).values('id')),
+        ('actualizar_estadisticas: baneos activos', baneos_canal.filter(activo=True).values('id')),
+        ('expirar_baneos: baneos vencidos', baneos_vencidos()),
+        ('api baneos: versión', version_baneos(canal_id)),
+    ]
+
+
+def scans_completos(plan):
+    """Tablas del plan que se recorren completas"""
+    return [a or b for a, b in PATRON_SCAN.findall(plan)]
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas de las vistas y falla si alguna recorre una tabla completa'
+
+    def handle(self, *args, **options):
+        fallos = []
+
+        for nombre, queryset in consultas_criticas():
+            plan = queryset.explain()
+            tablas = scans_completos(plan)
+            if tablas:
+                fallos.append(nombre)
+                self.stdout.write(self.style.ERROR(f'✗ {nombre}: recorre {", ".join(tablas)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {nombre}'))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if fallos:
+            raise CommandError(f'{len(fallos)} consulta(s) sin índice: {", ".join(fallos)}')
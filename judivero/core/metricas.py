@@ -0,0 +1,366 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de cada histograma (el último bucket, +Inf, va aparte)
+BUCKETS = {
+    'judivero_peticion_segundos': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'judivero_consultas_por_peticion': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    'judivero_pdf_segundos': (0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    'judivero_pdf_bytes': (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 10_000_000),
+    'judivero_imagen_subida_bytes': (
+        50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000,
+    ),
+}
+
+AYUDA = {
+    'judivero_peticion_segundos': ('histogram', 'Duración de las peticiones por vista'),
+    'judivero_consultas_por_peticion': ('histogram', 'Consultas SQL por petición y vista'),
+    'judivero_respuestas_total': ('counter', 'Respuestas por vista y código de estado'),
+    'judivero_pdf_segundos': ('histogram', 'Duración de la generación de reportes PDF'),
+    'judivero_pdf_bytes': ('histogram', 'Tamaño de los reportes PDF generados'),
+    'judivero_imagen_subida_bytes': ('histogram', 'Tamaño de las imágenes de evidencia subidas'),
+    'judivero_cache_total': ('counter', 'Lecturas de caché por caché y resultado (acierto/fallo)'),
+    'judivero_baneos_activos': ('gauge', 'Baneos activos por canal'),
+}
+
+# Consultas de la petición en curso (lista de un elemento para poder sumarle desde los hilos de sync_to_async)
+_consultas_actuales = ContextVar('judivero_metricas_consultas', default=None)
+
+# serie ('nombre{etiquetas}') -> valor de los contadores, o [cuentas por bucket..., +Inf, suma] de los histogramas
+_contadores = {}
+_histogramas = {}
+_lock = threading.Lock()
+# Proceso dueño de los valores en memoria: un hijo de fork no hereda los del padre
+_pid = None
+_ultimo_guardado = 0.0
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _serie(nombre, etiquetas):
+    if not etiquetas:
+        return nombre
+    pares = ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in sorted(etiquetas.items()))
+    return f'{nombre}{{{pares}}}'
+
+
+def _proceso_actual():
+    """Se llama con el lock tomado; tras un fork empieza de cero y recupera lo que dejó un proceso anterior con el mismo pid"""
+    global _pid
+    if _pid == os.getpid():
+        return
+    _pid = os.getpid()
+    _contadores.clear()
+    _histogramas.clear()
+    ruta = _ruta_proceso(_pid)
+    if ruta and os.path.exists(ruta):
+        contadores, histogramas = _leer(ruta)
+        _sumar(_contadores, _histogramas, contadores, histogramas)
+
+
+def contar(nombre, valor=1, **etiquetas):
+    if not settings.METRICAS:
+        return
+    serie = _serie(nombre, etiquetas)
+    with _lock:
+        _proceso_actual()
+        _contadores[serie] = _contadores.get(serie, 0) + valor
+
+
+def observar(nombre, valor, **etiquetas):
+    if not settings.METRICAS:
+        return
+    buckets = BUCKETS[nombre]
+    serie = _serie(nombre, etiquetas)
+    with _lock:
+        _proceso_actual()
+        cuentas = _histogramas.get(serie)
+        if cuentas is None:
+            cuentas = _histogramas[serie] = [0] * (len(buckets) + 1) + [0.0]
+        cuentas[bisect.bisect_left(buckets, valor)] += 1
+        cuentas[-1] += valor
+
+
+def registrar_pdf(segundos, tamano):
+    observar('judivero_pdf_segundos', segundos)
+    observar('judivero_pdf_bytes', tamano)
+    # Los PDF se generan sobre todo en los procesos del pool, que no atienden peticiones
+    guardar()
+
+
+def registrar_imagen_subida(tamano):
+    observar('judivero_imagen_subida_bytes', tamano)
+    guardar()
+
+
+def registrar_cache(nombre, acierto):
+    contar('judivero_cache_total', cache=nombre, resultado='acierto' if acierto else 'fallo')
+
+
+# Archivos por proceso
+
+# Suma de los procesos que ya terminaron (ver podar_terminados)
+ARCHIVO_TERMINADOS = 'terminados.json'
+
+
+def _ruta_proceso(pid):
+    return os.path.join(settings.METRICAS_DIR, f'{pid}.json') if settings.METRICAS_DIR else None
+
+
+def guardar(forzar=True):
+    """
+    Escribe los valores de este proceso en METRICAS_DIR/<pid>.json para que
+    cualquier proceso pueda sumarlos al exportar. Sin forzar, como mucho una
+    vez cada METRICAS_INTERVALO segundos.
+    """
+    global _ultimo_guardado
+    if not settings.METRICAS or not settings.METRICAS_DIR:
+        return
+    ahora = time.monotonic()
+    if not forzar and ahora - _ultimo_guardado < settings.METRICAS_INTERVALO:
+        return
+    with _lock:
+        _proceso_actual()
+        _ultimo_guardado = ahora
+        datos = {'contadores': dict(_contadores), 'histogramas': {serie: list(c) for serie, c in _histogramas.items()}}
+
+    ruta = _ruta_proceso(os.getpid())
+    os.makedirs(settings.METRICAS_DIR, exist_ok=True)
+    try:
+        _escribir(ruta, datos)
+    except OSError:
+        logger.exception('No se pudieron guardar las métricas en %s', ruta)
+
+
+def _escribir(ruta, datos):
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, ruta)
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+    except (OSError, ValueError):
+        # Otro proceso lo está reemplazando o quedó corrupto; se suma en la próxima lectura
+        return {}, {}
+    return datos.get('contadores', {}), datos.get('histogramas', {})
+
+
+def _sumar(contadores, histogramas, otros_contadores, otros_histogramas):
+    for serie, valor in otros_contadores.items():
+        contadores[serie] = contadores.get(serie, 0) + valor
+    for serie, cuentas in otros_histogramas.items():
+        actuales = histogramas.get(serie)
+        if actuales is None:
+            histogramas[serie] = list(cuentas)
+        elif len(actuales) == len(cuentas):
+            # Distinto largo: los buckets cambiaron entre versiones y la serie vieja se ignora
+            histogramas[serie] = [a + b for a, b in zip(actuales, cuentas)]
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, pero es de otro usuario
+        return True
+    return True
+
+
+def podar_terminados():
+    """
+    Suma en METRICAS_DIR/terminados.json los archivos de procesos que ya no
+    existen y los borra, como mark_process_dead de prometheus_client: cada
+    reinicio de un worker (max_requests, recargas) dejaba un archivo más y los
+    totales no bajan. Devuelve cuántos archivos plegó. Solo en POSIX, donde
+    os.kill(pid, 0) pregunta sin mandar señal.
+    """
+    if os.name != 'posix' or not settings.METRICAS_DIR or not os.path.isdir(settings.METRICAS_DIR):
+        return 0
+    import fcntl
+
+    with open(os.path.join(settings.METRICAS_DIR, '.poda.lock'), 'w') as candado:
+        # Un solo proceso a la vez, o dos podas sumarían dos veces el mismo archivo
+        fcntl.flock(candado, fcntl.LOCK_EX)
+        terminados = []
+        for nombre in os.listdir(settings.METRICAS_DIR):
+            pid = nombre[:-len('.json')]
+            if nombre.endswith('.json') and pid.isdigit() and int(pid) != os.getpid() and not _vivo(int(pid)):
+                terminados.append(os.path.join(settings.METRICAS_DIR, nombre))
+        if not terminados:
+            return 0
+
+        ruta = os.path.join(settings.METRICAS_DIR, ARCHIVO_TERMINADOS)
+        contadores, histogramas = _leer(ruta)
+        for archivo in terminados:
+            _sumar(contadores, histogramas, *_leer(archivo))
+        _escribir(ruta, {'contadores': contadores, 'histogramas': histogramas})
+        for archivo in terminados:
+            try:
+                os.remove(archivo)
+            except FileNotFoundError:
+                pass
+    return len(terminados)
+
+
+def valores_agregados():
+    """Contadores e histogramas de todos los procesos: los de este en memoria y los demás desde sus archivos"""
+    with _lock:
+        _proceso_actual()
+        contadores = dict(_contadores)
+        histogramas = {serie: list(cuentas) for serie, cuentas in _histogramas.items()}
+
+    if settings.METRICAS_DIR and os.path.isdir(settings.METRICAS_DIR):
+        try:
+            podar_terminados()
+        except OSError:
+            logger.exception('No se pudieron podar las métricas de %s', settings.METRICAS_DIR)
+        propio = f'{os.getpid()}.json'
+        for nombre in os.listdir(settings.METRICAS_DIR):
+            # Incluye terminados.json: lo de los procesos que ya terminaron se sigue sumando
+            if nombre.endswith('.json') and nombre != propio:
+                _sumar(contadores, histogramas, *_leer(os.path.join(settings.METRICAS_DIR, nombre)))
+    return contadores, histogramas
+
+
+# Formato de texto de Prometheus
+
+def _nombre_de_serie(serie):
+    return serie.split('{', 1)[0]
+
+
+def _con_etiqueta(serie, clave, valor):
+    if '{' not in serie:
+        return f'{serie}{{{clave}="{valor}"}}'
+    return f'{serie[:-1]},{clave}="{valor}"}}'
+
+
+def _formatear(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar(indicadores=None):
+    """
+    Texto de exposición de Prometheus con los valores de todos los procesos.
+    `indicadores` son gauges calculados al momento: {nombre: [(etiquetas, valor), ...]}.
+    """
+    contadores, histogramas = valores_agregados()
+    por_nombre = {}
+    for serie, valor in contadores.items():
+        por_nombre.setdefault(_nombre_de_serie(serie), []).append((serie, valor))
+    for nombre, valores in (indicadores or {}).items():
+        por_nombre.setdefault(nombre, []).extend((_serie(nombre, etiquetas), valor) for etiquetas, valor in valores)
+
+    lineas = []
+    for nombre in sorted(set(por_nombre) | {_nombre_de_serie(serie) for serie in histogramas}):
+        tipo, ayuda = AYUDA.get(nombre, ('untyped', nombre))
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        if tipo == 'histogram':
+            limites = BUCKETS[nombre]
+            for serie, cuentas in sorted(histogramas.items()):
+                if _nombre_de_serie(serie) != nombre:
+                    continue
+                base = serie.replace(nombre, f'{nombre}_bucket', 1)
+                acumulado = 0
+                for limite, cuenta in zip(limites, cuentas):
+                    acumulado += cuenta
+                    lineas.append(f'{_con_etiqueta(base, "le", limite)} {acumulado}')
+                acumulado += cuentas[len(limites)]
+                lineas.append(f'{_con_etiqueta(base, "le", "+Inf")} {acumulado}')
+                lineas.append(f"{serie.replace(nombre, f'{nombre}_sum', 1)} {_formatear(cuentas[-1])}")
+                lineas.append(f"{serie.replace(nombre, f'{nombre}_count', 1)} {acumulado}")
+        else:
+            for serie, valor in sorted(por_nombre[nombre]):
+                lineas.append(f'{serie} {_formatear(valor)}')
+    return '\n'.join(lineas) + '\n'
+
+
+# Middleware
+
+def _contar_consulta(execute, sql, params, many, context):
+    consultas = _consultas_actuales.get()
+    if consultas is not None:
+        consultas[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _instalar_en_conexion(sender, connection, **kwargs):
+    if _contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _contar_consulta)
+
+
+class MetricasMiddleware:
+    """
+    Cuenta duración, consultas y código de estado de cada petición por nombre de
+    vista. Se activa con JUDIVERO_METRICAS=1; apagado Django lo quita de la cadena.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_instalar_en_conexion, dispatch_uid='judivero_metricas')
+        for conexion in connections.all(initialized_only=True):
+            _instalar_en_conexion(None, conexion)
+        # Lo que quede sin escribir al terminar el proceso (gunicorn reinicia workers con max_requests)
+        atexit.register(guardar)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        consultas = [0]
+        token = _consultas_actuales.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _consultas_actuales.reset(token)
+        self._registrar(request, respuesta, time.perf_counter() - inicio, consultas[0])
+        return respuesta
+
+    async def __acall__(self, request):
+        consultas = [0]
+        token = _consultas_actuales.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _consultas_actuales.reset(token)
+        self._registrar(request, respuesta, time.perf_counter() - inicio, consultas[0])
+        return respuesta
+
+    def _registrar(self, request, respuesta, segundos, consultas):
+        vista = request.resolver_match.view_name if request.resolver_match else 'sin_ruta'
+        observar('judivero_peticion_segundos', segundos, vista=vista)
+        observar('judivero_consultas_por_peticion', consultas, vista=vista)
+        contar('judivero_respuestas_total', vista=vista, estado=respuesta.status_code)
+        guardar(forzar=False)
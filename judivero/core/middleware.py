@@ -0,0 +1,48 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .canales import acanal_de_sesion, acanales_activos, canal_de_sesion, canales_activos
+
+
+class CanalActualMiddleware:
+    """Resuelve una vez por petición el canal actual (request.canal) y los canales activos (request.canales)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Bajo ASGI la cadena de middlewares sigue siendo async y las vistas async no saltan a un hilo
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        if request.user.is_authenticated:
+            request.canales = canales_activos()
+            request.canal = canal_de_sesion(request)
+        else:
+            request.canales = ()
+            request.canal = None
+        # Bajo WSGI las vistas async piden request.auser(), que tiene su propia caché
+        # y volvería a consultar el usuario; se reutiliza el que ya se cargó
+        usuario = request.user
+
+        async def auser():
+            return usuario
+
+        request.auser = auser
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # request.user es perezoso y consultaría la base de forma síncrona desde
+        # las plantillas; se reemplaza por el usuario ya cargado
+        request.user = await request.auser()
+        if request.user.is_authenticated:
+            request.canales = await acanales_activos()
+            request.canal = await acanal_de_sesion(request)
+        else:
+            request.canales = ()
+            request.canal = None
+        return await self.get_response(request)
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:04
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    # En PostgreSQL, icontains se puede resolver con un índice GIN de trigramas
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS baneo_usuario_trgm_idx '
+        'ON core_baneos USING gin (UPPER(nombre_usuario::text) gin_trgm_ops)'
+    )
+
+
+def borrar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS baneo_usuario_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_baneos_imagen'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(fields=['canal', 'nombre_usuario', '-fecha_baneo'], name='baneo_canal_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(fields=['canal', 'activo'], name='baneo_canal_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(fields=['canal', '-fecha_baneo', '-id'], name='baneo_canal_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(models.F('canal'), django.db.models.functions.text.Lower('nombre_usuario'), name='baneo_usuario_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comando',
+            index=models.Index(fields=['canal', 'activo', 'nivel_minimo'], name='comando_canal_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nota',
+            index=models.Index(fields=['canal', '-fecha_creacion'], name='nota_canal_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nota',
+            index=models.Index(fields=['canal', 'importante'], name='nota_canal_importante_idx'),
+        ),
+        migrations.RunPython(crear_indice_trigramas, borrar_indice_trigramas),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def poblar_usuarios_baneados(apps, schema_editor):
+    Baneos = apps.get_model('core', 'Baneos')
+    UsuarioBaneado = apps.get_model('core', 'UsuarioBaneado')
+    TrigramaUsuario = apps.get_model('core', 'TrigramaUsuario')
+
+    resumenes = Baneos.objects.exclude(canal=None).order_by().values(
+        'canal_id', 'nombre_usuario'
+    ).annotate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+        fecha_ultimo=Max('fecha_baneo'),
+    )
+    for resumen in resumenes.iterator():
+        ultimo = Baneos.objects.filter(
+            canal_id=resumen['canal_id'],
+            nombre_usuario=resumen['nombre_usuario'],
+        ).order_by('-fecha_baneo', '-id').values_list('id', flat=True).first()
+        normalizado = resumen['nombre_usuario'].strip().lower()
+        usuario = UsuarioBaneado.objects.create(
+            canal_id=resumen['canal_id'],
+            nombre_usuario=resumen['nombre_usuario'],
+            nombre_normalizado=normalizado,
+            total_baneos=resumen['total'],
+            baneos_activos=resumen['activos'],
+            ultimo_baneo_id=ultimo,
+            fecha_ultimo_baneo=resumen['fecha_ultimo'],
+        )
+        TrigramaUsuario.objects.bulk_create([
+            TrigramaUsuario(canal_id=resumen['canal_id'], usuario=usuario, trigrama=trigrama)
+            for trigrama in {normalizado[i:i + 3] for i in range(len(normalizado) - 2)}
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsuarioBaneado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_usuario', models.CharField(max_length=200)),
+                ('nombre_normalizado', models.CharField(max_length=200)),
+                ('total_baneos', models.PositiveIntegerField(default=0)),
+                ('baneos_activos', models.PositiveIntegerField(default=0)),
+                ('fecha_ultimo_baneo', models.DateTimeField(blank=True, null=True)),
+                ('canal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usuarios_baneados', to='core.canaltwitch')),
+                ('ultimo_baneo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.baneos')),
+            ],
+            options={
+                'verbose_name': 'Usuario Baneado',
+                'verbose_name_plural': 'Usuarios Baneados',
+                'ordering': ['-fecha_ultimo_baneo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrigramaUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('canal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.canaltwitch')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='core.usuariobaneado')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='usuariobaneado',
+            index=models.Index(fields=['canal', 'nombre_normalizado'], name='usuario_canal_normalizado_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='usuariobaneado',
+            unique_together={('canal', 'nombre_usuario')},
+        ),
+        migrations.AddIndex(
+            model_name='trigramausuario',
+            index=models.Index(fields=['canal', 'trigrama'], name='trigrama_canal_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='trigramausuario',
+            unique_together={('usuario', 'trigrama')},
+        ),
+        migrations.RunPython(poblar_usuarios_baneados, migrations.RunPython.noop),
+    ]
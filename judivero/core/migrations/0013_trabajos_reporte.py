@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_usuarios_baneados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_usuario', models.CharField(max_length=200)),
+                ('clave_cache', models.CharField(help_text='Versión del historial del usuario al pedir el reporte', max_length=64)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('LISTO', 'Listo'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20)),
+                ('archivo', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('canal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_reporte', to='core.canaltwitch')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reporte',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='trabajo_estado_idx'), models.Index(fields=['clave_cache', 'estado'], name='trabajo_clave_idx')],
+            },
+        ),
+    ]
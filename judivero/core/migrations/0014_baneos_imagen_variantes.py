@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_trabajos_reporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baneos',
+            name='imagen_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='baneos',
+            name='imagen_variantes',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:13
+
+import core.almacenamiento
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_baneos_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoEvidencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Ruta del archivo en el almacenamiento', max_length=255, unique=True)),
+                ('referencias', models.IntegerField(default=0)),
+                ('tamano', models.BigIntegerField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo de Evidencia',
+                'verbose_name_plural': 'Archivos de Evidencia',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='baneos',
+            name='imagen',
+            field=models.ImageField(blank=True, help_text='Imagen relacionada con el baneo', null=True, storage=core.almacenamiento.AlmacenamientoPorContenido(prefijo='baneos/imagenes'), upload_to='baneos/imagenes/', validators=[django.core.validators.FileExtensionValidator(['svg', 'png', 'jpg', 'jpeg'])]),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _total_por_canal(modelo, **filtros):
+    # Un COUNT por canal en su propia subconsulta: contar en un solo annotate
+    # multiplica comandos por baneos (JOIN de las dos tablas) antes del DISTINCT
+    filas = modelo.objects.filter(canal=OuterRef('pk'), **filtros).order_by().values('canal')
+    return Coalesce(Subquery(filas.annotate(total=Count('pk')).values('total')), Value(0))
+
+
+def inicializar_contadores(apps, schema_editor):
+    CanalTwitch = apps.get_model('core', 'CanalTwitch')
+    Comando = apps.get_model('core', 'Comando')
+    Baneos = apps.get_model('core', 'Baneos')
+    CanalTwitch.objects.update(
+        total_comandos=_total_por_canal(Comando),
+        total_baneos=_total_por_canal(Baneos),
+        total_baneos_activos=_total_por_canal(Baneos, activo=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_archivos_evidencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='canaltwitch',
+            name='total_baneos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
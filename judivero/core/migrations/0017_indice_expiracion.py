@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_contadores_canal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(condition=models.Q(('activo', True), ('desbaneo__isnull', False)), fields=['desbaneo'], name='baneo_expiracion_idx'),
+        ),
+    ]
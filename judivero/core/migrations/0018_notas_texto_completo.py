@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:30
+
+from django.db import OperationalError, migrations
+
+
+def crear_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Tabla FTS5 aparte (rowid = id de la nota); core.signals la mantiene al día
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS core_nota_fts USING fts5('
+                'titulo, nota, etiqueta, tokenize="unicode61 remove_diacritics 2")'
+            )
+        except OperationalError:
+            # SQLite sin FTS5: la búsqueda cae a icontains
+            return
+        schema_editor.execute(
+            'INSERT INTO core_nota_fts (rowid, titulo, nota, etiqueta) '
+            'SELECT id, titulo, nota, etiqueta FROM core_nota'
+        )
+    elif vendor == 'postgresql':
+        # Columna generada: PostgreSQL la recalcula solo en cada INSERT/UPDATE
+        schema_editor.execute(
+            "ALTER TABLE core_nota ADD COLUMN IF NOT EXISTS busqueda tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') || "
+            "setweight(to_tsvector('spanish', coalesce(etiqueta, '')), 'B') || "
+            "setweight(to_tsvector('spanish', coalesce(nota, '')), 'C')"
+            ") STORED"
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS nota_busqueda_idx ON core_nota USING gin (busqueda)'
+        )
+
+
+def borrar_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_nota_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS nota_busqueda_idx')
+        schema_editor.execute('ALTER TABLE core_nota DROP COLUMN IF EXISTS busqueda')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_indice_expiracion'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_texto, borrar_indice_texto),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def poblar_infractores(apps, schema_editor):
+    UsuarioBaneado = apps.get_model('core', 'UsuarioBaneado')
+    Infractor = apps.get_model('core', 'Infractor')
+
+    resumenes = UsuarioBaneado.objects.order_by().values('nombre_normalizado').annotate(
+        total_canales=Count('canal', distinct=True),
+        canales_con_activos=Count('canal', filter=Q(baneos_activos__gt=0), distinct=True),
+        total_baneos=Sum('total_baneos'),
+        baneos_activos=Sum('baneos_activos'),
+        fecha_ultimo_baneo=Max('fecha_ultimo_baneo'),
+    )
+    for resumen in resumenes.iterator():
+        nombre = UsuarioBaneado.objects.filter(
+            nombre_normalizado=resumen['nombre_normalizado']
+        ).order_by('-fecha_ultimo_baneo').values_list('nombre_usuario', flat=True).first()
+        Infractor.objects.create(nombre_usuario=nombre, **resumen)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_notas_texto_completo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Infractor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_normalizado', models.CharField(max_length=200, unique=True)),
+                ('nombre_usuario', models.CharField(help_text='Nombre tal como se escribió en el último baneo', max_length=200)),
+                ('total_canales', models.PositiveIntegerField(default=0)),
+                ('canales_con_activos', models.PositiveIntegerField(default=0)),
+                ('total_baneos', models.PositiveIntegerField(default=0)),
+                ('baneos_activos', models.PositiveIntegerField(default=0)),
+                ('fecha_ultimo_baneo', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Infractor',
+                'verbose_name_plural': 'Infractores',
+                'ordering': ['-fecha_ultimo_baneo'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='usuariobaneado',
+            index=models.Index(fields=['nombre_normalizado', '-fecha_ultimo_baneo'], name='usuario_normalizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='infractor',
+            index=models.Index(fields=['-total_canales', '-fecha_ultimo_baneo'], name='infractor_canales_idx'),
+        ),
+        migrations.RunPython(poblar_infractores, migrations.RunPython.noop),
+    ]
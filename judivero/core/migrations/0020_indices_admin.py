@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_infractores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(fields=['-fecha_baneo', '-id'], name='baneo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nota',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='nota_fecha_idx'),
+        ),
+    ]
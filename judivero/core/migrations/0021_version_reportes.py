@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_indices_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baneos',
+            name='ultima_modificacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='fecha_encolado',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_version_reportes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baneos',
+            index=models.Index(fields=['canal', '-ultima_modificacion'], name='baneo_canal_modificacion_idx'),
+        ),
+    ]
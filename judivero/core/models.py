@@ -3,6 +3,11 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
+from django.db.models.functions import Lower
+import uuid
+
+from .almacenamiento import AlmacenamientoPorContenido
+from .imagenes import TAMANOS, FORMATOS, ruta_variante
 # Modelo para Canales de Twitch donde eres moderador
 class CanalTwitch(models.Model):
     nombre = models.CharField(max_length=100, unique=True, help_text="Nombre del canal de Twitch")
@@ -14,7 +19,9 @@ class CanalTwitch(models.Model):
     fecha_inicio_moderacion = models.DateTimeField(auto_now_add=True)
     
     # Estadísticas de moderación
+    # Se mantienen al día con incrementos en core.signals; reconciliar_contadores corrige desvíos
     total_comandos = models.IntegerField(default=0, editable=False)
+    total_baneos = models.IntegerField(default=0, editable=False)
     total_baneos_activos = models.IntegerField(default=0, editable=False)
     
     class Meta:
@@ -28,8 +35,9 @@ class CanalTwitch(models.Model):
     def actualizar_estadisticas(self):
         """Actualiza las estadísticas del canal"""
         self.total_comandos = self.comandos.count()
+        self.total_baneos = self.baneos.count()
         self.total_baneos_activos = self.baneos.filter(activo=True).count()
-        self.save(update_fields=['total_comandos', 'total_baneos_activos'])
+        self.save(update_fields=['total_comandos', 'total_baneos', 'total_baneos_activos'])
 
 
 class Comando(models.Model):
@@ -58,6 +66,9 @@ class Comando(models.Model):
         # Evitar comandos duplicados en el mismo canal
         unique_together = ['canal', 'nombre']
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['canal', 'activo', 'nivel_minimo'], name='comando_canal_activo_idx'),
+        ]
 
     def __str__(self):
         canal_nombre = self.canal.nombre if self.canal else "Sin canal"
@@ -98,6 +109,12 @@ class Nota(models.Model):
         ordering = ['-fecha_creacion']
         verbose_name = 'Nota de Moderación'
         verbose_name_plural = 'Notas de Moderación'
+        indexes = [
+            models.Index(fields=['canal', '-fecha_creacion'], name='nota_canal_fecha_idx'),
+            models.Index(fields=['canal', 'importante'], name='nota_canal_importante_idx'),
+            # Listado y jerarquía de fechas del admin, sin filtrar por canal
+            models.Index(fields=['-fecha_creacion', '-id'], name='nota_fecha_idx'),
+        ]
 
     def __str__(self):
         canal_nombre = self.canal.nombre if self.canal else "Sin canal"
@@ -125,29 +142,209 @@ class Baneos(models.Model):
     # Por esta:
     imagen = models.ImageField(
         upload_to='baneos/imagenes/',
+        storage=AlmacenamientoPorContenido(prefijo='baneos/imagenes'),
         validators=[FileExtensionValidator(['svg', 'png', 'jpg', 'jpeg'])],
         blank=True,
         null=True,
         help_text="Imagen relacionada con el baneo"
     )
+    imagen_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
+    imagen_variantes = models.BooleanField(default=False, editable=False)
+    # Versión del historial para la caché de reportes; los UPDATE masivos la fijan a mano
+    ultima_modificacion = models.DateTimeField(auto_now=True)
     class Meta:
         verbose_name = 'Baneo'
         verbose_name_plural = 'Baneos'
         ordering = ['-fecha_baneo']
+        indexes = [
+            # perfil_usuario, generar_reporte_pdf
+            models.Index(fields=['canal', 'nombre_usuario', '-fecha_baneo'], name='baneo_canal_usuario_idx'),
+            # actualizar_estadisticas y conteos de baneos activos
+            models.Index(fields=['canal', 'activo'], name='baneo_canal_activo_idx'),
+            # Paginación por cursor del panel de inicio
+            models.Index(fields=['canal', '-fecha_baneo', '-id'], name='baneo_canal_fecha_idx'),
+            # Listado y jerarquía de fechas del admin, sin filtrar por canal
+            models.Index(fields=['-fecha_baneo', '-id'], name='baneo_fecha_idx'),
+            # Versión de la API de baneos: último baneo modificado del canal
+            models.Index(fields=['canal', '-ultima_modificacion'], name='baneo_canal_modificacion_idx'),
+            # Búsqueda de usuario sin distinguir mayúsculas
+            models.Index(models.F('canal'), Lower('nombre_usuario'), name='baneo_usuario_lower_idx'),
+            # expirar_baneos: índice parcial, solo los baneos activos con fecha de desbaneo
+            models.Index(
+                fields=['desbaneo'],
+                name='baneo_expiracion_idx',
+                condition=models.Q(activo=True, desbaneo__isnull=False),
+            ),
+        ]
 
     def esta_baneado(self):
+        """Solo lectura: un baneo vencido cuenta como inactivo aunque expirar_baneos aún no lo haya marcado"""
         if self.desbaneo and self.desbaneo <= timezone.now():
-            self.activo = False
-            self.save(update_fields=['activo'])
             return False
         return self.activo
 
     def desbanear(self):
         self.desbaneo = timezone.now()
         self.activo = False
-        self.save(update_fields=['desbaneo', 'activo'])
+        self.save(update_fields=['desbaneo', 'activo', 'ultima_modificacion'])
+
+    def variantes_imagen(self):
+        """URLs de las variantes de la evidencia por tamaño y formato; todas apuntan al original si no hay variantes"""
+        if not self.imagen:
+            return {}
+        storage = self.imagen.storage
+        return {
+            tamano: {
+                formato: storage.url(ruta_variante(self.imagen_hash, tamano, formato))
+                if self.imagen_variantes else self.imagen.url
+                for formato in FORMATOS
+            }
+            for tamano in TAMANOS
+        }
+
+    def ruta_imagen_pdf(self):
+        """Ruta local de la imagen para el PDF: la variante JPEG mediana si existe"""
+        if self.imagen_variantes:
+            return self.imagen.storage.path(ruta_variante(self.imagen_hash, 'mediana', 'jpg'))
+        return self.imagen.path
 
     def __str__(self):
         canal_nombre = self.canal.nombre if self.canal else "Sin canal"
         estado = "Activo" if self.activo else "Inactivo"
         return f"[{canal_nombre}] {self.nombre_usuario} - {estado} ({self.fecha_baneo.strftime('%d/%m/%Y')})"
+
+
+class UsuarioBaneado(models.Model):
+    """Resumen por usuario y canal para la búsqueda; lo mantienen las señales de Baneos"""
+    canal = models.ForeignKey(
+        CanalTwitch,
+        on_delete=models.CASCADE,
+        related_name='usuarios_baneados'
+    )
+    nombre_usuario = models.CharField(max_length=200)
+    nombre_normalizado = models.CharField(max_length=200)
+    total_baneos = models.PositiveIntegerField(default=0)
+    baneos_activos = models.PositiveIntegerField(default=0)
+    ultimo_baneo = models.ForeignKey(
+        Baneos,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    fecha_ultimo_baneo = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Usuario Baneado'
+        verbose_name_plural = 'Usuarios Baneados'
+        unique_together = ['canal', 'nombre_usuario']
+        ordering = ['-fecha_ultimo_baneo']
+        indexes = [
+            # Búsqueda por prefijo con un rango sobre el índice
+            models.Index(fields=['canal', 'nombre_normalizado'], name='usuario_canal_normalizado_idx'),
+            # Historial del usuario en todos los canales
+            models.Index(fields=['nombre_normalizado', '-fecha_ultimo_baneo'], name='usuario_normalizado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre_usuario} ({self.total_baneos} baneos)"
+
+
+class Infractor(models.Model):
+    """Resumen de un usuario en todos los canales; se recalcula junto con UsuarioBaneado"""
+    nombre_normalizado = models.CharField(max_length=200, unique=True)
+    nombre_usuario = models.CharField(max_length=200, help_text="Nombre tal como se escribió en el último baneo")
+    total_canales = models.PositiveIntegerField(default=0)
+    canales_con_activos = models.PositiveIntegerField(default=0)
+    total_baneos = models.PositiveIntegerField(default=0)
+    baneos_activos = models.PositiveIntegerField(default=0)
+    fecha_ultimo_baneo = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Infractor'
+        verbose_name_plural = 'Infractores'
+        ordering = ['-fecha_ultimo_baneo']
+        indexes = [
+            # Reincidentes en varios canales, los más repartidos primero
+            models.Index(fields=['-total_canales', '-fecha_ultimo_baneo'], name='infractor_canales_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre_usuario} ({self.total_canales} canales)"
+
+
+class TrigramaUsuario(models.Model):
+    """Trigramas del nombre normalizado, para búsquedas por subcadena"""
+    canal = models.ForeignKey(CanalTwitch, on_delete=models.CASCADE, related_name='+')
+    usuario = models.ForeignKey(UsuarioBaneado, on_delete=models.CASCADE, related_name='trigramas')
+    trigrama = models.CharField(max_length=3)
+
+    class Meta:
+        unique_together = ['usuario', 'trigrama']
+        indexes = [
+            models.Index(fields=['canal', 'trigrama'], name='trigrama_canal_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigrama} → {self.usuario_id}"
+
+
+class TrabajoReporte(models.Model):
+    """Generación de un reporte PDF en segundo plano"""
+    ESTADO = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('LISTO', 'Listo'),
+        ('ERROR', 'Error'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    canal = models.ForeignKey(
+        CanalTwitch,
+        on_delete=models.CASCADE,
+        related_name='trabajos_reporte'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='trabajos_reporte',
+        null=True,
+        blank=True
+    )
+    nombre_usuario = models.CharField(max_length=200)
+    clave_cache = models.CharField(max_length=64, help_text="Versión del historial del usuario al pedir el reporte")
+    estado = models.CharField(max_length=20, choices=ESTADO, default='PENDIENTE')
+    archivo = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Última vez que se envió al pool o que un worker lo tomó; sirve para detectar trabajos colgados
+    fecha_encolado = models.DateTimeField(default=timezone.now)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reporte'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='trabajo_estado_idx'),
+            models.Index(fields=['clave_cache', 'estado'], name='trabajo_clave_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reporte {self.nombre_usuario} ({self.get_estado_display()})"
+
+
+class ArchivoEvidencia(models.Model):
+    """Archivo de evidencia direccionado por contenido y cuántos baneos lo usan"""
+    nombre = models.CharField(max_length=255, unique=True, help_text="Ruta del archivo en el almacenamiento")
+    referencias = models.IntegerField(default=0)
+    tamano = models.BigIntegerField(null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Archivo de Evidencia'
+        verbose_name_plural = 'Archivos de Evidencia'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} ref.)"
@@ -0,0 +1,134 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Max, Min, Q
+from django.db.models.fields import AutoFieldMixin
+from django.utils.functional import cached_property
+
+
+# Cantidad de baneos por página en el panel de inicio
+BANEOS_POR_PAGINA = 50
+# Por debajo de estas filas estimadas se cuenta exacto: el COUNT ya es barato
+MINIMO_CONTEO_ESTIMADO = 50000
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar"""
+
+
+def codificar_cursor(baneo):
+    """Genera un cursor opaco a partir de (fecha_baneo, id) del último baneo de la página"""
+    crudo = f"{baneo.fecha_baneo.isoformat()}|{baneo.id}"
+    return base64.urlsafe_b64encode(crudo.encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve la tupla (fecha_baneo, id) contenida en el cursor"""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        fecha, baneo_id = crudo.split('|')
+        fecha, baneo_id = datetime.fromisoformat(fecha), int(baneo_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise CursorInvalido(cursor)
+    # codificar_cursor siempre escribe la zona horaria: sin ella el cursor fue alterado
+    if fecha.tzinfo is None:
+        raise CursorInvalido(cursor)
+    return fecha, baneo_id
+
+
+def filtrar_desde_cursor(queryset, cursor=None):
+    """Ordena por (fecha_baneo, id) descendente y deja solo las filas posteriores al cursor"""
+    queryset = queryset.order_by('-fecha_baneo', '-id')
+    if cursor:
+        fecha, baneo_id = decodificar_cursor(cursor)
+        queryset = queryset.filter(
+            Q(fecha_baneo__lt=fecha) | Q(fecha_baneo=fecha, id__lt=baneo_id)
+        )
+    return queryset
+
+
+async def apaginar_baneos(queryset, cursor=None, limite=BANEOS_POR_PAGINA):
+    """
+    Paginación por keyset sobre (fecha_baneo, id) descendente.
+    Cada página cuesta lo mismo sin importar cuántos baneos tenga el canal,
+    a diferencia de OFFSET que recorre todas las filas anteriores.
+    Devuelve (baneos, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    queryset = filtrar_desde_cursor(queryset, cursor)
+
+    # Pedimos una fila de más para saber si existe otra página
+    baneos = [baneo async for baneo in queryset[:limite + 1]]
+    siguiente_cursor = None
+    if len(baneos) > limite:
+        baneos = baneos[:limite]
+        siguiente_cursor = codificar_cursor(baneos[-1])
+
+    return baneos, siguiente_cursor
+
+
+def estimar_filas(modelo, using='default'):
+    """
+    Cantidad aproximada de filas de la tabla sin recorrerla, o None si el motor
+    no da una estimación. PostgreSQL usa las estadísticas del planner; SQLite
+    el rango de la clave autoincremental (los huecos de filas borradas cuentan).
+    """
+    conexion = connections[using]
+    try:
+        if conexion.vendor == 'postgresql':
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [modelo._meta.db_table])
+                fila = cursor.fetchone()
+            # -1 si la tabla nunca se analizó
+            return int(fila[0]) if fila and fila[0] >= 0 else None
+        if conexion.vendor == 'sqlite' and isinstance(modelo._meta.pk, AutoFieldMixin):
+            rango = modelo._default_manager.using(using).aggregate(primero=Min('pk'), ultimo=Max('pk'))
+            return rango['ultimo'] - rango['primero'] + 1 if rango['ultimo'] is not None else 0
+    except DatabaseError:
+        return None
+    return None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator para listados de tablas enormes (admin): sin filtros usa una
+    estimación del total en lugar de COUNT(*). Con filtros o búsqueda el
+    conjunto suele ser chico y se cuenta exacto.
+    """
+
+    estimado = False
+    ajustado = False
+
+    @cached_property
+    def count(self):
+        consulta = getattr(self.object_list, 'query', None)
+        if consulta is not None and not consulta.where:
+            estimado = estimar_filas(self.object_list.model, self.object_list.db)
+            if estimado is not None and estimado >= MINIMO_CONTEO_ESTIMADO:
+                self.estimado = True
+                return estimado
+        return super().count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Las páginas que solo existían en la estimación llevan a la última real
+            if self.ajustado and int(number) > self.num_pages:
+                return self.num_pages
+            raise
+
+    def page(self, number):
+        pagina = super().page(number)
+        # Una página incompleta es el final real de la tabla: si el total era una
+        # estimación (cuenta los huecos de filas borradas) se pasa a contar exacto
+        if self.estimado and len(pagina.object_list) < self.per_page:
+            self.estimado = False
+            self.ajustado = True
+            self.__dict__.pop('num_pages', None)
+            self.__dict__['count'] = Paginator.count.func(self)
+            if pagina.number > self.num_pages:
+                pagina = super().page(number)
+        return pagina
@@ -0,0 +1,207 @@
+import logging
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+logger = logging.getLogger(__name__)
+
+# Medición de la petición en curso; las vistas async y los hilos de
+# sync_to_async heredan el contexto, así que comparten el mismo objeto
+_medicion_actual = ContextVar('judivero_perfilado', default=None)
+
+# view_name -> últimas mediciones: (total, consultas, sql, plantillas, pdf), en ms salvo consultas
+_muestras = {}
+# view_name -> Counter de consultas repetidas detectadas
+_repetidas = {}
+_lock = threading.Lock()
+
+
+class _Medicion:
+    __slots__ = ('inicio', 'consultas', 'sql_ms', 'fases', 'activas')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = Counter()
+        self.sql_ms = 0.0
+        self.fases = {}
+        self.activas = set()
+
+    def repetidas(self):
+        umbral = settings.PERFILADO_REPETIDAS
+        return [(sql, veces) for sql, veces in self.consultas.most_common() if veces >= umbral]
+
+
+@contextmanager
+def fase(nombre):
+    """Suma al Server-Timing de la petición en curso lo que tarde el bloque (no hace nada fuera de una petición medida)"""
+    medicion = _medicion_actual.get()
+    # Una fase anidada en sí misma (render_to_string dentro de una plantilla) no se cuenta dos veces
+    if medicion is None or nombre in medicion.activas:
+        yield
+        return
+    medicion.activas.add(nombre)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.activas.discard(nombre)
+        medicion.fases[nombre] = medicion.fases.get(nombre, 0.0) + (time.perf_counter() - inicio) * 1000
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql_ms += (time.perf_counter() - inicio) * 1000
+        # Se agrupa por el SQL sin parámetros: un N+1 es la misma consulta una vez por fila
+        medicion.consultas[sql] += 1
+
+
+def _instalar_en_conexion(sender, connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _medir_consulta)
+
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        with fase('plantillas'):
+            return super().render(context, request)
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend de plantillas de Django que mide el render; settings lo usa solo con el perfilado activo"""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class PerfiladoMiddleware:
+    """
+    Mide cada petición (tiempo total, consultas SQL, render de plantillas y, en las
+    vistas de reportes, la búsqueda del PDF en caché y su encolado),
+    avisa de consultas repetidas (N+1) y agrega un encabezado Server-Timing.
+    Con JUDIVERO_PERFILADO apagado Django lo quita de la cadena al arrancar.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_instalar_en_conexion, dispatch_uid='judivero_perfilado')
+        for conexion in connections.all(initialized_only=True):
+            _instalar_en_conexion(None, conexion)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        token = _medicion_actual.set(_Medicion())
+        try:
+            respuesta = self.get_response(request)
+            self._registrar(request, respuesta, _medicion_actual.get())
+        finally:
+            _medicion_actual.reset(token)
+        return respuesta
+
+    async def __acall__(self, request):
+        token = _medicion_actual.set(_Medicion())
+        try:
+            respuesta = await self.get_response(request)
+            self._registrar(request, respuesta, _medicion_actual.get())
+        finally:
+            _medicion_actual.reset(token)
+        return respuesta
+
+    def _registrar(self, request, respuesta, medicion):
+        total_ms = (time.perf_counter() - medicion.inicio) * 1000
+        vista = request.resolver_match.view_name if request.resolver_match else 'sin_ruta'
+        consultas = sum(medicion.consultas.values())
+        repetidas = medicion.repetidas()
+
+        metricas = [
+            f'total;dur={total_ms:.1f}',
+            f'sql;dur={medicion.sql_ms:.1f};desc="{consultas} consultas"',
+        ]
+        metricas += [f'{nombre};dur={ms:.1f}' for nombre, ms in medicion.fases.items()]
+        if repetidas:
+            metricas.append(f'n1;desc="{len(repetidas)} consulta(s) repetida(s)"')
+            sql, veces = repetidas[0]
+            logger.warning('Posible N+1 en %s: %s consulta(s) iguales: %s', vista, veces, sql[:300])
+        respuesta['Server-Timing'] = ', '.join(metricas)
+
+        fila = (
+            total_ms, consultas, medicion.sql_ms,
+            medicion.fases.get('plantillas', 0.0), medicion.fases.get('pdf', 0.0),
+        )
+        with _lock:
+            if vista not in _muestras:
+                _muestras[vista] = deque(maxlen=settings.PERFILADO_VENTANA)
+                _repetidas[vista] = Counter()
+            _muestras[vista].append(fila)
+            for sql, veces in repetidas:
+                _repetidas[vista][sql] = max(_repetidas[vista][sql], veces)
+
+
+def _percentil(ordenados, percentil):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * percentil / 100))]
+
+
+def resumen_perfilado():
+    """Resumen por vista de las últimas peticiones medidas en este proceso, de la más lenta en total a la más rápida"""
+    with _lock:
+        copia = {vista: list(filas) for vista, filas in _muestras.items()}
+        repetidas = {vista: contador.most_common(5) for vista, contador in _repetidas.items()}
+
+    vistas = []
+    for vista, filas in copia.items():
+        tiempos = sorted(fila[0] for fila in filas)
+        vistas.append({
+            'vista': vista,
+            'peticiones': len(filas),
+            'ms': {
+                'p50': round(_percentil(tiempos, 50), 1),
+                'p95': round(_percentil(tiempos, 95), 1),
+                'max': round(tiempos[-1], 1),
+                'suma': round(sum(tiempos), 1),
+            },
+            'consultas_media': round(statistics.fmean(fila[1] for fila in filas), 1),
+            'sql_ms_media': round(statistics.fmean(fila[2] for fila in filas), 1),
+            'plantillas_ms_media': round(statistics.fmean(fila[3] for fila in filas), 1),
+            'pdf_ms_media': round(statistics.fmean(fila[4] for fila in filas), 1),
+            'repetidas': [{'sql': sql, 'veces': veces} for sql, veces in repetidas.get(vista, [])],
+        })
+    vistas.sort(key=lambda resumen: resumen['ms']['suma'], reverse=True)
+    return vistas
+
+
+def reiniciar_perfilado():
+    with _lock:
+        _muestras.clear()
+        _repetidas.clear()
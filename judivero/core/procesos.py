@@ -0,0 +1,29 @@
+"""
+Puntos de entrada para los procesos del pool de reportes.
+
+Este módulo no importa modelos al cargarse: con el método spawn el hijo lo
+importa para deserializar la tarea antes de que Django esté configurado.
+"""
+
+
+def iniciar():
+    """Prepara Django en cada proceso del pool"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def generar_reporte(trabajo_id):
+    from .reportes import procesar_trabajo
+
+    procesar_trabajo(trabajo_id)
+
+
+def preparar_reporte(canal_id, nombre_usuario):
+    """Deja en caché el PDF de un usuario y devuelve su ruta (None si no tiene baneos)"""
+    from .models import CanalTwitch
+    from .reportes import asegurar_reporte_en_cache
+
+    return asegurar_reporte_en_cache(CanalTwitch.objects.get(pk=canal_id), nombre_usuario)
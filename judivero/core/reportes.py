@@ -0,0 +1,318 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from xhtml2pdf import pisa
+
+from . import metricas, procesos
+from .models import Baneos, TrabajoReporte
+from .resumen import resumen_moderacion_usuario
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Caracteres de la clave que identifican al usuario (el resto, la versión del historial)
+PREFIJO_USUARIO = 16
+
+
+class ErrorReporte(Exception):
+    """xhtml2pdf no pudo generar el PDF"""
+
+
+def link_callback(uri, rel):
+    """
+    Convierte URIs HTML a rutas del sistema de archivos para xhtml2pdf.
+    Especialmente importante para cargar imágenes correctamente.
+    """
+    # Si la URI ya es una ruta de archivo, usarla directamente
+    if uri.startswith('file://'):
+        return uri.replace('file://', '')
+
+    # Para archivos de media
+    if uri.startswith(settings.MEDIA_URL):
+        path = os.path.join(
+            settings.MEDIA_ROOT,
+            uri.replace(settings.MEDIA_URL, "")
+        )
+        if os.path.exists(path):
+            return path
+
+    # Para archivos estáticos
+    if uri.startswith(settings.STATIC_URL):
+        path = os.path.join(
+            settings.STATIC_ROOT or settings.BASE_DIR,
+            uri.replace(settings.STATIC_URL, "")
+        )
+        if os.path.exists(path):
+            return path
+
+    # Si no encuentra nada, devolver la URI original
+    return uri
+
+
+def renderizar_pdf(canal, nombre_usuario, resumen=None):
+    """Genera el PDF del historial de un usuario y devuelve su contenido en bytes"""
+    context = resumen or resumen_moderacion_usuario(canal, nombre_usuario)
+    # El PDF se guarda en caché por versión del historial: fecha_reporte queda la del
+    # primer renderizado ("generado el"), que sigue siendo válido mientras la clave no cambie
+    context.update({
+        'canal': canal,
+        'fecha_reporte': timezone.now(),
+    })
+
+    inicio = time.perf_counter()
+    # Renderizar el template HTML
+    html_string = render_to_string('core/pdf/reporte_baneo.html', context)
+
+    # Convertir HTML a PDF con callback para manejar imágenes
+    result = BytesIO()
+    pdf_status = pisa.pisaDocument(
+        BytesIO(html_string.encode("UTF-8")),
+        result,
+        link_callback=link_callback,
+        encoding='UTF-8'
+    )
+
+    if pdf_status.err:
+        raise ErrorReporte(f'Error al generar el PDF. Código de error: {pdf_status.err}')
+
+    contenido = result.getvalue()
+    metricas.registrar_pdf(time.perf_counter() - inicio, len(contenido))
+    return contenido
+
+
+def clave_cache(canal, nombre_usuario):
+    """
+    Identifica la versión del historial de un usuario: cambia cuando se agrega,
+    borra o edita alguno de sus baneos. None si no tiene baneos.
+    Los primeros PREFIJO_USUARIO caracteres dependen solo del usuario, para
+    encontrar las versiones anteriores de su PDF en la caché.
+    """
+    version = Baneos.objects.filter(canal=canal, nombre_usuario=nombre_usuario).aggregate(
+        ultima_modificacion=Max('ultima_modificacion'),
+        ultimo_id=Max('id'),
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+    )
+    if not version['total']:
+        return None
+
+    usuario = hashlib.sha256(f'{canal.id}:{nombre_usuario}'.encode('utf-8')).hexdigest()
+    crudo = (
+        f"{usuario}:{version['ultima_modificacion'].isoformat()}:"
+        f"{version['ultimo_id']}:{version['total']}:{version['activos']}"
+    )
+    return usuario[:PREFIJO_USUARIO] + hashlib.sha256(crudo.encode('utf-8')).hexdigest()[PREFIJO_USUARIO:]
+
+
+def ruta_cache(canal_id, clave):
+    return os.path.join(settings.REPORTES_CACHE_DIR, str(canal_id), f'{clave}.pdf')
+
+
+def reporte_en_cache(canal_id, clave):
+    """Ruta del PDF ya generado para esa versión del historial, o None"""
+    ruta = ruta_cache(canal_id, clave)
+    existe = os.path.exists(ruta)
+    metricas.registrar_cache('reportes', existe)
+    return ruta if existe else None
+
+
+def guardar_en_cache(canal_id, clave, contenido):
+    """Escribe el PDF de forma atómica para que nunca se sirva un archivo a medias"""
+    ruta = ruta_cache(canal_id, clave)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+    borrar_versiones_anteriores(canal_id, clave)
+    return ruta
+
+
+def borrar_versiones_anteriores(canal_id, clave):
+    """Borra los PDF del mismo usuario con otra versión del historial: ya no se van a servir"""
+    carpeta = os.path.dirname(ruta_cache(canal_id, clave))
+    for nombre in os.listdir(carpeta):
+        if nombre.startswith(clave[:PREFIJO_USUARIO]) and nombre.endswith('.pdf') and nombre != f'{clave}.pdf':
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except FileNotFoundError:
+                # Otro proceso lo borró primero
+                pass
+
+
+def purgar_trabajos():
+    """
+    Borra los TrabajoReporte terminados hace más de REPORTES_RETENCION_DIAS; el
+    PDF sigue en la caché mientras su versión del historial esté vigente.
+    Devuelve cuántos borró.
+    """
+    limite = timezone.now() - timedelta(days=settings.REPORTES_RETENCION_DIAS)
+    # trabajo_estado_idx (estado, fecha_creacion)
+    borrados, _ = TrabajoReporte.objects.filter(estado__in=['LISTO', 'ERROR'], fecha_creacion__lt=limite).delete()
+    return borrados
+
+
+def asegurar_reporte_en_cache(canal, nombre_usuario):
+    """Ruta del PDF del historial actual, generándolo si no está en caché. None si no hay baneos"""
+    clave = clave_cache(canal, nombre_usuario)
+    if clave is None:
+        return None
+    ruta = reporte_en_cache(canal.id, clave)
+    if not ruta:
+        ruta = guardar_en_cache(canal.id, clave, renderizar_pdf(canal, nombre_usuario))
+    return ruta
+
+
+def nombre_descarga(canal, nombre_usuario):
+    return f'reporte_{nombre_usuario}_{canal.nombre}_{timezone.now().strftime("%Y%m%d_%H%M")}.pdf'
+
+
+def solicitar_reporte(canal, nombre_usuario, user=None, clave=None):
+    """
+    Devuelve un TrabajoReporte para el historial actual del usuario, o None si no tiene baneos.
+    Si el PDF ya está en caché se reutiliza el trabajo LISTO de esa versión (o nace uno
+    LISTO); si ya hay uno en curso para la misma versión se reutiliza; si no, se encola
+    para el pool de procesos. Así la tabla crece con cada PDF generado, no con cada descarga.
+    """
+    clave = clave or clave_cache(canal, nombre_usuario)
+    if clave is None:
+        return None
+
+    ruta = reporte_en_cache(canal.id, clave)
+    if ruta:
+        listo = TrabajoReporte.objects.filter(clave_cache=clave, estado='LISTO').first()
+        if listo:
+            return listo
+        return TrabajoReporte.objects.create(
+            canal=canal,
+            user=user,
+            nombre_usuario=nombre_usuario,
+            clave_cache=clave,
+            estado='LISTO',
+            archivo=ruta,
+            fecha_fin=timezone.now(),
+        )
+
+    en_curso = TrabajoReporte.objects.filter(
+        clave_cache=clave,
+        estado__in=['PENDIENTE', 'PROCESANDO']
+    ).first()
+    if en_curso:
+        if en_curso.fecha_encolado < timezone.now() - timedelta(seconds=settings.REPORTES_VENCIMIENTO):
+            reencolar(en_curso)
+        return en_curso
+
+    trabajo = TrabajoReporte.objects.create(
+        canal=canal,
+        user=user,
+        nombre_usuario=nombre_usuario,
+        clave_cache=clave,
+    )
+    transaction.on_commit(lambda: encolar(trabajo.pk))
+    return trabajo
+
+
+def reencolar(trabajo):
+    """
+    Vuelve a PENDIENTE y reenvía al pool un trabajo que lleva más de
+    REPORTES_VENCIMIENTO en curso: el pool se reinició con el proceso o el
+    worker murió a mitad. Si otra petición ya lo reencoló no hace nada.
+    """
+    ahora = timezone.now()
+    reencolado = TrabajoReporte.objects.filter(
+        pk=trabajo.pk,
+        estado__in=['PENDIENTE', 'PROCESANDO'],
+        fecha_encolado=trabajo.fecha_encolado,
+    ).update(estado='PENDIENTE', fecha_encolado=ahora)
+    if reencolado:
+        logger.warning('Trabajo de reporte %s colgado desde %s; se vuelve a encolar', trabajo.pk, trabajo.fecha_encolado)
+        trabajo.estado, trabajo.fecha_encolado = 'PENDIENTE', ahora
+        transaction.on_commit(lambda: encolar(trabajo.pk))
+    return bool(reencolado)
+
+
+def liberar_colgados():
+    """Devuelve a PENDIENTE los trabajos PROCESANDO de más de REPORTES_VENCIMIENTO (su worker murió)"""
+    return TrabajoReporte.objects.filter(
+        estado='PROCESANDO',
+        fecha_encolado__lt=timezone.now() - timedelta(seconds=settings.REPORTES_VENCIMIENTO),
+    ).update(estado='PENDIENTE', fecha_encolado=timezone.now())
+
+
+def obtener_executor():
+    global _executor
+    if _executor is None and settings.REPORTES_WORKERS > 0:
+        with _executor_lock:
+            # Otro hilo pudo crearlo mientras se esperaba el lock
+            if _executor is None:
+                # spawn: los procesos no heredan las conexiones abiertas a la base de datos
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.REPORTES_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=procesos.iniciar,
+                )
+    return _executor
+
+
+def encolar(trabajo_id):
+    """
+    Envía el trabajo al pool de procesos. Si no hay pool (REPORTES_WORKERS = 0) o está
+    roto, el trabajo queda PENDIENTE en la base y lo toma `manage.py procesar_reportes`.
+    """
+    global _executor
+    executor = obtener_executor()
+    if executor is None:
+        return
+    try:
+        executor.submit(procesos.generar_reporte, trabajo_id)
+    except RuntimeError:
+        logger.exception('El pool de reportes no acepta trabajos; queda pendiente %s', trabajo_id)
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+
+
+def tomar_trabajo(trabajo_id):
+    """Marca el trabajo como PROCESANDO solo si seguía pendiente, para que un único worker lo procese"""
+    return TrabajoReporte.objects.filter(pk=trabajo_id, estado='PENDIENTE').update(
+        estado='PROCESANDO',
+        fecha_encolado=timezone.now(),
+    ) == 1
+
+
+def procesar_trabajo(trabajo_id):
+    """Genera el PDF de un trabajo y lo guarda en la caché; se ejecuta en un worker"""
+    if not tomar_trabajo(trabajo_id):
+        return
+
+    trabajo = TrabajoReporte.objects.select_related('canal').get(pk=trabajo_id)
+    try:
+        ruta = reporte_en_cache(trabajo.canal_id, trabajo.clave_cache)
+        if not ruta:
+            contenido = renderizar_pdf(trabajo.canal, trabajo.nombre_usuario)
+            ruta = guardar_en_cache(trabajo.canal_id, trabajo.clave_cache, contenido)
+        trabajo.estado = 'LISTO'
+        trabajo.archivo = ruta
+    except Exception as error:
+        logger.exception('Error al generar el reporte %s', trabajo_id)
+        trabajo.estado = 'ERROR'
+        trabajo.error = str(error)
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=['estado', 'archivo', 'error', 'fecha_fin'])
+    # Con el pool no corre procesar_reportes: la limpieza va con cada PDF generado
+    purgar_trabajos()
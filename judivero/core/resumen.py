@@ -0,0 +1,65 @@
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncMonth
+
+from .models import Baneos
+
+
+def resumen_moderacion_usuario(canal, nombre_usuario, incluir_baneos=True):
+    """
+    Historial y estadísticas de un usuario en un canal.
+
+    Todas las cifras salen de una sola consulta agrupada por mes con agregación
+    condicional; los totales se suman a partir de esos grupos. Si se piden los
+    baneos se hace una segunda consulta, y ninguna si el usuario no tiene registros.
+    """
+    baneos = Baneos.objects.filter(canal=canal, nombre_usuario=nombre_usuario)
+    resumen = _armar_resumen(nombre_usuario, list(_baneos_por_mes(baneos)))
+
+    if incluir_baneos and resumen['total_baneos']:
+        resumen['baneos'] = list(_baneos_ordenados(baneos))
+
+    return resumen
+
+
+async def aresumen_moderacion_usuario(canal, nombre_usuario, incluir_baneos=True):
+    """Versión async de resumen_moderacion_usuario, con las mismas consultas"""
+    baneos = Baneos.objects.filter(canal=canal, nombre_usuario=nombre_usuario)
+    resumen = _armar_resumen(nombre_usuario, [grupo async for grupo in _baneos_por_mes(baneos)])
+
+    if incluir_baneos and resumen['total_baneos']:
+        resumen['baneos'] = [baneo async for baneo in _baneos_ordenados(baneos)]
+
+    return resumen
+
+
+def _baneos_por_mes(baneos):
+    return baneos.order_by().annotate(mes=TruncMonth('fecha_baneo')).values('mes').annotate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+        primero=Min('fecha_baneo'),
+        ultimo=Max('fecha_baneo'),
+    ).order_by('mes')
+
+
+def _baneos_ordenados(baneos):
+    return baneos.select_related('user').order_by('-fecha_baneo', '-id')
+
+
+def _armar_resumen(nombre_usuario, por_mes):
+    total_baneos = sum(grupo['total'] for grupo in por_mes)
+    baneos_activos = sum(grupo['activos'] for grupo in por_mes)
+
+    return {
+        'nombre_usuario': nombre_usuario,
+        'total_baneos': total_baneos,
+        'baneos_activos': baneos_activos,
+        'baneos_inactivos': total_baneos - baneos_activos,
+        'es_reincidente': total_baneos > 1,
+        'primer_baneo': por_mes[0]['primero'] if por_mes else None,
+        'ultimo_baneo': por_mes[-1]['ultimo'] if por_mes else None,
+        'baneos_por_mes': [
+            {'mes': grupo['mes'], 'total': grupo['total'], 'activos': grupo['activos']}
+            for grupo in por_mes
+        ],
+        'baneos': [],
+    }
@@ -0,0 +1,232 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from .busqueda import actualizar_usuario_indexado
+from .busqueda_notas import desindexar_nota, indexar_nota
+from .canales import invalidar_canales
+from .comandos import invalidar_comandos
+from .contadores import ajustar_contadores, invalidar_canal
+from .eventos import publicar, publicar_baneo, publicar_comando, publicar_nota
+from .fragmentos import invalidar_fragmentos
+from .evidencias import restar_referencia, sumar_referencia
+from .imagenes import procesar_imagen_baneo
+from .metricas import registrar_imagen_subida
+from .models import Baneos, CanalTwitch, Comando, Nota
+
+
+@receiver(pre_save, sender=Baneos)
+def recordar_valores_anteriores(sender, instance, update_fields=None, **kwargs):
+    """
+    Guarda usuario, imagen y estado previos para reindexar al usuario anterior,
+    detectar imágenes nuevas y ajustar los contadores del canal
+    """
+    instance._usuario_anterior = None
+    instance._imagen_anterior = None
+    instance._activo_anterior = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {'canal', 'nombre_usuario', 'imagen', 'activo'} & set(update_fields):
+        return
+    anterior = Baneos.objects.filter(pk=instance.pk).values_list(
+        'canal_id', 'nombre_usuario', 'imagen', 'activo'
+    ).first()
+    if anterior:
+        instance._usuario_anterior = anterior[:2]
+        instance._imagen_anterior = anterior[2] or ''
+        instance._activo_anterior = anterior[3]
+
+
+@receiver(post_save, sender=Baneos)
+def indexar_usuario_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    actualizar_usuario_indexado(instance.canal_id, instance.nombre_usuario)
+    anterior = getattr(instance, '_usuario_anterior', None)
+    if anterior and anterior != (instance.canal_id, instance.nombre_usuario):
+        actualizar_usuario_indexado(*anterior)
+
+
+@receiver(post_save, sender=Baneos)
+def procesar_imagen_guardada(sender, instance, created=False, raw=False, **kwargs):
+    """Genera las variantes de la evidencia cuando se sube o cambia la imagen"""
+    if raw:
+        return
+    anterior = getattr(instance, '_imagen_anterior', None)
+    nombre_actual = instance.imagen.name or ''
+    if created and not nombre_actual:
+        return
+    if not created and (anterior is None or anterior == nombre_actual):
+        return
+
+    instance.imagen_hash, instance.imagen_variantes = procesar_imagen_baneo(instance)
+    Baneos.objects.filter(pk=instance.pk).update(
+        imagen_hash=instance.imagen_hash,
+        imagen_variantes=instance.imagen_variantes,
+    )
+    if nombre_actual:
+        registrar_imagen_subida(instance.imagen.size)
+
+
+@receiver(post_save, sender=Baneos)
+def contar_referencias_imagen(sender, instance, created=False, raw=False, **kwargs):
+    """Mantiene el contador de baneos que apuntan a cada archivo de evidencia"""
+    if raw:
+        return
+    anterior = getattr(instance, '_imagen_anterior', None)
+    nombre_actual = instance.imagen.name or ''
+    if created:
+        sumar_referencia(nombre_actual)
+    elif anterior is not None and anterior != nombre_actual:
+        restar_referencia(anterior)
+        sumar_referencia(nombre_actual)
+
+
+@receiver(post_save, sender=Baneos)
+def contar_baneo_guardado(sender, instance, created=False, raw=False, **kwargs):
+    """Ajusta total_baneos y total_baneos_activos del canal según lo que cambió"""
+    if raw:
+        return
+    activo = 1 if instance.activo else 0
+    if created:
+        ajustar_contadores(instance.canal_id, baneos=1, baneos_activos=activo)
+        return
+
+    anterior = getattr(instance, '_usuario_anterior', None)
+    activo_anterior = getattr(instance, '_activo_anterior', None)
+    if anterior is None or activo_anterior is None:
+        return
+    canal_anterior = anterior[0]
+    if canal_anterior != instance.canal_id:
+        ajustar_contadores(canal_anterior, baneos=-1, baneos_activos=-int(activo_anterior))
+        ajustar_contadores(instance.canal_id, baneos=1, baneos_activos=activo)
+    elif activo_anterior != instance.activo:
+        ajustar_contadores(instance.canal_id, baneos_activos=activo - int(activo_anterior))
+
+
+@receiver(post_delete, sender=Baneos)
+def indexar_usuario_borrado(sender, instance, **kwargs):
+    actualizar_usuario_indexado(instance.canal_id, instance.nombre_usuario)
+
+
+@receiver(post_delete, sender=Baneos)
+def liberar_referencia_imagen(sender, instance, **kwargs):
+    restar_referencia(instance.imagen.name)
+
+
+@receiver(post_delete, sender=Baneos)
+def descontar_baneo_borrado(sender, instance, **kwargs):
+    ajustar_contadores(instance.canal_id, baneos=-1, baneos_activos=-1 if instance.activo else 0)
+
+
+@receiver(pre_save, sender=Comando)
+def recordar_canal_comando(sender, instance, update_fields=None, **kwargs):
+    """Guarda el canal previo (como tupla, el canal puede ser None) por si el comando cambia de canal"""
+    instance._canal_anterior = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and 'canal' not in update_fields:
+        return
+    instance._canal_anterior = Comando.objects.filter(pk=instance.pk).values_list('canal_id').first()
+
+
+@receiver(post_save, sender=Comando)
+def contar_comando_guardado(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        ajustar_contadores(instance.canal_id, comandos=1)
+        return
+    anterior = getattr(instance, '_canal_anterior', None)
+    if anterior is not None and anterior[0] != instance.canal_id:
+        ajustar_contadores(anterior[0], comandos=-1)
+        ajustar_contadores(instance.canal_id, comandos=1)
+
+
+@receiver(post_delete, sender=Comando)
+def descontar_comando_borrado(sender, instance, **kwargs):
+    ajustar_contadores(instance.canal_id, comandos=-1)
+
+
+@receiver(post_save, sender=Comando)
+@receiver(post_delete, sender=Comando)
+def refrescar_comandos(sender, instance, **kwargs):
+    invalidar_comandos(instance.canal_id)
+    invalidar_fragmentos(instance.canal_id)
+    anterior = getattr(instance, '_canal_anterior', None)
+    if anterior is not None and anterior[0] != instance.canal_id:
+        invalidar_comandos(anterior[0])
+        invalidar_fragmentos(anterior[0])
+
+
+@receiver(post_save, sender=Baneos)
+@receiver(post_delete, sender=Baneos)
+def refrescar_fragmentos_baneo(sender, instance, **kwargs):
+    """Cualquier edición de un baneo (motivo, fechas, imagen) cambia la tabla del inicio"""
+    invalidar_canal(instance.canal_id, contadores=False)
+    anterior = getattr(instance, '_usuario_anterior', None)
+    if anterior and anterior[0] != instance.canal_id:
+        invalidar_canal(anterior[0], contadores=False)
+
+
+@receiver(post_save, sender=CanalTwitch)
+@receiver(post_delete, sender=CanalTwitch)
+def refrescar_canales(sender, **kwargs):
+    invalidar_canales()
+
+
+@receiver(post_save, sender=Nota)
+def indexar_nota_guardada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    indexar_nota(instance)
+
+
+@receiver(post_delete, sender=Nota)
+def desindexar_nota_borrada(sender, instance, **kwargs):
+    desindexar_nota(instance.pk)
+
+
+# Feed en vivo (core.eventos): se publica al confirmar la transacción para no
+# anunciar cambios que después se deshacen
+
+@receiver(post_save, sender=Baneos)
+def anunciar_baneo_guardado(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_usuario_anterior', None)
+    if anterior and anterior[0] != instance.canal_id:
+        transaction.on_commit(lambda: publicar(anterior[0], 'baneo', accion='borrado', id=instance.pk, html=''))
+    transaction.on_commit(lambda: publicar_baneo(instance, 'creado' if created else 'modificado'))
+
+
+@receiver(post_delete, sender=Baneos)
+def anunciar_baneo_borrado(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publicar_baneo(instance, 'borrado'))
+
+
+@receiver(post_save, sender=Comando)
+def anunciar_comando_guardado(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_canal_anterior', None)
+    if anterior is not None and anterior[0] != instance.canal_id:
+        transaction.on_commit(lambda: publicar(anterior[0], 'comando', accion='borrado', id=instance.pk, html=''))
+    transaction.on_commit(lambda: publicar_comando(instance, 'creado' if created else 'modificado'))
+
+
+@receiver(post_delete, sender=Comando)
+def anunciar_comando_borrado(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publicar_comando(instance, 'borrado'))
+
+
+@receiver(post_save, sender=Nota)
+def anunciar_nota_guardada(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: publicar_nota(instance, 'creado' if created else 'modificado'))
+
+
+@receiver(post_delete, sender=Nota)
+def anunciar_nota_borrada(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publicar_nota(instance, 'borrado'))
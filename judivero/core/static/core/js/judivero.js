@@ -0,0 +1,34 @@
+// Toggle Dropdown
+function toggleDropdown() {
+    const dropdown = document.querySelector('.dropdown');
+    dropdown.classList.toggle('active');
+}
+
+// Cerrar dropdown al hacer clic fuera
+document.addEventListener('click', function (event) {
+    const dropdown = document.querySelector('.dropdown');
+    if (dropdown && !dropdown.contains(event.target)) {
+        dropdown.classList.remove('active');
+    }
+});
+
+// Aplica un cambio del feed en vivo (core.eventos) sobre una lista:
+// reemplaza o agrega el elemento con ese id, o lo quita si se borró
+function aplicarCambio(contenedor, atributo, cambio) {
+    const actual = contenedor.querySelector('[' + atributo + '="' + cambio.id + '"]');
+    if (cambio.accion === 'borrado') {
+        if (actual) {
+            actual.remove();
+        }
+        return;
+    }
+    const plantilla = document.createElement('template');
+    plantilla.innerHTML = cambio.html;
+    const nuevo = plantilla.content.firstElementChild;
+    if (actual) {
+        actual.replaceWith(nuevo);
+    } else {
+        contenedor.querySelectorAll('.fila-vacia').forEach(fila => fila.remove());
+        contenedor.prepend(nuevo);
+    }
+}
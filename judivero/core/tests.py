@@ -1,3 +1,710 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.db.models import Max, Min
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import _cambiar_estado_por_lotes
+from .busqueda import buscar_usuarios, infractores_en_varios_canales
+from .busqueda_notas import buscar_notas, motor
+from .canales import invalidar_canales
+from .comandos import resolver_comando
+from .contadores import cambiar_estado_baneos, contadores_reales
+from .eventos import escuchar, hay_suscriptores, publicar
+from .evidencias import almacenamiento, recolectar_huerfanos
+from .expiracion import expirar_baneos
+from .exportacion import generar_zip_reportes
+from . import metricas
+from .importacion import ErrorImportacion, importar_baneos, leer_usuarios
+from .reportes import procesar_trabajo, purgar_trabajos, solicitar_reporte
+from .paginacion import PaginadorEstimado, apaginar_baneos, codificar_cursor
+from .models import ArchivoEvidencia, Baneos, CanalTwitch, Comando, Infractor, Nota, TrabajoReporte, TrigramaUsuario, UsuarioBaneado
+
+from .management.commands.estresar_sqlite import ALIAS, base_temporal, perfiles, probar
+from .management.commands.verificar_planes import consultas_criticas, scans_completos
+
+
+class PlanesConsultasTests(TestCase):
+    """Lo mismo que `manage.py verificar_planes`, dentro de la suite"""
+
+    def test_consultas_criticas_usan_indices(self):
+        for nombre, queryset in consultas_criticas():
+            with self.subTest(nombre):
+                plan = queryset.explain()
+                self.assertEqual(scans_completos(plan), [], f'{nombre} recorre una tabla completa:\n{plan}')
+
+
+class PaginacionCursorTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        self.client.force_login(get_user_model().objects.create_user('moderador'))
+
+    def test_recorre_empates_de_fecha_sin_saltos_ni_repetidos(self):
+        for numero in range(7):
+            Baneos.objects.create(canal=self.canal, nombre_usuario=f'usuario{numero}', motivo='spam')
+        # Raid: todos con la misma fecha, el id desempata
+        Baneos.objects.update(fecha_baneo=timezone.now())
+        esperados = list(Baneos.objects.order_by('-id').values_list('id', flat=True))
+
+        vistos, cursor = [], None
+        while True:
+            baneos, cursor = async_to_sync(apaginar_baneos)(Baneos.objects.filter(canal=self.canal), cursor, 3)
+            vistos += [baneo.id for baneo in baneos]
+            if cursor is None:
+                break
+        self.assertEqual(vistos, esperados)
+
+    def test_vista_con_cursor_siguiente(self):
+        for numero in range(3):
+            Baneos.objects.create(canal=self.canal, nombre_usuario=f'usuario{numero}', motivo='spam')
+        primero = Baneos.objects.order_by('-fecha_baneo', '-id').first()
+
+        respuesta = self.client.get(reverse('baneos_pagina'), {'cursor': codificar_cursor(primero)})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['cantidad'], 2)
+        self.assertIsNone(respuesta.json()['siguiente_cursor'])
+
+    def test_cursores_invalidos_o_alterados(self):
+        alterados = [
+            'no es base64!',
+            'ñandú',
+            base64.urlsafe_b64encode(b'sin separador').decode(),
+            base64.urlsafe_b64encode(b'2024-01-01T00:00:00+00:00|uno').decode(),
+            base64.urlsafe_b64encode(b'ayer|1').decode(),
+            base64.urlsafe_b64encode(b'2024-01-01T00:00:00|1').decode(),
+            base64.urlsafe_b64encode(b'2024-01-01T00:00:00+00:00|1|2').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe|1').decode(),
+        ]
+        for cursor in alterados:
+            with self.subTest(cursor):
+                respuesta = self.client.get(reverse('baneos_pagina'), {'cursor': cursor})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json(), {'error': 'Cursor inválido'})
+
+
+class BusquedaUsuariosTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        self.otro = CanalTwitch.objects.create(nombre='otro', streamer='otro')
+
+    def _banear(self, nombre, canal=None, veces=1):
+        for _ in range(veces):
+            baneo = Baneos.objects.create(canal=canal or self.canal, nombre_usuario=nombre, motivo='spam')
+        return baneo
+
+    def _buscar(self, texto, canal=None):
+        return list(buscar_usuarios(canal or self.canal, texto).values_list('nombre_usuario', flat=True))
+
+    def test_exacto_prefijo_y_subcadena(self):
+        self._banear('Spam')
+        self._banear('spammer', veces=2)
+        self._banear('xspamx')
+        self._banear('nada')
+        self._banear('spam', canal=self.otro)
+
+        self.assertEqual(self._buscar('SPAM'), ['Spam', 'spammer', 'xspamx'])
+        # Menos de 3 caracteres: solo prefijos
+        self.assertEqual(self._buscar('sp'), ['spammer', 'Spam'])
+        # Todas subcadenas: más baneos primero
+        self.assertEqual(self._buscar('pam'), ['spammer', 'Spam', 'xspamx'])
+        self.assertEqual(self._buscar('mx'), [])
+        self.assertEqual(self._buscar('s%m'), [])
+
+    def test_renombrar_reindexa(self):
+        baneo = self._banear('viejo_nombre')
+        baneo.nombre_usuario = 'nuevo_nombre'
+        baneo.save()
+
+        self.assertEqual(self._buscar('viejo'), [])
+        self.assertEqual(self._buscar('nuevo'), ['nuevo_nombre'])
+        self.assertEqual(list(UsuarioBaneado.objects.values_list('nombre_usuario', flat=True)), ['nuevo_nombre'])
+        self.assertFalse(TrigramaUsuario.objects.filter(trigrama='vie').exists())
+
+    def test_mover_de_canal_reindexa(self):
+        self._banear('raider')
+        baneo = self._banear('raider')
+        baneo.canal = self.otro
+        baneo.save()
+
+        self.assertEqual(UsuarioBaneado.objects.get(canal=self.canal).total_baneos, 1)
+        self.assertEqual(UsuarioBaneado.objects.get(canal=self.otro).total_baneos, 1)
+        self.assertEqual(self._buscar('aid', canal=self.otro), ['raider'])
+
+        Baneos.objects.filter(canal=self.canal).delete()
+        self.assertEqual(self._buscar('raider'), [])
+        self.assertFalse(TrigramaUsuario.objects.filter(canal=self.canal).exists())
+
+
+class BusquedaNotasTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        self.raid = Nota.objects.create(canal=self.canal, titulo='Raid de bots', nota='Entraron 200 cuentas con spam')
+        self.reglas = Nota.objects.create(
+            canal=self.canal, titulo='<script>alert(1)</script> reglas', nota='Nada de spam ni <b>links</b>',
+            etiqueta='reglas', importante=True,
+        )
+        Nota.objects.create(canal=CanalTwitch.objects.create(nombre='otro', streamer='otro'), titulo='spam', nota='spam')
+
+    def _buscar(self, texto, **filtros):
+        return buscar_notas(self.canal, texto, **filtros)[0]
+
+    def test_usa_fts5(self):
+        self.assertEqual(motor(), 'sqlite')
+
+    def test_rango_prefijos_y_filtros(self):
+        self.assertEqual(self._buscar('raid'), [self.raid])
+        self.assertEqual(self._buscar('cuent'), [self.raid])
+        self.assertEqual({nota.pk for nota in self._buscar('spam')}, {self.raid.pk, self.reglas.pk})
+        self.assertEqual(self._buscar('spam', importante=True), [self.reglas])
+        # La etiqueta pesa más que el contenido
+        self.assertEqual(self._buscar('reglas spam')[0], self.reglas)
+
+    def test_operadores_y_simbolos_no_vacian_el_resultado(self):
+        for texto in ['raid AND spam', 'OR raid', 'raid NEAR(', 'NOT raid', '"raid', 'raid*', 'raid:', '(raid']:
+            with self.subTest(texto):
+                self.assertEqual(self._buscar(texto), [self.raid])
+        self.assertEqual(self._buscar('AND OR'), list(Nota.objects.filter(canal=self.canal).order_by('-fecha_creacion', '-id')))
+
+    def test_resaltado_escapa_el_html(self):
+        nota = self._buscar('script')[0]
+        self.assertEqual(
+            nota.titulo_resaltado,
+            '&lt;<mark>script</mark>&gt;alert(1)&lt;/<mark>script</mark>&gt; reglas',
+        )
+        self.assertIn('&lt;b&gt;', self._buscar('links')[0].fragmento)
+
+
+class InfractoresTests(TestCase):
+    def setUp(self):
+        self.canales = [CanalTwitch.objects.create(nombre=nombre, streamer=nombre) for nombre in ['uno', 'dos', 'tres']]
+        self.moderador = get_user_model().objects.create_user('moderador')
+        for canal in self.canales:
+            Baneos.objects.create(canal=canal, nombre_usuario='Raider', motivo='spam')
+        # En el tercer canal, con otras mayúsculas y por otro moderador
+        Baneos.objects.create(canal=self.canales[2], nombre_usuario='RAIDER', motivo='spam', user=self.moderador)
+
+    def _resumen(self):
+        infractor = Infractor.objects.get(nombre_normalizado='raider')
+        return infractor.total_canales, infractor.canales_con_activos, infractor.total_baneos, infractor.baneos_activos
+
+    def test_cuenta_canales_sin_distinguir_mayusculas(self):
+        self.assertEqual(self._resumen(), (3, 3, 4, 4))
+        _cambiar_estado_por_lotes(Baneos.objects.filter(canal=self.canales[0]), activo=False)
+        self.assertEqual(self._resumen(), (3, 2, 4, 3))
+        self.assertEqual([infractor.nombre_normalizado for infractor in infractores_en_varios_canales()], ['raider'])
+
+    def test_borrar_un_canal(self):
+        self.canales[0].delete()
+        self.assertEqual(self._resumen(), (2, 2, 3, 3))
+        self.canales[1].delete()
+        self.assertEqual(self._resumen(), (1, 1, 2, 2))
+        self.assertEqual(list(infractores_en_varios_canales()), [])
+
+    def test_borrar_el_moderador_borra_sus_baneos(self):
+        self.moderador.delete()
+        self.assertEqual(self._resumen(), (3, 3, 3, 3))
+        Baneos.objects.all().delete()
+        self.assertFalse(Infractor.objects.exists())
+
+
+class ExpiracionTests(TestCase):
+    def test_expira_vencidos_con_contadores_e_indice(self):
+        canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        ayer = timezone.now() - timedelta(days=1)
+        for nombre in ['uno', 'uno', 'dos']:
+            Baneos.objects.create(canal=canal, nombre_usuario=nombre, motivo='spam', desbaneo=ayer)
+        vigente = Baneos.objects.create(
+            canal=canal, nombre_usuario='dos', motivo='spam', desbaneo=timezone.now() + timedelta(days=1)
+        )
+
+        # Fijo por lote y por canal, sin consultas por usuario
+        with self.assertNumQueries(15):
+            self.assertEqual(expirar_baneos(), 3)
+
+        self.assertEqual(list(Baneos.objects.filter(activo=True)), [vigente])
+        canal.refresh_from_db()
+        self.assertEqual(canal.total_baneos_activos, 1)
+        activos = dict(UsuarioBaneado.objects.values_list('nombre_usuario', 'baneos_activos'))
+        self.assertEqual(activos, {'uno': 0, 'dos': 1})
+        self.assertEqual(expirar_baneos(), 0)
+
+
+class CacheComandosTests(TestCase):
+    def test_invalida_al_confirmar(self):
+        canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        self.assertIsNone(resolver_comando(canal, '!hola', 'EVERYONE'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comando.objects.create(canal=canal, nombre='!hola', juego_o_significado='hola')
+            # Sin confirmar, la tabla en caché sigue siendo la anterior
+            self.assertIsNone(resolver_comando(canal, '!hola', 'EVERYONE'))
+
+        self.assertEqual(resolver_comando(canal, '!hola', 'EVERYONE').respuesta, 'hola')
+
+
+@override_settings(API_TOKENS=['token'])
+class ApiBaneosTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        self.baneo = Baneos.objects.create(canal=self.canal, nombre_usuario='uno', motivo='spam')
+        self.url = reverse('api_baneos', args=[self.canal.pk])
+
+    def _etag(self):
+        return self.client.get(self.url, HTTP_AUTHORIZATION='Bearer token')['ETag']
+
+    def test_etag_cambia_con_ediciones_y_reactivaciones(self):
+        inicial = self._etag()
+        self.assertEqual(
+            self.client.get(self.url, HTTP_AUTHORIZATION='Bearer token', HTTP_IF_NONE_MATCH=inicial).status_code,
+            304,
+        )
+
+        Baneos.objects.filter(pk=self.baneo.pk).update(ultima_modificacion=timezone.now() - timedelta(days=1))
+        antes = self._etag()
+        self.baneo.refresh_from_db()
+        self.baneo.motivo = 'otro motivo'
+        self.baneo.save()
+        editado = self._etag()
+        self.assertNotEqual(editado, antes)
+
+        # Desactivar y reactivar deja el mismo id máximo y el mismo total de activos
+        cambiar_estado_baneos(Baneos.objects.filter(pk=self.baneo.pk), False)
+        cambiar_estado_baneos(Baneos.objects.filter(pk=self.baneo.pk), True)
+        self.assertNotEqual(self._etag(), editado)
+
+    def test_borrar_un_baneo_viejo_no_da_304(self):
+        Baneos.objects.create(canal=self.canal, nombre_usuario='dos', motivo='spam')
+        respuesta = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer token')
+        self.assertNotIn('Last-Modified', respuesta)
+
+        self.baneo.delete()
+        respuesta = self.client.get(
+            self.url, HTTP_AUTHORIZATION='Bearer token',
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([fila['nombre_usuario'] for fila in respuesta.json()['baneos']], ['dos'])
+
+    def test_token_solo_en_la_cabecera(self):
+        self.assertEqual(self.client.get(self.url, {'token': 'token'}).status_code, 401)
+
+
+class AccionesMasivasTests(TestCase):
+    def _desactivar(self, usuarios):
+        Baneos.objects.all().delete()
+        for canal in CanalTwitch.objects.all():
+            for numero in range(usuarios):
+                Baneos.objects.create(canal=canal, nombre_usuario=f'usuario{numero}', motivo='spam')
+        with CaptureQueriesContext(connection) as consultas, \
+                mock.patch('core.contadores.invalidar_canales') as invalidar:
+            self.assertEqual(_cambiar_estado_por_lotes(Baneos.objects.all(), activo=False), usuarios * 2)
+        self.assertEqual(invalidar.call_count, 1)
+        return len(consultas)
+
+    def test_consultas_fijas_por_canal(self):
+        for nombre in ['uno', 'dos']:
+            CanalTwitch.objects.create(nombre=nombre, streamer=nombre)
+        self.assertEqual(self._desactivar(3), self._desactivar(20))
+        self.assertFalse(UsuarioBaneado.objects.filter(baneos_activos__gt=0).exists())
+        for canal in CanalTwitch.objects.all():
+            self.assertEqual(canal.total_baneos_activos, 0)
+
+
+class ExportacionZipTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=os.path.join(carpeta, 'media'),
+            REPORTES_CACHE_DIR=os.path.join(carpeta, 'reportes'),
+        ))
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+
+    def test_nombres_repetidos_e_invalidos(self):
+        nombres = ['ok_user', 'ok user', 'OK_USER', '..']
+        for nombre in nombres:
+            Baneos.objects.create(canal=self.canal, nombre_usuario=nombre, motivo='spam')
+
+        contenido = b''.join(generar_zip_reportes(self.canal, nombres, workers=0))
+
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo_zip:
+            self.assertIsNone(archivo_zip.testzip())
+            entradas = archivo_zip.namelist()
+            self.assertEqual(entradas, ['ok_user.pdf', 'ok_user_2.pdf', 'OK_USER_3.pdf', 'errores.txt'])
+            for entrada in entradas[:3]:
+                self.assertTrue(archivo_zip.read(entrada).startswith(b'%PDF'))
+            self.assertIn('..:', archivo_zip.read('errores.txt').decode('utf-8'))
+
+    def test_pdf_borrado_de_la_cache(self):
+        Baneos.objects.create(canal=self.canal, nombre_usuario='uno', motivo='spam')
+        # Como si borrar_versiones_anteriores lo quitara justo antes de copiarlo
+        with mock.patch('core.procesos.preparar_reporte', return_value='/no/existe.pdf'):
+            contenido = b''.join(generar_zip_reportes(self.canal, ['uno'], workers=0))
+
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo_zip:
+            self.assertEqual(archivo_zip.namelist(), ['errores.txt'])
+
+
+@override_settings(REPORTES_WORKERS=0)
+class TrabajosReporteTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        self.enterContext(override_settings(REPORTES_CACHE_DIR=carpeta))
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        Baneos.objects.create(canal=self.canal, nombre_usuario='uno', motivo='spam')
+
+    def test_descargas_repetidas_reutilizan_el_trabajo(self):
+        trabajo = solicitar_reporte(self.canal, 'uno')
+        self.assertEqual(trabajo.estado, 'PENDIENTE')
+        procesar_trabajo(trabajo.pk)
+
+        for _ in range(3):
+            self.assertEqual(solicitar_reporte(self.canal, 'uno').pk, trabajo.pk)
+        self.assertEqual(TrabajoReporte.objects.count(), 1)
+
+    @override_settings(PERFILADO=True)
+    def test_fase_pdf_en_server_timing(self):
+        self.client.force_login(get_user_model().objects.create_user('moderador'))
+        respuesta = self.client.get(reverse('generar_reporte_pdf', args=['uno']))
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertIn('pdf;dur=', respuesta['Server-Timing'])
+
+    def test_purga_los_terminados_viejos(self):
+        viejo = TrabajoReporte.objects.create(canal=self.canal, nombre_usuario='uno', clave_cache='x', estado='LISTO')
+        TrabajoReporte.objects.filter(pk=viejo.pk).update(fecha_creacion=timezone.now() - timedelta(days=30))
+        pendiente = TrabajoReporte.objects.create(canal=self.canal, nombre_usuario='uno', clave_cache='y')
+        TrabajoReporte.objects.filter(pk=pendiente.pk).update(fecha_creacion=timezone.now() - timedelta(days=30))
+        reciente = TrabajoReporte.objects.create(canal=self.canal, nombre_usuario='uno', clave_cache='z', estado='LISTO')
+
+        self.assertEqual(purgar_trabajos(), 1)
+        self.assertEqual(set(TrabajoReporte.objects.values_list('pk', flat=True)), {pendiente.pk, reciente.pk})
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        self.client.force_login(get_user_model().objects.create_user('moderador'))
+        self.url = reverse('importar_baneos')
+
+    def _importar(self, datos):
+        return self.client.post(self.url, json.dumps(datos), content_type='application/json')
+
+    def test_json_solo_acepta_textos(self):
+        self.assertEqual(leer_usuarios('{"usuarios": [" uno ", {"nombre_usuario": "dos"}]}'), ['uno', 'dos'])
+        for texto in ['["uno", null]', '[123]', '[{"nombre_usuario": {"a": 1}}]']:
+            with self.subTest(texto), self.assertRaises(ErrorImportacion):
+                leer_usuarios(texto)
+
+    def test_resumen_contadores_e_indice(self):
+        Baneos.objects.create(canal=self.canal, nombre_usuario='Activo', motivo='antes')
+        respuesta = self._importar({
+            'usuarios': ['uno', '@dos', 'UNO', 'activo', 'no valido', 'x' * 26],
+            'motivo': 'raid',
+        })
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json(), {
+            'creados': 2, 'ya_activos': ['activo'], 'repetidos': 1, 'invalidos': ['no valido', 'x' * 26],
+        })
+        self.canal.refresh_from_db()
+        self.assertEqual((self.canal.total_baneos, self.canal.total_baneos_activos), (3, 3))
+        self.assertEqual(
+            dict(UsuarioBaneado.objects.values_list('nombre_usuario', 'total_baneos')),
+            {'Activo': 1, 'uno': 1, 'dos': 1},
+        )
+
+    def test_por_lotes(self):
+        nombres = [f'usuario{numero}' for numero in range(7)]
+        Baneos.objects.create(canal=self.canal, nombre_usuario='usuario3', motivo='antes')
+        resumen = importar_baneos(self.canal, nombres, 'raid', tamano_lote=2)
+        self.assertEqual((resumen['creados'], resumen['ya_activos']), (6, ['usuario3']))
+        self.assertEqual(contadores_reales()[self.canal.pk], (0, 7, 7))
+        self.canal.refresh_from_db()
+        self.assertEqual(self.canal.total_baneos, 7)
+        self.assertEqual(UsuarioBaneado.objects.filter(canal=self.canal).count(), 7)
+
+    def test_motivo_debe_ser_texto(self):
+        for motivo in [['x'], {'a': 1}, 5]:
+            with self.subTest(motivo):
+                self.assertEqual(self._importar({'usuarios': ['uno'], 'motivo': motivo}).status_code, 400)
+        self.assertFalse(Baneos.objects.exists())
+
+
+class HuerfanosTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=carpeta))
+        self.storage = almacenamiento()
+
+    def _subir(self, contenido, antiguedad):
+        nombre = self.storage.save(f'{self.storage.prefijo}/x.png', ContentFile(contenido))
+        fecha = time.time() - antiguedad
+        os.utime(self.storage.path(nombre), (fecha, fecha))
+        return nombre
+
+    def test_respeta_subidas_recientes(self):
+        viejo = self._subir(b'viejo', antiguedad=7200)
+        nuevo = self._subir(b'nuevo', antiguedad=0)
+        registrado = self._subir(b'registrado', antiguedad=7200)
+        # Fila recién creada con el contador todavía en 0 (sumar_referencia a medio camino)
+        ArchivoEvidencia.objects.create(nombre=registrado, referencias=0)
+
+        borrados, _ = recolectar_huerfanos(gracia=3600)
+
+        self.assertEqual(borrados, 1)
+        self.assertFalse(self.storage.exists(viejo))
+        self.assertTrue(self.storage.exists(nuevo))
+        self.assertTrue(self.storage.exists(registrado))
+        self.assertEqual(recolectar_huerfanos(gracia=0)[0], 2)
+
+
+class AdminListadosTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        for numero in range(12):
+            Baneos.objects.create(canal=self.canal, nombre_usuario=f'usuario{numero}', motivo='spam')
+
+    def test_paginas_que_solo_existian_en_la_estimacion(self):
+        # Huecos de filas borradas: el rango de ids dice 12, hay 8
+        ids = list(Baneos.objects.order_by('id').values_list('id', flat=True))
+        Baneos.objects.filter(pk__in=ids[3:7]).delete()
+        with mock.patch('core.paginacion.MINIMO_CONTEO_ESTIMADO', 1):
+            paginador = PaginadorEstimado(Baneos.objects.order_by('-id'), 5)
+            self.assertEqual((paginador.count, paginador.num_pages), (12, 3))
+            self.assertTrue(paginador.estimado)
+            for numero, error in [('abc', PageNotAnInteger), (None, PageNotAnInteger), (0, EmptyPage), (99, EmptyPage)]:
+                with self.subTest(numero), self.assertRaises(error):
+                    paginador.page(numero)
+
+            pagina = paginador.page(3)
+            self.assertEqual(pagina.number, 2)
+            self.assertEqual(len(pagina.object_list), 3)
+            self.assertEqual((paginador.count, paginador.num_pages), (8, 2))
+            self.assertFalse(paginador.estimado)
+            self.assertEqual(paginador.page('7').number, 2)
+
+            # Con filtros cuenta exacto
+            filtrado = PaginadorEstimado(Baneos.objects.filter(activo=True).order_by('-id'), 5)
+            self.assertEqual(filtrado.count, 8)
+            self.assertFalse(filtrado.estimado)
+
+    def test_filtro_por_mes_con_valores_invalidos(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin'))
+        url = reverse('admin:core_baneos_changelist')
+        ahora = timezone.localtime()
+        Baneos.objects.filter(nombre_usuario='usuario0').update(fecha_baneo=ahora - timedelta(days=800))
+
+        casos = {
+            f'{ahora.year}-{ahora.month:02d}': 11,
+            str((ahora - timedelta(days=800)).year): 1,
+            'abc': 0, '2024-13': 0, '2024-00': 0, '2024-': 0, '-05': 0,
+            '9999-12': 0, '9999999': 0,
+        }
+        for valor, esperados in casos.items():
+            with self.subTest(valor):
+                respuesta = self.client.get(url, {'mes_baneo': valor})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(respuesta.context['cl'].result_count, esperados)
+
+        respuesta = self.client.get(url)
+        opciones = [opcion['display'] for opcion in respuesta.context['cl'].filter_specs[2].choices(respuesta.context['cl'])]
+        self.assertIn(f'{ahora.year}-{ahora.month:02d}', opciones)
+        self.assertIn(str((ahora - timedelta(days=800)).year), opciones)
+
+
+class EventosTests(TestCase):
+    def setUp(self):
+        self.canal = CanalTwitch.objects.create(nombre='canal', streamer='canal')
+        invalidar_canales()
+
+    def _crear_baneo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Baneos.objects.create(canal=self.canal, nombre_usuario='uno', motivo='spam')
+
+    def test_publicar_llega_a_los_suscriptores(self):
+        async def recibir():
+            conexion = escuchar(self.canal.id)
+            recibidos = [await anext(conexion)]
+            self.assertTrue(hay_suscriptores(self.canal.id))
+            # Desde otro hilo, como una vista sync o un comando
+            await asyncio.to_thread(publicar, self.canal.id, 'comando', accion='borrado', id=7, html='')
+            recibidos.append(await anext(conexion))
+            # Desde una señal al confirmar la transacción
+            await sync_to_async(self._crear_baneo)()
+            recibidos.append(await anext(conexion))
+            await conexion.aclose()
+            return recibidos
+
+        retry, comando, baneo = async_to_sync(recibir)()
+        self.assertEqual(retry, 'retry: 3000\n\n')
+        self.assertTrue(comando.startswith('id: '))
+        self.assertIn('\nevent: comando\n', comando)
+        datos = json.loads(comando.split('data: ', 1)[1])
+        self.assertEqual((datos['tipo'], datos['accion'], datos['id']), ('comando', 'borrado', 7))
+        self.assertIn('\nevent: baneo\n', baneo)
+        self.assertIn('uno', json.loads(baneo.split('data: ', 1)[1])['html'])
+        self.assertFalse(hay_suscriptores(self.canal.id))
+
+    def test_cola_llena_pide_recargar(self):
+        async def recibir():
+            conexion = escuchar(self.canal.id)
+            await anext(conexion)
+            for numero in range(3):
+                publicar(self.canal.id, 'nota', id=numero)
+            recibidos = [await anext(conexion), await anext(conexion)]
+            await conexion.aclose()
+            return recibidos
+
+        with mock.patch('core.eventos.MAXIMO_EN_COLA', 2), self.assertLogs('core.eventos', 'WARNING'):
+            primero, segundo = async_to_sync(recibir)()
+        self.assertIn('\nevent: nota\n', primero)
+        self.assertEqual(json.loads(primero.split('data: ', 1)[1])['id'], 1)
+        self.assertIn('\nevent: recargar\n', segundo)
+        self.assertFalse(hay_suscriptores(self.canal.id))
+
+    def test_sin_suscriptores_no_se_publica(self):
+        with mock.patch('core.eventos.render_to_string') as renderizar:
+            self._crear_baneo()
+        renderizar.assert_not_called()
+
+    def test_vista_bajo_wsgi_responde_204(self):
+        self.client.force_login(get_user_model().objects.create_user('moderador'))
+        self.assertEqual(self.client.get(reverse('eventos_canal')).status_code, 204)
+
+        CanalTwitch.objects.filter(pk=self.canal.pk).update(activo=False)
+        invalidar_canales()
+        respuesta = self.client.get(reverse('eventos_canal'))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('error', respuesta.json())
+
+
+class MetricasProcesosTests(SimpleTestCase):
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        self.enterContext(override_settings(METRICAS=True, METRICAS_DIR=self.carpeta))
+
+    def _archivo(self, pid, valor):
+        with open(os.path.join(self.carpeta, f'{pid}.json'), 'w', encoding='utf-8') as archivo:
+            json.dump({'contadores': {'judivero_respuestas_total': valor}, 'histogramas': {}}, archivo)
+
+    def test_pliega_los_procesos_terminados(self):
+        terminado = subprocess.Popen([sys.executable, '-c', 'pass'])
+        terminado.wait()
+        self._archivo(terminado.pid, 5)
+        self._archivo(os.getppid(), 2)
+
+        for _ in range(2):
+            contadores, _ = metricas.valores_agregados()
+            self.assertEqual(contadores['judivero_respuestas_total'], 7)
+        self.assertEqual(
+            sorted(nombre for nombre in os.listdir(self.carpeta) if nombre.endswith('.json')),
+            sorted([f'{os.getppid()}.json', metricas.ARCHIVO_TERMINADOS]),
+        )
+
+
+class ConcurrenciaSQLiteTests(SimpleTestCase):
+    """`manage.py estresar_sqlite` en corto: con las OPTIONS de settings no debe haber bloqueos"""
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        base = base_temporal(carpeta, dict(perfiles())['settings'])
+        # Django avisa que cambiar DATABASES no reconfigura django.db.connections;
+        # probar() abre sus propias conexiones con esta entrada
+        with self.assertWarnsMessage(UserWarning, 'Overriding setting DATABASES'):
+            self.enterContext(override_settings(DATABASES={**settings.DATABASES, ALIAS: base}))
+
+    def test_escrituras_concurrentes_sin_bloqueos(self):
+        resultado = probar(settings.DATABASES[ALIAS], escritores=4, lectores=4, segundos=1.0)
+        self.assertEqual(resultado['bloqueos'], 0, resultado)
+        self.assertGreater(resultado['escrituras'], 0)
+        self.assertGreater(resultado['lecturas'], 0)
+
+
+class DatosSinteticosTests(TestCase):
+    """generar_datos y medir_vistas con pocos datos: fechas, contadores y consultas por vista"""
+
+    # Consultas por petición de cada escenario de medir_vistas; subirlas es una regresión
+    PRESUPUESTO_CONSULTAS = {
+        'inicio': 2,
+        'inicio_sin_cache': 4,
+        'baneos_pagina': 3,
+        'notas_busqueda': 4,
+        'perfil_usuario': 5,
+        'buscar_usuario': 5,
+        'autocompletar_usuario': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.carpeta = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=os.path.join(cls.carpeta, 'media'),
+            REPORTES_CACHE_DIR=os.path.join(cls.carpeta, 'reportes'),
+        ))
+        cls.addClassCleanup(shutil.rmtree, cls.carpeta, ignore_errors=True)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generar_datos', '--canales', '2', '--baneos', '600', '--usuarios', '120',
+            '--imagenes', '1', '--notas', '20', '--comandos', '10', stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fechas_repartidas_sin_tocar_el_modelo(self):
+        fechas = Baneos.objects.aggregate(primera=Min('fecha_baneo'), ultima=Max('fecha_baneo'))
+        self.assertLess(fechas['primera'], timezone.now() - timedelta(days=30))
+        self.assertLessEqual(fechas['ultima'], timezone.now())
+        self.assertTrue(Baneos._meta.get_field('fecha_baneo').auto_now_add)
+
+    def test_contadores_e_indice_al_dia(self):
+        reales = contadores_reales()
+        for canal in CanalTwitch.objects.all():
+            self.assertEqual(
+                (canal.total_comandos, canal.total_baneos, canal.total_baneos_activos), reales[canal.pk]
+            )
+        pares = Baneos.objects.order_by().values_list('canal_id', 'nombre_usuario').distinct().count()
+        self.assertEqual(UsuarioBaneado.objects.count(), pares)
+
+    def test_consultas_por_vista(self):
+        salida = os.path.join(self.carpeta, 'benchmark.json')
+        call_command(
+            'medir_vistas', 'bench', '--repeticiones', '2', '--salida', salida,
+            *[f'--solo={escenario}' for escenario in self.PRESUPUESTO_CONSULTAS], stdout=StringIO(),
+        )
+        with open(salida, encoding='utf-8') as archivo:
+            escenarios = json.load(archivo)['escenarios']
+        self.assertEqual(set(escenarios), set(self.PRESUPUESTO_CONSULTAS))
+        for escenario, maximo in self.PRESUPUESTO_CONSULTAS.items():
+            with self.subTest(escenario):
+                self.assertLessEqual(escenarios[escenario]['consultas']['max'], maximo)
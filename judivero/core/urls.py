@@ -1,20 +1,35 @@
 from django.urls import path
-from . import views
+from . import api, views
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('', views.inicio, name='inicio'),
     path('notas/', views.notas_view, name='notas'),
+    path('notas/buscar/', views.buscar_notas_view, name='buscar_notas'),
     path('agregar_nota/', views.agregar_nota, name='agregar_nota'),
     path('agregar_comando/', views.agregar_comando, name='agregar_comando'),
     path('agregar_baneo/', views.agregar_baneo, name='agregar_baneo'),
+    path('baneos/pagina/', views.baneos_pagina, name='baneos_pagina'),
+    path('baneos/importar/', views.importar_baneos_view, name='importar_baneos'),
+    path('baneos/exportar/', views.exportar_baneos_view, name='exportar_baneos'),
+    path('eventos/', views.eventos_canal, name='eventos_canal'),
     path('cambiar_canal/<int:canal_id>/', views.cambiar_canal, name='cambiar_canal'),
     path('buscar/', views.buscar_usuario, name='buscar_usuario'),
+    path('buscar/autocompletar/', views.autocompletar_usuario, name='autocompletar_usuario'),
     path('perfil/<str:nombre_usuario>/', views.perfil_usuario, name='perfil_usuario'),
     path('reporte/<str:nombre_usuario>/', views.generar_reporte_pdf, name='generar_reporte_pdf'),
+    path('reporte/<str:nombre_usuario>/solicitar/', views.solicitar_reporte_pdf, name='solicitar_reporte_pdf'),
+    path('reportes/exportar/', views.exportar_reportes_zip, name='exportar_reportes_zip'),
+    path('reportes/<uuid:trabajo_id>/', views.estado_reporte, name='estado_reporte'),
+    path('reportes/<uuid:trabajo_id>/descargar/', views.descargar_reporte, name='descargar_reporte'),
+    path('metricas/', views.metricas_view, name='metricas'),
+    path('perfilado/', views.perfilado_view, name='perfilado'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('api/canales/', api.canales, name='api_canales'),
+    path('api/canales/<int:canal_id>/comandos/', api.comandos, name='api_comandos'),
+    path('api/canales/<int:canal_id>/baneos/', api.baneos, name='api_baneos'),
 ]
 
 if settings.DEBUG:
@@ -1,88 +1,205 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.utils import timezone
 from django.db.models import Count, Q
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
-from io import BytesIO
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from datetime import datetime
-from xhtml2pdf import pisa
+import asyncio
+import json
 import os
 
-from .models import Comando, Nota, Baneos, CanalTwitch
-from .forms import ComandoForm, NotaForm, BaneoForm, CustomLoginForm
-
-
-@login_required
-def get_canal_actual(request):
-    """Obtiene el canal actual de la sesión o el primero disponible"""
-    canal_id = request.session.get('canal_actual_id')
-    
-    if canal_id:
-        try:
-            return CanalTwitch.objects.get(id=canal_id, activo=True)
-        except CanalTwitch.DoesNotExist:
-            pass
-    
-    canal = CanalTwitch.objects.filter(activo=True).first()
-    if canal:
-        request.session['canal_actual_id'] = canal.id
-    return canal
+from .models import Comando, Nota, Baneos, TrabajoReporte, Infractor, CanalTwitch
+from .forms import ComandoForm, NotaForm, BaneoForm, CustomLoginForm, ImportarBaneosForm
+from .canales import canal_por_id
+from .eventos import escuchar
+from .fragmentos import afragmento_canal
+from .api import token_valido
+from .metricas import exportar as exportar_metricas
+from .perfilado import fase, resumen_perfilado, reiniciar_perfilado
+from .paginacion import apaginar_baneos, CursorInvalido
+from .busqueda import (
+    buscar_usuarios, baneos_en_otros_canales, infractores_en_varios_canales,
+    LIMITE_RESULTADOS, LIMITE_AUTOCOMPLETAR,
+)
+from .busqueda_notas import abuscar_notas
+from .resumen import aresumen_moderacion_usuario
+from .reportes import clave_cache, reporte_en_cache, solicitar_reporte, nombre_descarga
+from .exportacion import aiterar, generar_zip_reportes, usuarios_a_exportar, exportar_baneos, FORMATOS_BANEOS
+from .importacion import importar_baneos, leer_usuarios, ErrorImportacion
 
 
 @login_required
 def cambiar_canal(request, canal_id):
     """Vista para cambiar de canal"""
-    canal = get_object_or_404(CanalTwitch, id=canal_id, activo=True)
+    canal = canal_por_id(canal_id)
+    if canal is None:
+        raise Http404('Canal no encontrado')
     request.session['canal_actual_id'] = canal.id
     next_url = request.GET.get('next', 'inicio')
     return redirect(next_url)
 
 
 @login_required
-def inicio(request):
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+async def inicio(request):
+    canal_actual = request.canal
     
     if not canal_actual:
-        return render(request, 'core/sin_canales.html', {'canales': canales})
+        return render(request, 'core/sin_canales.html')
     
-    comandos = Comando.objects.filter(canal=canal_actual)
-    baneos = Baneos.objects.filter(canal=canal_actual)
+    # Las tablas se guardan ya renderizadas por canal; cualquier cambio en sus
+    # comandos o baneos sube la versión del canal (ver core.fragmentos)
+    tabla_comandos, tabla_baneos = await asyncio.gather(
+        afragmento_canal(canal_actual.id, 'comandos', lambda: _filas_comandos(canal_actual)),
+        afragmento_canal(canal_actual.id, 'baneos', lambda: _primera_pagina_baneos(canal_actual)),
+    )
     
+    # Los totales salen de los contadores del canal, sin COUNT por visita
     context = {
-        'comandos': comandos,
-        'baneos': baneos,
+        'html_comandos': tabla_comandos['html'],
+        'total_comandos': canal_actual.total_comandos,
+        'html_baneos': tabla_baneos['html'],
+        'total_baneos': canal_actual.total_baneos,
+        'total_baneos_activos': canal_actual.total_baneos_activos,
+        'siguiente_cursor': tabla_baneos['siguiente_cursor'],
         'canal_actual': canal_actual,
-        'canales': canales,
     }
     return render(request, 'core/inicio.html', context)
 
 
+async def _filas_comandos(canal):
+    comandos = [comando async for comando in Comando.objects.filter(canal=canal)]
+    return {
+        'html': render_to_string('core/partials/filas_comandos.html', {'comandos': comandos}).strip(),
+    }
+
+
+async def _primera_pagina_baneos(canal):
+    """Solo la primera página de baneos; el resto se pide con baneos_pagina"""
+    baneos, siguiente_cursor = await apaginar_baneos(Baneos.objects.filter(canal=canal))
+    return {
+        'html': render_to_string('core/partials/filas_baneos.html', {'baneos': baneos}).strip(),
+        'siguiente_cursor': siguiente_cursor,
+    }
+
+
 @login_required
-def notas_view(request):
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+async def baneos_pagina(request):
+    """Devuelve la siguiente página de baneos como fragmento HTML dentro de un JSON"""
+    canal_actual = request.canal
     
     if not canal_actual:
-        return render(request, 'core/sin_canales.html', {'canales': canales})
+        return JsonResponse({'error': 'No hay canal seleccionado'}, status=400)
     
-    todas_las_notas = Nota.objects.filter(canal=canal_actual)
+    try:
+        baneos, siguiente_cursor = await apaginar_baneos(
+            Baneos.objects.filter(canal=canal_actual),
+            cursor=request.GET.get('cursor'),
+        )
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    
+    html = render_to_string('core/partials/filas_baneos.html', {'baneos': baneos}, request=request)
+    return JsonResponse({
+        'html': html,
+        'cantidad': len(baneos),
+        'siguiente_cursor': siguiente_cursor,
+    })
+
+
+@login_required
+async def eventos_canal(request):
+    """
+    Cambios del canal actual como Server-Sent Events: filas nuevas, editadas o
+    borradas de baneos, comandos y notas, para que los paneles abiertos se
+    actualicen sin recargar.
+    """
+    canal_actual = request.canal
+    
+    if not canal_actual:
+        return JsonResponse({'error': 'No hay canal seleccionado'}, status=400)
+    
+    # Bajo WSGI cada conexión abierta ocuparía un hilo del servidor; con 204 el
+    # navegador no reintenta y la página sigue funcionando sin tiempo real
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    respuesta = StreamingHttpResponse(escuchar(canal_actual.id), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # Que nginx no acumule el stream
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+@login_required
+async def notas_view(request):
+    canal_actual = request.canal
+    
+    if not canal_actual:
+        return render(request, 'core/sin_canales.html')
+    
+    filtros = _filtros_notas(request)
+    notas, hay_siguiente = await abuscar_notas(canal_actual, **filtros)
     
     context = {
-        'notas': todas_las_notas,
+        'notas': notas,
+        'siguiente_pagina': filtros['pagina'] + 1 if hay_siguiente else None,
+        'texto': filtros['texto'],
+        'tipo': filtros['tipo'],
+        'importante': filtros['importante'],
+        'hay_filtros': bool(filtros['texto'] or filtros['tipo'] or filtros['importante'] is not None),
+        'tipos': Nota.TIPO_NOTA,
         'canal_actual': canal_actual,
-        'canales': canales,
     }
     return render(request, 'core/notas.html', context)
 
 
+def _filtros_notas(request):
+    """Lee ?q=, ?tipo=, ?importante=1|0 y ?pagina= ignorando valores inválidos"""
+    tipo = request.GET.get('tipo') or None
+    if tipo not in dict(Nota.TIPO_NOTA):
+        tipo = None
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        pagina = 1
+    return {
+        'texto': request.GET.get('q', '').strip(),
+        'tipo': tipo,
+        'importante': {'1': True, '0': False}.get(request.GET.get('importante')),
+        'pagina': pagina,
+    }
+
+
+@login_required
+async def buscar_notas_view(request):
+    """Página de resultados de la búsqueda de notas como fragmento HTML dentro de un JSON"""
+    canal_actual = request.canal
+    
+    if not canal_actual:
+        return JsonResponse({'error': 'No hay canal seleccionado'}, status=400)
+    
+    filtros = _filtros_notas(request)
+    notas, hay_siguiente = await abuscar_notas(canal_actual, **filtros)
+    
+    html = render_to_string('core/partials/tarjetas_notas.html', {'notas': notas}, request=request)
+    return JsonResponse({
+        'html': html,
+        'cantidad': len(notas),
+        'siguiente_pagina': filtros['pagina'] + 1 if hay_siguiente else None,
+    })
+
+
 @login_required
 def agregar_nota(request):
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+    canal_actual = request.canal
     
     if not canal_actual:
         return redirect('inicio')
@@ -102,14 +219,12 @@ def agregar_nota(request):
     return render(request, 'core/agregar_nota.html', {
         'form': form,
         'canal_actual': canal_actual,
-        'canales': canales,
     })
 
 
 @login_required
 def agregar_comando(request):
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+    canal_actual = request.canal
     
     if not canal_actual:
         return redirect('inicio')
@@ -127,14 +242,12 @@ def agregar_comando(request):
     return render(request, 'core/agregar_comandos.html', {
         'form': form,
         'canal_actual': canal_actual,
-        'canales': canales,
     })
 
 
 @login_required
 def agregar_baneo(request):
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+    canal_actual = request.canal
     
     if not canal_actual:
         return redirect('inicio')
@@ -159,188 +272,345 @@ def agregar_baneo(request):
     return render(request, 'core/agregar_baneo.html', {
         'form': form,
         'canal_actual': canal_actual,
-        'canales': canales,
     })
 
 
 @login_required
-def perfil_usuario(request, nombre_usuario):
-    """Vista del perfil completo de un usuario con su historial"""
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+def importar_baneos_view(request):
+    """
+    Baneo masivo para raids: una lista de usuarios (texto, archivo CSV/JSON o
+    cuerpo JSON) con un motivo común. Responde JSON si se llama por fetch o con JSON.
+    """
+    canal_actual = request.canal
     
     if not canal_actual:
         return redirect('inicio')
     
-    baneos = Baneos.objects.filter(
-        canal=canal_actual,
-        nombre_usuario=nombre_usuario
-    ).order_by('-fecha_baneo')
+    es_json = request.content_type == 'application/json'
+    es_ajax = es_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    resumen = None
     
-    total_baneos = baneos.count()
-    baneos_activos = baneos.filter(activo=True).count()
+    if request.method == 'POST':
+        if es_json:
+            try:
+                datos = json.loads(request.body)
+            except ValueError:
+                return JsonResponse({'error': 'JSON inválido'}, status=400)
+            if not isinstance(datos, dict):
+                return JsonResponse({'error': 'Se esperaba un objeto con "usuarios" y "motivo"'}, status=400)
+            # Una lista u objeto llegaría al form convertido con str()
+            if not isinstance(datos.get('motivo', ''), str):
+                return JsonResponse({'error': '"motivo" debe ser un texto'}, status=400)
+            if not isinstance(datos.get('desbaneo') or '', str):
+                return JsonResponse({'error': '"desbaneo" debe ser una fecha en texto'}, status=400)
+            form = ImportarBaneosForm({
+                'usuarios': json.dumps(datos.get('usuarios', [])),
+                'motivo': datos.get('motivo', ''),
+                'desbaneo': datos.get('desbaneo'),
+            })
+        else:
+            form = ImportarBaneosForm(request.POST, request.FILES)
+        
+        if form.is_valid():
+            texto, formato = form.texto_usuarios()
+            try:
+                nombres = leer_usuarios(texto, formato)
+            except ErrorImportacion as error:
+                form.add_error(None, str(error))
+            else:
+                resumen = importar_baneos(
+                    canal_actual,
+                    nombres,
+                    form.cleaned_data['motivo'],
+                    user=request.user,
+                    desbaneo=form.cleaned_data['desbaneo'],
+                )
+                form = ImportarBaneosForm()
+        
+        if es_ajax:
+            if resumen is None:
+                return JsonResponse({'error': 'Datos inválidos', 'errores': form.errors}, status=400)
+            return JsonResponse(resumen, status=201)
+    else:
+        form = ImportarBaneosForm()
     
-    context = {
-        'nombre_usuario': nombre_usuario,
-        'baneos': baneos,
-        'total_baneos': total_baneos,
-        'baneos_activos': baneos_activos,
+    return render(request, 'core/importar_baneos.html', {
+        'form': form,
+        'resumen': resumen,
         'canal_actual': canal_actual,
-        'canales': canales,
-    }
+    })
+
+
+def _respuesta_por_partes(request, generador, content_type):
+    """StreamingHttpResponse que también se envía de a bloques bajo ASGI"""
+    if isinstance(request, ASGIRequest):
+        generador = aiterar(generador)
+    return StreamingHttpResponse(generador, content_type=content_type)
+
+
+@login_required
+def exportar_baneos_view(request):
+    """Lista de baneos del canal en CSV o JSONL (?formato=csv|jsonl, ?activos=1), enviada por partes"""
+    canal_actual = request.canal
     
-    return render(request, 'core/perfil_usuario.html', context)
+    if not canal_actual:
+        return HttpResponse('No hay canal seleccionado', status=400)
+    
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS_BANEOS:
+        return HttpResponse('Formato no soportado', status=400)
+    
+    response = _respuesta_por_partes(
+        request,
+        exportar_baneos(canal_actual, formato, solo_activos=request.GET.get('activos') == '1'),
+        content_type=FORMATOS_BANEOS[formato]
+    )
+    filename = f'baneos_{canal_actual.nombre}_{timezone.now().strftime("%Y%m%d_%H%M")}.{formato}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
-def link_callback(uri, rel):
-    """
-    Convierte URIs HTML a rutas del sistema de archivos para xhtml2pdf.
-    Especialmente importante para cargar imágenes correctamente.
-    """
-    import os
-    from django.conf import settings
-    
-    # Si la URI ya es una ruta de archivo, usarla directamente
-    if uri.startswith('file://'):
-        return uri.replace('file://', '')
-    
-    # Para archivos de media
-    if uri.startswith(settings.MEDIA_URL):
-        path = os.path.join(
-            settings.MEDIA_ROOT,
-            uri.replace(settings.MEDIA_URL, "")
-        )
-        if os.path.exists(path):
-            return path
-    
-    # Para archivos estáticos
-    if uri.startswith(settings.STATIC_URL):
-        path = os.path.join(
-            settings.STATIC_ROOT or settings.BASE_DIR,
-            uri.replace(settings.STATIC_URL, "")
-        )
-        if os.path.exists(path):
-            return path
+@login_required
+async def perfil_usuario(request, nombre_usuario):
+    """Vista del perfil completo de un usuario con su historial"""
+    canal_actual = request.canal
+    
+    if not canal_actual:
+        return redirect('inicio')
+    
+    context, otros_canales = await asyncio.gather(
+        aresumen_moderacion_usuario(canal_actual, nombre_usuario),
+        _en_lista(baneos_en_otros_canales(nombre_usuario, canal_actual)),
+    )
+    context.update({
+        'otros_canales': otros_canales,
+        'canal_actual': canal_actual,
+    })
     
-    # Si no encuentra nada, devolver la URI original
-    return uri
+    return render(request, 'core/perfil_usuario.html', context)
 
 
 @login_required
 def generar_reporte_pdf(request, nombre_usuario):
     """
-    Genera un PDF profesional usando xhtml2pdf con template optimizado.
-    Compatible con Windows sin dependencias externas complicadas.
+    Descarga el PDF del historial si ya está en caché; si no, encola su
+    generación en segundo plano y muestra una página que espera al trabajo.
     """
-    canal_actual = get_canal_actual(request)
+    canal_actual = request.canal
     
     if not canal_actual:
         return HttpResponse('No hay canal seleccionado', status=400)
     
-    # Obtener baneos del usuario
-    baneos = Baneos.objects.filter(
-        canal=canal_actual,
-        nombre_usuario=nombre_usuario
-    ).order_by('-fecha_baneo')
-    
-    if not baneos.exists():
+    # El PDF se genera en el pool de procesos: en la petición se mide la búsqueda en caché y el encolado
+    with fase('pdf'):
+        clave = clave_cache(canal_actual, nombre_usuario)
+        ruta = reporte_en_cache(canal_actual.id, clave) if clave else None
+        if clave and not ruta:
+            trabajo = solicitar_reporte(canal_actual, nombre_usuario, user=request.user, clave=clave)
+    if clave is None:
         return HttpResponse(
             f'No se encontraron registros para el usuario "{nombre_usuario}" en el canal {canal_actual.nombre}',
             status=404
         )
     
-    # Calcular estadísticas
-    total_baneos = baneos.count()
-    baneos_activos = baneos.filter(activo=True).count()
-    es_reincidente = total_baneos > 1
-
-    # Contexto para el template
-    context = {
+    if ruta:
+        return FileResponse(
+            open(ruta, 'rb'),
+            as_attachment=True,
+            filename=nombre_descarga(canal_actual, nombre_usuario),
+            content_type='application/pdf'
+        )
+    
+    return render(request, 'core/reporte_en_proceso.html', {
+        'trabajo': trabajo,
         'nombre_usuario': nombre_usuario,
-        'canal': canal_actual,
-        'fecha_reporte': timezone.now(),
-        'baneos': baneos,
-        'total_baneos': total_baneos,
-        'baneos_activos': baneos_activos,
-        'es_reincidente': es_reincidente,
+        'canal_actual': canal_actual,
+    }, status=202)
+
+
+def _estado_trabajo(trabajo):
+    datos = {
+        'id': str(trabajo.id),
+        'estado': trabajo.estado,
+        'nombre_usuario': trabajo.nombre_usuario,
+        'url_estado': reverse('estado_reporte', args=[trabajo.id]),
     }
+    if trabajo.estado == 'LISTO':
+        datos['url_descarga'] = reverse('descargar_reporte', args=[trabajo.id])
+    if trabajo.estado == 'ERROR':
+        datos['error'] = trabajo.error
+    return datos
 
-    # Renderizar el template HTML
-    html_string = render_to_string('core/pdf/reporte_baneo.html', context)
 
-    # Crear el PDF
-    result = BytesIO()
+@login_required
+@require_POST
+def solicitar_reporte_pdf(request, nombre_usuario):
+    """Encola el reporte PDF de un usuario y devuelve el id del trabajo"""
+    canal_actual = request.canal
+    
+    if not canal_actual:
+        return JsonResponse({'error': 'No hay canal seleccionado'}, status=400)
     
-    # Convertir HTML a PDF con callback para manejar imágenes
-    pdf_status = pisa.pisaDocument(
-        BytesIO(html_string.encode("UTF-8")),
-        result,
-        link_callback=link_callback,
-        encoding='UTF-8'
+    with fase('pdf'):
+        trabajo = solicitar_reporte(canal_actual, nombre_usuario, user=request.user)
+    if trabajo is None:
+        return JsonResponse({'error': 'El usuario no tiene baneos en este canal'}, status=404)
+    
+    return JsonResponse(_estado_trabajo(trabajo), status=202)
+
+
+@login_required
+def estado_reporte(request, trabajo_id):
+    """Estado de un trabajo de reporte, para consultarlo periódicamente"""
+    trabajo = get_object_or_404(TrabajoReporte, pk=trabajo_id)
+    return JsonResponse(_estado_trabajo(trabajo))
+
+
+@login_required
+def descargar_reporte(request, trabajo_id):
+    trabajo = get_object_or_404(TrabajoReporte.objects.select_related('canal'), pk=trabajo_id)
+    
+    if trabajo.estado != 'LISTO':
+        return JsonResponse(_estado_trabajo(trabajo), status=409)
+    if not os.path.exists(trabajo.archivo):
+        raise Http404('El reporte ya no está disponible')
+    
+    return FileResponse(
+        open(trabajo.archivo, 'rb'),
+        as_attachment=True,
+        filename=nombre_descarga(trabajo.canal, trabajo.nombre_usuario),
+        content_type='application/pdf'
     )
+
+
+@login_required
+def exportar_reportes_zip(request):
+    """
+    Exporta en un ZIP el reporte PDF de todos los usuarios baneados del canal,
+    o de los que cumplan los filtros (?q=, ?usuario=, ?activos=1, ?reincidentes=1).
+    """
+    canal_actual = request.canal
     
-    # Verificar si hubo errores
-    if pdf_status.err:
-        return HttpResponse(
-            f'Error al generar el PDF. Código de error: {pdf_status.err}',
-            status=500
-        )
+    if not canal_actual:
+        return HttpResponse('No hay canal seleccionado', status=400)
     
-    # Preparar la respuesta HTTP
-    pdf_content = result.getvalue()
-    response = HttpResponse(pdf_content, content_type='application/pdf')
+    nombres = usuarios_a_exportar(
+        canal_actual,
+        texto=request.GET.get('q', '').strip(),
+        usuarios=request.GET.getlist('usuario'),
+        solo_activos=request.GET.get('activos') == '1',
+        solo_reincidentes=request.GET.get('reincidentes') == '1',
+    )
     
-    # Nombre del archivo
-    filename = f'reporte_{nombre_usuario}_{canal_actual.nombre}_{timezone.now().strftime("%Y%m%d_%H%M")}.pdf'
+    response = _respuesta_por_partes(
+        request,
+        generar_zip_reportes(canal_actual, nombres),
+        content_type='application/zip'
+    )
+    filename = f'reportes_{canal_actual.nombre}_{timezone.now().strftime("%Y%m%d_%H%M")}.zip'
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
     return response
 
 
 @login_required
-def buscar_usuario(request):
-    """Vista para buscar un usuario en todos los canales"""
-    canal_actual = get_canal_actual(request)
-    canales = CanalTwitch.objects.filter(activo=True)
+async def buscar_usuario(request):
+    """
+    Busca usuarios en el canal actual y muestra en qué otros canales está
+    baneado el nombre buscado; sin búsqueda lista los reincidentes en varios canales.
+    """
+    canal_actual = request.canal
     
     username = request.GET.get('q', '').strip()
-    resultados = []
+    resultados, otros_canales, infractores = [], [], []
     
     if username:
-        baneos = Baneos.objects.filter(
-            canal=canal_actual,
-            nombre_usuario__icontains=username
-        ).order_by('-fecha_baneo')
-        
-        usuarios = {}
-        for baneo in baneos:
-            if baneo.nombre_usuario not in usuarios:
-                usuarios[baneo.nombre_usuario] = {
-                    'nombre': baneo.nombre_usuario,
-                    'total_baneos': 0,
-                    'baneos_activos': 0,
-                    'ultimo_baneo': None
-                }
-            
-            usuarios[baneo.nombre_usuario]['total_baneos'] += 1
-            if baneo.activo:
-                usuarios[baneo.nombre_usuario]['baneos_activos'] += 1
-            
-            if not usuarios[baneo.nombre_usuario]['ultimo_baneo']:
-                usuarios[baneo.nombre_usuario]['ultimo_baneo'] = baneo
-        
-        resultados = list(usuarios.values())
+        # La búsqueda en el canal y la de otros canales no dependen una de otra
+        resultados, otros_canales = await asyncio.gather(
+            _buscar_con_infractores(canal_actual, username),
+            _en_lista(baneos_en_otros_canales(username, canal_actual)),
+        )
+    else:
+        infractores = await _en_lista(infractores_en_varios_canales())
     
     context = {
         'username': username,
         'resultados': resultados,
+        'otros_canales': otros_canales,
+        'infractores': infractores,
         'canal_actual': canal_actual,
-        'canales': canales,
     }
     
     return render(request, 'core/buscar_usuario.html', context)
 
 
+async def _en_lista(queryset):
+    return [fila async for fila in queryset]
+
+
+async def _buscar_con_infractores(canal, username):
+    if not canal:
+        return []
+    resultados = await _en_lista(
+        buscar_usuarios(canal, username, limite=LIMITE_RESULTADOS).select_related('ultimo_baneo')
+    )
+    # Cuántos canales tiene cada resultado, con una sola consulta para toda la lista
+    infractores = await Infractor.objects.ain_bulk(
+        [usuario.nombre_normalizado for usuario in resultados],
+        field_name='nombre_normalizado'
+    )
+    for usuario in resultados:
+        usuario.infractor = infractores.get(usuario.nombre_normalizado)
+    return resultados
+
+
+@login_required
+async def autocompletar_usuario(request):
+    """Sugerencias de usuarios baneados en el canal actual mientras se escribe"""
+    canal_actual = request.canal
+    texto = request.GET.get('q', '').strip()
+    
+    if not canal_actual or not texto:
+        return JsonResponse({'resultados': []})
+    
+    resultados = await _en_lista(
+        buscar_usuarios(canal_actual, texto, limite=LIMITE_AUTOCOMPLETAR).values(
+            'nombre_usuario', 'total_baneos', 'baneos_activos', 'fecha_ultimo_baneo'
+        )
+    )
+    return JsonResponse({'resultados': resultados})
+
+
+@staff_member_required
+def perfilado_view(request):
+    """Resumen por vista de las peticiones medidas en este proceso; POST lo vacía"""
+    if not settings.PERFILADO:
+        return JsonResponse({'error': 'El perfilado está desactivado (JUDIVERO_PERFILADO=1)'}, status=404)
+    
+    if request.method == 'POST':
+        reiniciar_perfilado()
+    
+    return JsonResponse({'pid': os.getpid(), 'vistas': resumen_perfilado()})
+
+
+def metricas_view(request):
+    """Métricas en formato de texto de Prometheus; acepta un token de API (Bearer) o la sesión de un staff"""
+    if not settings.METRICAS:
+        return JsonResponse({'error': 'Las métricas están desactivadas (JUDIVERO_METRICAS=1)'}, status=404)
+    
+    if not request.user.is_staff and not token_valido(request):
+        return JsonResponse({'error': 'No autorizado'}, status=401)
+    
+    # Los baneos activos salen de los contadores del canal, sin COUNT por scrape
+    baneos_activos = [
+        ({'canal': canal.nombre}, canal.total_baneos_activos)
+        for canal in CanalTwitch.objects.filter(activo=True).only('nombre', 'total_baneos_activos')
+    ]
+    return HttpResponse(
+        exportar_metricas({'judivero_baneos_activos': baneos_activos}),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 def login_view(request):
     if request.method == 'POST':
         form = CustomLoginForm(request, data=request.POST)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+
+from django.core.exceptions import ImproperlyConfigured
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,6 +34,9 @@ LOGOUT_REDIRECT_URL = 'login'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Segundos que `limpiar_evidencias` respeta un archivo recién subido aunque todavía
+# no lo use ningún baneo (la subida guarda el archivo antes de crear el baneo)
+EVIDENCIAS_GRACIA = int(os.environ.get('JUDIVERO_EVIDENCIAS_GRACIA', 3600))
 # Application definition
 
 INSTALLED_APPS = [
@@ -45,12 +50,33 @@ INSTALLED_APPS = [
     'widget_tweaks',
 ]
 
+# Perfilado por petición (core.perfilado): Server-Timing, consultas repetidas y
+# resumen en /perfilado/. Apagado no agrega nada a la cadena de middlewares
+PERFILADO = os.environ.get('JUDIVERO_PERFILADO', '') == '1'
+# Veces que se tiene que repetir la misma consulta en una petición para avisar de un N+1
+PERFILADO_REPETIDAS = int(os.environ.get('JUDIVERO_PERFILADO_REPETIDAS', 5))
+# Peticiones por vista que se guardan para el resumen
+PERFILADO_VENTANA = int(os.environ.get('JUDIVERO_PERFILADO_VENTANA', 500))
+
+# Métricas para Prometheus en /metricas/ (core.metricas). Con JUDIVERO_METRICAS_DIR
+# cada proceso guarda las suyas en <dir>/<pid>.json y el endpoint suma todas, así
+# funciona con varios workers de gunicorn/uwsgi; sin él solo se ve el proceso que responde.
+# Los archivos de procesos que ya terminaron se pliegan en <dir>/terminados.json (el
+# directorio no debe compartirse entre máquinas o contenedores con otro espacio de pids)
+METRICAS = os.environ.get('JUDIVERO_METRICAS', '') == '1'
+METRICAS_DIR = os.environ.get('JUDIVERO_METRICAS_DIR', '')
+# Segundos mínimos entre escrituras del archivo de cada proceso
+METRICAS_INTERVALO = float(os.environ.get('JUDIVERO_METRICAS_INTERVALO', 5))
+
 MIDDLEWARE = [
+    'core.metricas.MetricasMiddleware',
+    'core.perfilado.PerfiladoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CanalActualMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,7 +85,8 @@ ROOT_URLCONF = 'judivero.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Con el perfilado activo se usa el mismo backend, midiendo el tiempo de render
+        'BACKEND': 'core.perfilado.PlantillasMedidas' if PERFILADO else 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +94,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.canales',
+                'core.context_processors.estaticos',
             ],
         },
     },
@@ -78,13 +107,62 @@ WSGI_APPLICATION = 'judivero.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# SQLite por defecto; con JUDIVERO_DB_ENGINE=postgresql se usa PostgreSQL con el
+# pool de conexiones de psycopg (JUDIVERO_DB_NAME, _USER, _PASSWORD, _HOST, _PORT)
+DB_ENGINE = os.environ.get('JUDIVERO_DB_ENGINE', 'sqlite')
+
+# PRAGMAs de cada conexión SQLite: WAL deja leer mientras otro escribe y
+# synchronous=NORMAL es seguro con WAL (solo se arriesga la última transacción
+# ante un corte de luz, nunca la integridad del archivo)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # en KiB, ~20 MB
+    'temp_store': 'MEMORY',
 }
 
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('JUDIVERO_DB_NAME', 'judivero'),
+            'USER': os.environ.get('JUDIVERO_DB_USER', 'judivero'),
+            'PASSWORD': os.environ.get('JUDIVERO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('JUDIVERO_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('JUDIVERO_DB_PORT', '5432'),
+            # Con pool las conexiones se reutilizan desde el pool, no con CONN_MAX_AGE
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('JUDIVERO_DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('JUDIVERO_DB_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            },
+        }
+    }
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('JUDIVERO_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Segundos que una conexión espera un bloqueo antes de fallar con "database is locked"
+                'timeout': 20,
+                # Las transacciones piden el bloqueo de escritura al empezar; con el modo por
+                # defecto (DEFERRED) dos transacciones que leen y luego escriben se bloquean
+                # entre sí y una falla al instante, sin esperar el timeout
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ''.join(f'PRAGMA {nombre}={valor};' for nombre, valor in SQLITE_PRAGMAS.items()),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'JUDIVERO_DB_ENGINE debe ser sqlite o postgresql, no {DB_ENGINE!r}')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +202,66 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # Para producción
 
+# collectstatic deja los archivos con hash en el nombre (manifest) y una copia
+# .gz/.br de cada uno; nginx puede servirlos con gzip_static/brotli_static y
+# `expires max`. El CSS de Tailwind y los íconos salen de `manage.py construir_estaticos`
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.estaticos.EstaticosComprimidos',
+    },
+}
+# Servir STATIC_ROOT desde Django (core.estaticos.servir_estatico) cuando no hay
+# nginx delante, como en las laptops de moderación sin conexión
+SERVIR_ESTATICOS = os.environ.get('JUDIVERO_SERVIR_ESTATICOS', '') == '1'
+
+# Reportes PDF en segundo plano
+# Procesos del pool de reportes; con 0 los trabajos quedan en la base para `manage.py procesar_reportes`
+REPORTES_WORKERS = int(os.environ.get('JUDIVERO_REPORTES_WORKERS', 2))
+# Caché de PDFs ya generados (fuera de MEDIA_ROOT para no publicarlos)
+REPORTES_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'reportes')
+# Segundos que puede estar un trabajo PENDIENTE/PROCESANDO antes de darlo por colgado y reencolarlo
+REPORTES_VENCIMIENTO = int(os.environ.get('JUDIVERO_REPORTES_VENCIMIENTO', 600))
+# Días que se guardan los trabajos terminados (LISTO o ERROR) antes de que los borre purgar_trabajos
+REPORTES_RETENCION_DIAS = int(os.environ.get('JUDIVERO_REPORTES_RETENCION_DIAS', 7))
+# Procesos para exportar reportes en bloque a ZIP; con 0 se generan uno por uno en el mismo proceso
+EXPORTACION_WORKERS = int(os.environ.get('JUDIVERO_EXPORTACION_WORKERS', os.cpu_count() or 2))
+
+# Canales activos en memoria de cada proceso; las señales lo invalidan en el proceso
+# que hace el cambio y los demás lo recargan al pasar estos segundos
+CANALES_CACHE_TTL = int(os.environ.get('JUDIVERO_CANALES_CACHE_TTL', 30))
+# Lo mismo para las tablas de comandos por canal que usa el bot; más corto porque un
+# bot en otro proceso solo ve los cambios hechos en el panel cuando su tabla vence
+COMANDOS_CACHE_TTL = int(os.environ.get('JUDIVERO_COMANDOS_CACHE_TTL', 10))
+
+# Caché de Django: en memoria de cada proceso, o en archivos compartidos por
+# todos los procesos si se define JUDIVERO_CACHE_DIR
+if os.environ.get('JUDIVERO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['JUDIVERO_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Segundos que vive cada tabla renderizada del inicio (además se invalida con cada cambio).
+# La invalidación solo llega a todos los procesos con la caché compartida; con la de
+# memoria los demás procesos ven el cambio al caducar, así que ahí el valor es corto
+FRAGMENTOS_CACHE_TTL = int(os.environ.get(
+    'JUDIVERO_FRAGMENTOS_CACHE_TTL',
+    3600 if os.environ.get('JUDIVERO_CACHE_DIR') else 10,
+))
+
+# Tokens de la API de solo lectura (bots y overlays), separados por comas
+API_TOKENS = [token.strip() for token in os.environ.get('JUDIVERO_API_TOKENS', '').split(',') if token.strip()]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
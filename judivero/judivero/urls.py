@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.estaticos import servir_estatico
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
@@ -26,6 +28,10 @@ urlpatterns = [
 ]
 
 admin.site.site_header = 'Judivero Admin'   
+# Estáticos con hash y precomprimidos cuando no hay nginx; con DEBUG ya los sirve runserver
+if settings.SERVIR_ESTATICOS and not settings.DEBUG:
+    urlpatterns += [path(f'{settings.STATIC_URL.lstrip("/")}<path:ruta>', servir_estatico)]
+
 # Agregar URLs para archivos media en desarrollo
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,13 @@
+/** Solo quedan en el CSS las clases que aparecen en estos archivos */
+module.exports = {
+  content: [
+    './core/templates/**/*.html',
+    // Clases en widgets de formularios y HTML armado en Python
+    './core/**/*.py',
+    './core/static/core/js/**/*.js',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};